@@ -1,16 +1,96 @@
 from __future__ import annotations
 
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+from django.urls import path
+
+from . import reference_cache
+from .forms import ChildImportForm, SearchQuery
 
 from .models import (
 	Attendance,
+	AttendanceMonthlySummary,
 	AuthorizedPickup,
 	Child,
 	Classroom,
 	Guardian,
 	Tariff,
 	MonthlyBilling,
+	Payment,
 )
+from .pagination import EstimatedCountPaginator
+from .services.billing import recent_months
+from .services.importer import COLUMNS, import_children_csv
+
+# Error rows rendered on the admin import page; the command writes a full report.
+MAX_ADMIN_ERRORS = 500
+# Months offered by the billing month filter, newest first.
+BILLING_MONTH_CHOICES = 12
+
+
+class ClassroomFilter(admin.SimpleListFilter):
+	"""Child's classroom, with choices from the reference cache instead of a query per page."""
+
+	title = "guruh"
+	parameter_name = "classroom"
+
+	def lookups(self, request: HttpRequest, model_admin: admin.ModelAdmin) -> list[tuple[int, str]]:
+		return reference_cache.classroom_choices()
+
+	def queryset(self, request: HttpRequest, queryset: QuerySet) -> QuerySet:
+		if self.value() and self.value().isdigit():
+			return queryset.filter(child__classroom_id=self.value())
+		return queryset
+
+
+class TariffFilter(admin.SimpleListFilter):
+	title = "tarif"
+	parameter_name = "tariff"
+
+	def lookups(self, request: HttpRequest, model_admin: admin.ModelAdmin) -> list[tuple[int, str]]:
+		return [(tariff.pk, str(tariff)) for tariff in reference_cache.tariffs()]
+
+	def queryset(self, request: HttpRequest, queryset: QuerySet) -> QuerySet:
+		if self.value() and self.value().isdigit():
+			return queryset.filter(child__tariff_id=self.value())
+		return queryset
+
+
+class BillingMonthFilter(admin.SimpleListFilter):
+	"""Recent months from the calendar; a field filter would SELECT DISTINCT over the whole table."""
+
+	title = "oy"
+	parameter_name = "billing_month"
+
+	def lookups(self, request: HttpRequest, model_admin: admin.ModelAdmin) -> list[tuple[str, str]]:
+		return [(month, month) for month in reversed(recent_months(BILLING_MONTH_CHOICES))]
+
+	def queryset(self, request: HttpRequest, queryset: QuerySet) -> QuerySet:
+		if self.value():
+			return queryset.filter(billing_month=self.value())
+		return queryset
+
+
+class LargeTableAdminMixin:
+	"""Changelist settings for the per-child tables that grow by one row per child per day / month.
+
+	No full COUNT(*) next to the filtered one, an estimated total on
+	PostgreSQL, and search through the configured search backend (FTS5 /
+	trigram indexes, see core.search) instead of LIKE over a join.
+	"""
+
+	paginator = EstimatedCountPaginator
+	show_full_result_count = False
+	list_select_related = ("child",)
+	search_fields = ("child__first_name", "child__last_name")
+
+	def get_search_results(self, request: HttpRequest, queryset: QuerySet, search_term: str) -> tuple[QuerySet, bool]:
+		return SearchQuery(q=search_term.strip()).filter(queryset, "child", prefix="child__"), False
 
 
 @admin.register(Tariff)
@@ -41,6 +121,52 @@ class ChildAdmin(admin.ModelAdmin):
 	)
 	search_fields = ("first_name", "last_name")
 	list_filter = ("status", "classroom", "tariff")
+	change_list_template = "admin/core/child/change_list.html"
+
+	def get_urls(self):
+		return [
+			path(
+				"import-csv/",
+				self.admin_site.admin_view(self.import_csv_view),
+				name="core_child_import_csv",
+			),
+			*super().get_urls(),
+		]
+
+	def import_csv_view(self, request: HttpRequest) -> HttpResponse:
+		if not self.has_add_permission(request):
+			raise PermissionDenied
+		form = ChildImportForm(request.POST or None, request.FILES or None)
+		result = None
+		if request.method == "POST" and form.is_valid():
+			upload = io.TextIOWrapper(form.cleaned_data["file"].file, encoding="utf-8-sig", newline="")
+			try:
+				result = import_children_csv(
+					upload,
+					delimiter=form.cleaned_data["delimiter"],
+					dry_run=form.cleaned_data["dry_run"],
+				)
+			except (ValidationError, UnicodeDecodeError) as exc:
+				form.add_error("file", exc.messages if isinstance(exc, ValidationError) else "File must be UTF-8 encoded.")
+			else:
+				level = messages.WARNING if result.errors else messages.SUCCESS
+				self.message_user(
+					request,
+					f"{result.rows} qator: {result.children} bola, {result.guardians} vasiy, "
+					f"{result.classrooms} yangi guruh, {result.failed_rows} xato qator.",
+					level,
+				)
+		context = {
+			**self.admin_site.each_context(request),
+			"opts": self.model._meta,
+			"title": "CSV import",
+			"form": form,
+			"result": result,
+			"errors": result.errors[:MAX_ADMIN_ERRORS] if result else [],
+			"hidden_errors": max(len(result.errors) - MAX_ADMIN_ERRORS, 0) if result else 0,
+			"columns": COLUMNS,
+		}
+		return render(request, "admin/core/child/import_csv.html", context)
 
 
 @admin.register(Guardian)
@@ -60,7 +186,7 @@ class GuardianAdmin(admin.ModelAdmin):
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(LargeTableAdminMixin, admin.ModelAdmin):
 	list_display = (
 		"child",
 		"attendance_date",
@@ -68,9 +194,26 @@ class AttendanceAdmin(admin.ModelAdmin):
 		"check_in_time",
 		"check_out_time",
 	)
+	# The date filter's links need no query; date_hierarchy ran DISTINCT
+	# year/month/day queries over the whole table.
+	list_filter = ("attendance_date", "status", ClassroomFilter)
+	# Walks the (attendance_date, ...) indexes; Meta.ordering sorts by child name across the table.
+	ordering = ("-attendance_date", "-id")
+
+
+@admin.register(AttendanceMonthlySummary)
+class AttendanceMonthlySummaryAdmin(admin.ModelAdmin):
+	list_display = ("child", "month", "present", "late", "half_day", "absent", "expected", "updated_at")
 	search_fields = ("child__first_name", "child__last_name")
-	list_filter = ("attendance_date", "status", "child__classroom")
-	date_hierarchy = "attendance_date"
+	list_filter = ("month", "child__classroom")
+	list_select_related = ("child",)
+
+	# Derived from Attendance; rebuild with `manage.py rebuild_attendance_summary`.
+	def has_add_permission(self, request: HttpRequest) -> bool:
+		return False
+
+	def has_change_permission(self, request: HttpRequest, obj: AttendanceMonthlySummary | None = None) -> bool:
+		return False
 
 
 @admin.register(AuthorizedPickup)
@@ -89,17 +232,41 @@ class AuthorizedPickupAdmin(admin.ModelAdmin):
 
 
 @admin.register(MonthlyBilling)
-class MonthlyBillingAdmin(admin.ModelAdmin):
+class MonthlyBillingAdmin(LargeTableAdminMixin, admin.ModelAdmin):
 	list_display = (
 		"child",
 		"billing_month",
 		"amount",
+		"paid_amount",
+		"balance",
 		"status",
 		"paid_at",
 		"created_at",
 		"updated_at",
 	)
-	search_fields = ("child__first_name", "child__last_name")
-	list_filter = ("billing_month", "status", "child__classroom", "child__tariff")
+	list_filter = (BillingMonthFilter, "status", ClassroomFilter, TariffFilter)
+	ordering = ("-billing_month", "-id")
+	# Maintained from the Payment ledger (core.services.payments); balance and
+	# status are re-derived by MonthlyBilling.save() when `amount` is edited here.
+	readonly_fields = ("paid_amount", "balance", "status", "paid_at")
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+	list_display = ("billing", "kind", "method", "amount", "paid_at", "guardian", "received_by")
+	search_fields = ("billing__child__first_name", "billing__child__last_name")
+	list_filter = ("kind", "method", "paid_at")
+	list_select_related = ("billing__child", "guardian", "received_by")
+	date_hierarchy = "paid_at"
+
+	# The ledger is append-only; record payments from the billing page.
+	def has_add_permission(self, request: HttpRequest) -> bool:
+		return False
+
+	def has_change_permission(self, request: HttpRequest, obj: Payment | None = None) -> bool:
+		return False
+
+	def has_delete_permission(self, request: HttpRequest, obj: Payment | None = None) -> bool:
+		return False
 
 # Register your models here.
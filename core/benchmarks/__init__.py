@@ -0,0 +1,59 @@
+"""Benchmark helpers. Benchmarks run inside a transaction that is rolled back."""
+
+from __future__ import annotations
+
+import statistics
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+from django.db import transaction
+
+from core.instrumentation import record_queries
+
+
+@dataclass(frozen=True)
+class Timing:
+	name: str
+	runs: int
+	min_ms: float
+	median_ms: float
+	p95_ms: float
+	max_ms: float
+	queries: int | None = None
+
+	def as_dict(self) -> dict[str, object]:
+		return asdict(self)
+
+
+def measure(name: str, fn: Callable[[], object], *, repeat: int = 10, warmup: int = 1) -> Timing:
+	# The first warm-up call is also used to count queries.
+	with record_queries(keep_slowest=0) as stats:
+		fn()
+	for _ in range(warmup - 1):
+		fn()
+	samples: list[float] = []
+	for _ in range(repeat):
+		started = time.perf_counter()
+		fn()
+		samples.append((time.perf_counter() - started) * 1000)
+	samples.sort()
+	p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+	return Timing(
+		name=name,
+		runs=repeat,
+		min_ms=round(samples[0], 3),
+		median_ms=round(statistics.median(samples), 3),
+		p95_ms=round(p95, 3),
+		max_ms=round(samples[-1], 3),
+		queries=stats.count,
+	)
+
+
+@contextmanager
+def rolled_back() -> Iterator[None]:
+	"""Run the block in a transaction that is always rolled back."""
+	with transaction.atomic():
+		yield
+		transaction.set_rollback(True)
@@ -0,0 +1,230 @@
+"""WSGI vs ASGI load test of the drop-off endpoints (attendance list, quick mark, set time).
+
+Requests go through Django's real WSGIHandler / ASGIHandler in-process, with
+no network server in between: WSGI is driven by a pool of worker threads (as
+a threaded WSGI server would), ASGI by concurrent tasks on one event loop (as
+a single uvicorn worker would). Which views are served depends on
+ASYNC_VIEWS, so each mode is normally run in its own process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import date
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core.models import Attendance, AttendanceStatus
+
+MODES = ("wsgi", "asgi")
+
+# (method, path with query string, urlencoded body)
+Request = tuple[str, str, bytes]
+
+
+@dataclass(frozen=True)
+class LoadResult:
+	mode: str
+	views: str
+	concurrency: int
+	requests: int
+	errors: int
+	elapsed_s: float
+	p50_ms: float
+	p95_ms: float
+	max_ms: float
+
+	@property
+	def throughput(self) -> float:
+		return self.requests / self.elapsed_s if self.elapsed_s else 0.0
+
+	def as_dict(self) -> dict[str, object]:
+		return {**asdict(self), "throughput": round(self.throughput, 1)}
+
+
+def drop_off_workload(attendance_ids: list[int], day: date, count: int) -> list[Request]:
+	"""Three writes (mark present / late, check-in time) for every list page view."""
+	listing = f"{reverse('core:attendance_list')}?{urlencode({'date': day.isoformat()})}"
+	statuses = (AttendanceStatus.PRESENT, AttendanceStatus.LATE)
+	workload: list[Request] = []
+	for idx in range(count):
+		pk = attendance_ids[idx % len(attendance_ids)]
+		step = idx % 4
+		if step == 3:
+			workload.append(("GET", listing, b""))
+		elif step == 2:
+			path = reverse("core:attendance_set_time", kwargs={"pk": pk, "field": "check_in_time"})
+			workload.append(("POST", path, urlencode({"time": f"08:{idx % 60:02d}"}).encode()))
+		else:
+			path = reverse("core:attendance_mark", kwargs={"pk": pk, "status": statuses[step]})
+			workload.append(("POST", path, b""))
+	return workload
+
+
+def _credentials() -> dict[str, str]:
+	user, _ = get_user_model().objects.get_or_create(username="__benchmark__", defaults={"is_staff": True})
+	client = Client()
+	client.force_login(user)
+	csrf = get_random_string(32)
+	cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}; {settings.CSRF_COOKIE_NAME}={csrf}"
+	return {"cookie": cookie, "x-csrftoken": csrf, "content-type": "application/x-www-form-urlencoded"}
+
+
+@contextmanager
+def restored_attendance(attendance_ids: list[int]) -> Iterator[None]:
+	"""Put the touched rows' status and check-in time back after the run."""
+	saved = list(Attendance.objects.filter(pk__in=attendance_ids).only("status", "check_in_time"))
+	try:
+		yield
+	finally:
+		Attendance.objects.bulk_update(saved, ["status", "check_in_time"])
+
+
+def _result(mode: str, concurrency: int, samples: list[float], errors: int, elapsed: float) -> LoadResult:
+	samples.sort()
+	p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+	return LoadResult(
+		mode=mode,
+		views="async" if settings.ASYNC_VIEWS else "sync",
+		concurrency=concurrency,
+		requests=len(samples),
+		errors=errors,
+		elapsed_s=round(elapsed, 3),
+		p50_ms=round(statistics.median(samples), 3),
+		p95_ms=round(p95, 3),
+		max_ms=round(samples[-1], 3),
+	)
+
+
+def _wsgi_environ(request: Request, headers: dict[str, str]) -> dict[str, object]:
+	method, url, body = request
+	parts = urlsplit(url)
+	environ: dict[str, object] = {
+		"REQUEST_METHOD": method,
+		"PATH_INFO": parts.path,
+		"QUERY_STRING": parts.query,
+		"SERVER_NAME": "localhost",
+		"SERVER_PORT": "80",
+		"SERVER_PROTOCOL": "HTTP/1.1",
+		"CONTENT_LENGTH": str(len(body)),
+		"wsgi.input": BytesIO(body),
+		"wsgi.url_scheme": "http",
+		"wsgi.errors": BytesIO(),
+		"HTTP_HOST": "localhost",
+	}
+	for name, value in headers.items():
+		key = name.upper().replace("-", "_")
+		environ[key if key == "CONTENT_TYPE" else f"HTTP_{key}"] = value
+	return environ
+
+
+def run_wsgi(workload: list[Request], *, concurrency: int) -> LoadResult:
+	handler = WSGIHandler()
+	headers = _credentials()
+
+	def call(request: Request) -> tuple[float, bool]:
+		started = time.perf_counter()
+		status: list[str] = []
+		try:
+			result = handler(_wsgi_environ(request, headers), lambda code, _headers: status.append(code))
+			b"".join(result)
+			result.close()
+		except Exception:
+			return (time.perf_counter() - started) * 1000, False
+		return (time.perf_counter() - started) * 1000, int(status[0][:3]) < 400
+
+	with ThreadPoolExecutor(max_workers=concurrency) as pool:
+		list(pool.map(call, workload[:concurrency]))
+		started = time.perf_counter()
+		outcomes = list(pool.map(call, workload))
+		elapsed = time.perf_counter() - started
+	return _result("wsgi", concurrency, [ms for ms, _ok in outcomes], sum(not ok for _ms, ok in outcomes), elapsed)
+
+
+async def _asgi_call(handler: ASGIHandler, request: Request, headers: dict[str, str]) -> tuple[float, bool]:
+	method, url, body = request
+	parts = urlsplit(url)
+	scope = {
+		"type": "http",
+		"asgi": {"version": "3.0"},
+		"http_version": "1.1",
+		"method": method,
+		"scheme": "http",
+		"path": parts.path,
+		"raw_path": parts.path.encode(),
+		"query_string": parts.query.encode(),
+		"root_path": "",
+		"headers": [
+			(b"host", b"localhost"),
+			(b"content-length", str(len(body)).encode()),
+			*((name.encode(), value.encode()) for name, value in headers.items()),
+		],
+		"client": ("127.0.0.1", 0),
+		"server": ("localhost", 80),
+	}
+	done = asyncio.Event()
+	status: list[int] = []
+	pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+	async def receive() -> dict[str, object]:
+		if pending:
+			return pending.pop()
+		# The handler listens for a disconnect while the view runs.
+		await done.wait()
+		return {"type": "http.disconnect"}
+
+	async def send(message: dict[str, object]) -> None:
+		if message["type"] == "http.response.start":
+			status.append(message["status"])
+		elif not message.get("more_body"):
+			done.set()
+
+	started = time.perf_counter()
+	try:
+		await handler(scope, receive, send)
+	except Exception:
+		return (time.perf_counter() - started) * 1000, False
+	finally:
+		done.set()
+	return (time.perf_counter() - started) * 1000, bool(status) and status[0] < 400
+
+
+def run_asgi(workload: list[Request], *, concurrency: int) -> LoadResult:
+	handler = ASGIHandler()
+	headers = _credentials()
+
+	async def drive() -> tuple[list[tuple[float, bool]], float]:
+		slots = asyncio.Semaphore(concurrency)
+
+		async def call(request: Request) -> tuple[float, bool]:
+			async with slots:
+				return await _asgi_call(handler, request, headers)
+
+		await asyncio.gather(*(call(request) for request in workload[:concurrency]))
+		started = time.perf_counter()
+		outcomes = await asyncio.gather(*(call(request) for request in workload))
+		return outcomes, time.perf_counter() - started
+
+	outcomes, elapsed = asyncio.run(drive())
+	return _result("asgi", concurrency, [ms for ms, _ok in outcomes], sum(not ok for _ms, ok in outcomes), elapsed)
+
+
+def run_load_test(mode: str, workload: list[Request], *, concurrency: int) -> LoadResult:
+	runner = run_asgi if mode == "asgi" else run_wsgi
+	# Under load most requests pass the slow-request threshold; keep the log quiet.
+	with override_settings(ALLOWED_HOSTS=["localhost"], INSTRUMENTATION_SLOW_REQUEST_MS=float("inf")):
+		return runner(workload, concurrency=concurrency)
@@ -0,0 +1,159 @@
+"""Query budgets for every GET view in core/urls.py.
+
+Each view is rendered on two dataset sizes. It passes when it answers below
+400, stays within its query budget, and runs the same number of queries on
+both sizes, i.e. no per-row queries from the view or its template. Used by
+QueryBudgetTests and `check_query_budgets`.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Model
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from core import urls as core_urls
+from core.models import MonthlyBilling
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+	classrooms: int
+	children: int
+	days: int
+	months: int
+
+	def __str__(self) -> str:
+		return f"{self.children} children / {self.days} days"
+
+
+# Both sizes fill more than one page of the 25-row lists, so each side renders
+# the same pager (whose COUNT(*) only runs once there is a second page); the
+# second size triples the rows on every page and in every report.
+SIZES = (DatasetSize(classrooms=2, children=30, days=2, months=1), DatasetSize(classrooms=4, children=90, days=4, months=2))
+
+# Every count includes the session and user lookups.
+DEFAULT_BUDGET = 6
+# Per-view overrides, for views that legitimately need more.
+QUERY_BUDGETS: dict[str, int] = {
+	# The child with classroom and tariff, plus one prefetch each for guardians,
+	# pickups, attendance and billing.
+	"child_detail": 7,
+}
+
+SKIPPED = {
+	"attendance_live": "endless event stream",
+	"export_job_download": "serves a finished export file",
+}
+
+# Model whose first row fills the `pk` of a route, where it is not the view's own model.
+PK_MODELS: dict[str, type[Model]] = {
+	"billing_payments": MonthlyBilling,
+}
+
+
+@dataclass(frozen=True)
+class ViewBudget:
+	name: str
+	url: str
+	budget: int
+	statuses: tuple[int, ...]
+	queries: tuple[int, ...]
+	times_ms: tuple[float, ...]
+
+	@property
+	def constant(self) -> bool:
+		return len(set(self.queries)) == 1
+
+	@property
+	def ok(self) -> bool:
+		return self.constant and max(self.queries) <= self.budget and all(status < 400 for status in self.statuses)
+
+
+def seed(size: DatasetSize) -> None:
+	"""Grow the dataset to `size` (seed_demo_data only adds what is missing)."""
+	call_command(
+		"seed_demo_data",
+		f"--classrooms={size.classrooms}",
+		f"--children={size.children}",
+		f"--days={size.days}",
+		f"--months={size.months}",
+		"--seed=1",
+		stdout=StringIO(),
+	)
+
+
+def get_routes() -> list[URLPattern]:
+	"""Named routes of core/urls.py that answer GET, minus SKIPPED."""
+	return [
+		pattern
+		for pattern in core_urls.urlpatterns
+		if pattern.name not in SKIPPED and hasattr(pattern.callback.view_class, "get")
+	]
+
+
+def _url(pattern: URLPattern) -> str:
+	kwargs = {}
+	if "pk" in pattern.pattern.converters:
+		model = PK_MODELS.get(pattern.name) or pattern.callback.view_class.model
+		kwargs["pk"] = model.objects.order_by("pk").values_list("pk", flat=True).first()
+	return reverse(f"{core_urls.app_name}:{pattern.name}", kwargs=kwargs)
+
+
+def _fetch(client: Client, url: str) -> tuple[int, int, float]:
+	started = time.perf_counter()
+	with CaptureQueriesContext(connection) as ctx:
+		response = client.get(url)
+		if response.streaming:
+			b"".join(response.streaming_content)
+	return response.status_code, len(ctx.captured_queries), (time.perf_counter() - started) * 1000
+
+
+def run_budgets(sizes: tuple[DatasetSize, ...] = SIZES) -> list[ViewBudget]:
+	"""Seed each size in turn and render every route; the caller owns the transaction."""
+	user, _ = get_user_model().objects.get_or_create(
+		username="__query_budget__", defaults={"is_staff": True, "is_superuser": True}
+	)
+	client = Client()
+	client.force_login(user)
+	routes = get_routes()
+	samples: dict[str, list[tuple[str, int, int, float]]] = {pattern.name: [] for pattern in routes}
+	for size in sizes:
+		seed(size)
+		for pattern in routes:
+			url = _url(pattern)
+			client.get(url)  # warm the reference cache and lazy imports
+			samples[pattern.name].append((url, *_fetch(client, url)))
+	return [
+		ViewBudget(
+			name=name,
+			url=rows[-1][0],
+			budget=QUERY_BUDGETS.get(name, DEFAULT_BUDGET),
+			statuses=tuple(status for _url, status, _queries, _ms in rows),
+			queries=tuple(queries for _url, _status, queries, _ms in rows),
+			times_ms=tuple(round(ms, 1) for _url, _status, _queries, ms in rows),
+		)
+		for name, rows in samples.items()
+	]
+
+
+def format_report(results: list[ViewBudget], sizes: tuple[DatasetSize, ...] = SIZES) -> str:
+	header = f"{'view':<28} {'status':<10} {'queries':<10} {'budget':>6}  {'ms':<16} result"
+	lines = [f"sizes: {' -> '.join(str(size) for size in sizes)}", header, "-" * len(header)]
+	for row in results:
+		verdict = "ok" if row.ok else ("GROWS" if not row.constant else "OVER")
+		if not all(status < 400 for status in row.statuses):
+			verdict = "ERROR"
+		lines.append(
+			f"{row.name:<28} {'/'.join(map(str, row.statuses)):<10} {'/'.join(map(str, row.queries)):<10} "
+			f"{row.budget:>6}  {'/'.join(f'{ms:.1f}' for ms in row.times_ms):<16} {verdict}"
+		)
+	return "\n".join(lines)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import random
+from datetime import date
+
+from django.db.models import Q
+
+from core.models import Child, Classroom, Guardian
+from core.search import LikeSearchBackend, get_search_backend
+
+from . import Timing, measure
+
+FIRST_NAMES = ["Aziz", "Sardor", "Jasur", "Bekzod", "Malika", "Zuhra", "Madina", "Diyora", "Sabina", "Munisa"]
+LAST_NAMES = ["Karimov", "Toshmatov", "Rahmonov", "Abdullayev", "Saidov", "Qodirov", "Ismoilov", "Yusupov"]
+QUERIES = ["Karim", "dora", "Sab", "+99890", "example.com", "zzzz-no-match"]
+
+
+def seed_search_data(children: int, *, batch_size: int = 5000, seed: int = 42) -> None:
+	rng = random.Random(seed)
+	classroom_count = max(1, children // 400)
+	Classroom.objects.bulk_create(
+		[Classroom(name=f"Bench {idx}", age_group="3-6", capacity=500) for idx in range(classroom_count)]
+	)
+	classroom_ids = list(Classroom.objects.filter(name__startswith="Bench ").values_list("id", flat=True))
+	for start in range(0, children, batch_size):
+		size = min(batch_size, children - start)
+		created = Child.objects.bulk_create(
+			[
+				Child(
+					first_name=rng.choice(FIRST_NAMES),
+					last_name=f"{rng.choice(LAST_NAMES)}{'a' if idx % 2 else ''}",
+					birth_date=date(2020, 1 + idx % 12, 1 + idx % 28),
+					classroom_id=rng.choice(classroom_ids),
+				)
+				for idx in range(start, start + size)
+			],
+			batch_size=batch_size,
+		)
+		Guardian.objects.bulk_create(
+			[
+				Guardian(
+					first_name=rng.choice(FIRST_NAMES),
+					last_name=child.last_name,
+					phone=f"+99890{rng.randint(1000000, 9999999)}",
+					email=f"guardian{child.pk}@example.com",
+					child_id=child.pk,
+				)
+				for child in created
+			],
+			batch_size=batch_size,
+		)
+
+
+def benchmark_search(*, repeat: int = 20) -> list[Timing]:
+	"""Time every query against children and guardians with the LIKE and configured backends."""
+	backends = {"like": LikeSearchBackend()}
+	configured = get_search_backend()
+	if not isinstance(configured, LikeSearchBackend):
+		backends[type(configured).__name__] = configured
+	if configured.maintains_index:
+		configured.rebuild()
+
+	timings: list[Timing] = []
+	for label, backend in backends.items():
+		for kind, model in (("child", Child), ("guardian", Guardian)):
+			for q in QUERIES:
+				condition: Q = backend.filter(kind, q)
+				timings.append(
+					measure(
+						f"search.{label}.{kind}[{q}]",
+						lambda condition=condition, model=model: list(
+							model.objects.filter(condition).order_by("last_name", "first_name", "id")[:25]
+						),
+						repeat=repeat,
+					)
+				)
+	return timings
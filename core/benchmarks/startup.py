@@ -0,0 +1,89 @@
+"""First-request latency of a fresh worker process, without and with core.warmup.
+
+`first_requests()` measures the process it runs in, so `measure_first_request`
+starts one process per run. Each page is fetched twice: the first fetch pays
+for whatever start-up left undone, the second is the steady state.
+"""
+
+from __future__ import annotations
+
+import statistics
+import time
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.warmup import warm_up
+
+from . import rolled_back
+
+PROFILES = ("cold", "warm")
+
+# (name, URL name, needs a logged-in user)
+PAGES = (
+	("login", "login", False),
+	("home", "core:home", True),
+	("child_create", "core:child_create", True),
+	("attendance_list", "core:attendance_list", True),
+	("billing_monthly_list", "core:billing_monthly_list", True),
+)
+
+
+@dataclass(frozen=True)
+class FirstRequestResult:
+	profile: str
+	startup_ms: float
+	first_ms: dict[str, float]
+	second_ms: dict[str, float]
+
+	@property
+	def first_total_ms(self) -> float:
+		return round(sum(self.first_ms.values()), 3)
+
+	def as_dict(self) -> dict[str, object]:
+		return {**asdict(self), "first_total_ms": self.first_total_ms}
+
+
+def _get(client: Client, url: str) -> float:
+	started = time.perf_counter()
+	response = client.get(url)
+	elapsed = (time.perf_counter() - started) * 1000
+	if response.status_code != 200:
+		raise RuntimeError(f"{url} returned {response.status_code}")
+	return round(elapsed, 3)
+
+
+def first_requests(profile: str) -> FirstRequestResult:
+	"""Warm up if `profile` is "warm", then fetch every page twice; all writes are rolled back."""
+	started = time.perf_counter()
+	if profile == "warm":
+		warm_up()
+	startup_ms = round((time.perf_counter() - started) * 1000, 3)
+	first: dict[str, float] = {}
+	second: dict[str, float] = {}
+	with rolled_back(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+		user, _ = get_user_model().objects.get_or_create(username="__benchmark__", defaults={"is_staff": True})
+		anonymous, client = Client(), Client()
+		client.force_login(user)
+		for name, url_name, login in PAGES:
+			url = reverse(url_name)
+			first[name] = _get(client if login else anonymous, url)
+			second[name] = _get(client if login else anonymous, url)
+	return FirstRequestResult(profile, startup_ms, first, second)
+
+
+def median_result(results: list[FirstRequestResult]) -> FirstRequestResult:
+	"""Per-page medians over several runs of one profile."""
+
+	def median(values: list[float]) -> float:
+		return round(statistics.median(values), 3)
+
+	return FirstRequestResult(
+		profile=results[0].profile,
+		startup_ms=median([result.startup_ms for result in results]),
+		first_ms={name: median([result.first_ms[name] for result in results]) for name in results[0].first_ms},
+		second_ms={name: median([result.second_ms[name] for result in results]) for name in results[0].second_ms},
+	)
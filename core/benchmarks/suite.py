@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import platform
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import fragment_cache
+from core.models import Attendance, Child, ChildStatus, Classroom, MonthlyBilling, current_billing_month
+from core.reference_cache import bump_version
+from core.services.billing import generate_billing, month_range
+from core.services.proration import prorate_billing
+from core.views import AttendanceListView, MonthlyBillingListView
+
+from . import Timing, measure, rolled_back
+from .search import benchmark_search
+
+SECTIONS = ("views", "fragments", "search", "bulk_mark", "billing")
+
+FRAGMENT_PAGE_SIZES = (25, 500)
+
+
+def _client() -> Client:
+	user, _ = get_user_model().objects.get_or_create(
+		username="__benchmark__", defaults={"is_staff": True}
+	)
+	client = Client()
+	client.force_login(user)
+	return client
+
+
+def _busiest_classroom() -> Classroom | None:
+	return (
+		Classroom.objects.annotate(active=Count("children", filter=Q(children__status=ChildStatus.ACTIVE)))
+		.order_by("-active")
+		.first()
+	)
+
+
+def benchmark_views(client: Client, *, repeat: int) -> list[Timing]:
+	today = timezone.localdate().strftime("%Y-%m-%d")
+	month = current_billing_month()
+	classroom = _busiest_classroom()
+	pages: list[tuple[str, str, dict[str, str]]] = [
+		("view.attendance_list", reverse("core:attendance_list"), {"date": today}),
+		("view.attendance_list[q]", reverse("core:attendance_list"), {"date": today, "q": "Karim"}),
+		("view.billing_monthly_list", reverse("core:billing_monthly_list"), {"month": month}),
+		("view.billing_monthly_list[q]", reverse("core:billing_monthly_list"), {"month": month, "q": "Karim"}),
+		("view.child_list", reverse("core:child_list"), {}),
+		("view.child_list[q]", reverse("core:child_list"), {"q": "Karim"}),
+		("view.guardian_list", reverse("core:guardian_list"), {}),
+		("view.classroom_list", reverse("core:classroom_list"), {}),
+		("view.tariff_list", reverse("core:tariff_list"), {}),
+	]
+	if classroom is not None:
+		pages.append(
+			(
+				"view.attendance_list[classroom]",
+				reverse("core:attendance_list"),
+				{"date": today, "classroom": str(classroom.pk)},
+			)
+		)
+
+	timings = []
+	for name, url, params in pages:
+
+		def fetch(url: str = url, params: dict[str, str] = params) -> None:
+			response = client.get(url, params)
+			if response.status_code != 200:
+				raise RuntimeError(f"{url} returned {response.status_code}")
+
+		timings.append(measure(name, fetch, repeat=repeat))
+	return timings
+
+
+def benchmark_fragments(client: Client, *, repeat: int) -> list[Timing]:
+	"""Attendance and billing lists per FRAGMENT_PAGE_SIZES: re-rendered (miss) and from core.fragment_cache (hit)."""
+	factory = RequestFactory()
+	user = get_user_model().objects.get(pk=client.session["_auth_user_id"])
+	today = timezone.localdate().strftime("%Y-%m-%d")
+	pages = [
+		("attendance_list", AttendanceListView, {"date": today}, fragment_cache.ATTENDANCE),
+		("billing_monthly_list", MonthlyBillingListView, {"month": current_billing_month()}, fragment_cache.BILLING),
+	]
+	timings = []
+	for name, view_class, params, version in pages:
+		for per_page in FRAGMENT_PAGE_SIZES:
+			view = view_class.as_view(paginate_by=per_page)
+
+			def fetch(view=view, params: dict[str, str] = params) -> None:
+				request = factory.get("/", params)
+				request.user = user
+				response = view(request)
+				if response.status_code != 200:
+					raise RuntimeError(f"{view.__name__} returned {response.status_code}")
+
+			def miss(fetch=fetch, version: str = version) -> None:
+				bump_version(version)
+				fetch()
+
+			timings.append(measure(f"fragment.{name}[{per_page}/page].miss", miss, repeat=repeat))
+			timings.append(measure(f"fragment.{name}[{per_page}/page].hit", fetch, repeat=repeat))
+	return timings
+
+
+def benchmark_bulk_mark(client: Client, *, repeat: int) -> list[Timing]:
+	classroom = _busiest_classroom()
+	if classroom is None:
+		return []
+	today = timezone.localdate()
+	child_ids = list(
+		Child.objects.filter(classroom=classroom, status=ChildStatus.ACTIVE).values_list("id", flat=True)[:25]
+	)
+	payload = json.dumps(
+		{
+			"date": today.strftime("%Y-%m-%d"),
+			"items": [{"child_id": child_id, "status": "present", "check_in_time": "08:30"} for child_id in child_ids],
+		}
+	)
+	batch_url = reverse("core:attendance_batch_mark")
+	bulk_url = reverse("core:attendance_bulk_mark_present")
+
+	def batch() -> None:
+		with rolled_back():
+			client.post(batch_url, payload, content_type="application/json")
+
+	def bulk_present() -> None:
+		with rolled_back():
+			client.post(bulk_url, {"date": today.strftime("%Y-%m-%d"), "classroom": str(classroom.pk)})
+
+	return [
+		measure(f"bulk_mark.batch_api[{len(child_ids)}]", batch, repeat=repeat),
+		measure("bulk_mark.classroom_present", bulk_present, repeat=repeat),
+	]
+
+
+def benchmark_billing(*, repeat: int) -> list[Timing]:
+	# A month nobody has billed yet, so every run inserts a full month.
+	latest = MonthlyBilling.objects.order_by("-billing_month").values_list("billing_month", flat=True).first()
+	start = latest or current_billing_month()
+	target = month_range(start, f"{int(start[:4]) + 1:04d}{start[4:]}")[1]
+
+	def run() -> None:
+		with rolled_back():
+			generate_billing(target)
+
+	def prorate() -> None:
+		with rolled_back():
+			prorate_billing(start)
+
+	return [
+		measure(f"billing.generate[{target}]", run, repeat=repeat),
+		measure(f"billing.prorate[{start}]", prorate, repeat=repeat),
+	]
+
+
+def dataset_size() -> dict[str, int]:
+	return {
+		"classrooms": Classroom.objects.count(),
+		"children": Child.objects.count(),
+		"attendance": Attendance.objects.count(),
+		"monthly_billing": MonthlyBilling.objects.count(),
+	}
+
+
+def run_suite(*, repeat: int = 10, sections: tuple[str, ...] = SECTIONS) -> dict[str, object]:
+	"""Time the main code paths against the current database; all writes are rolled back."""
+	results: list[Timing] = []
+	with rolled_back(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+		client = _client()
+		if "views" in sections:
+			results += benchmark_views(client, repeat=repeat)
+		if "fragments" in sections:
+			results += benchmark_fragments(client, repeat=repeat)
+		if "search" in sections:
+			results += benchmark_search(repeat=repeat)
+		if "bulk_mark" in sections:
+			results += benchmark_bulk_mark(client, repeat=repeat)
+		if "billing" in sections:
+			results += benchmark_billing(repeat=max(1, repeat // 3))
+		size = dataset_size()
+
+	return {
+		"meta": {
+			"created_at": timezone.now().replace(microsecond=0).isoformat(),
+			"database": connection.vendor,
+			"django": django.get_version(),
+			"python": platform.python_version(),
+			"repeat": repeat,
+			"dataset": size,
+		},
+		"results": [timing.as_dict() for timing in results],
+	}
+
+
+def compare(current: dict[str, object], baseline: dict[str, object]) -> list[tuple[str, float, float, float]]:
+	"""(name, baseline median, current median, % change) for benchmarks present in both runs."""
+	before = {row["name"]: row["median_ms"] for row in baseline.get("results", [])}
+	rows = []
+	for row in current["results"]:
+		if row["name"] in before and before[row["name"]]:
+			old = before[row["name"]]
+			rows.append((row["name"], old, row["median_ms"], (row["median_ms"] - old) / old * 100))
+	return rows
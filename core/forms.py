@@ -1,72 +1,119 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from dataclasses import dataclass
 from datetime import date
 from typing import Any
 
 from django import forms
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db.models import Q, QuerySet
 from django.utils import timezone
 
 from .models import (
     Attendance,
-    AttendanceStatus,
     Child,
     Classroom,
     Guardian,
+    MonthlyBilling,
+    Payment,
     Tariff,
+    attendance_rule_errors,
 )
+from .fragment_cache import CHILDREN
+from .reference_cache import CLASSROOMS, TARIFFS, classroom_choices, tariff_choices
+from .search import get_search_backend
 
 
-class ClassroomForm(forms.ModelForm):
+class CrispyCacheMixin:
+    """Opts a form into `{{ form|crispy_cached }}` (core.templatetags.crispy_cache).
+
+    Unbound renderings are cached under the field values plus the versions in
+    `crispy_cache_versions`: the tables its choices are read from.
+    """
+
+    crispy_cache_versions: tuple[str, ...] = ()
+
+
+class ClassroomForm(CrispyCacheMixin, forms.ModelForm):
     class Meta:
         model = Classroom
         fields = ["name", "age_group", "capacity"]
 
 
-class ChildForm(forms.ModelForm):
+def validate_phone(phone: str) -> None:
+    if sum(ch.isdigit() for ch in phone) < 7:
+        raise ValidationError("Enter a valid phone number.")
+
+
+def validate_birth_date(birth_date: date) -> None:
+    if birth_date > timezone.localdate():
+        raise ValidationError("Birth date cannot be in the future.")
+
+
+def capacity_error(classroom: Classroom) -> str:
+    return f"{classroom.name} is at full capacity ({classroom.capacity})."
+
+
+class ChildForm(CrispyCacheMixin, forms.ModelForm):
+    crispy_cache_versions = (CLASSROOMS, TARIFFS)
+
     class Meta:
         model = Child
-        fields = ["first_name", "last_name", "birth_date", "classroom", "tariff", "status"]
+        fields = ["first_name", "last_name", "birth_date", "classroom", "tariff", "status", "enrolled_on"]
         widgets = {
             "birth_date": forms.DateInput(attrs={"type": "date"}),
+            "enrolled_on": forms.DateInput(attrs={"type": "date"}),
         }
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Render choices from the reference cache; validation still uses the
+        # field querysets.
+        classroom_field = self.fields["classroom"]
+        classroom_field.choices = [("", classroom_field.empty_label), *classroom_choices()]
+        tariff_field = self.fields["tariff"]
+        tariff_field.choices = [
+            ("", tariff_field.empty_label),
+            *tariff_choices(include_pk=self.instance.tariff_id),
+        ]
+        # Left empty: today for a new child, unchanged for an existing one.
+        self.fields["enrolled_on"].required = False
+
     def clean_birth_date(self) -> date:
         birth_date: date = self.cleaned_data["birth_date"]
-        if birth_date > timezone.localdate():
-            raise ValidationError("Birth date cannot be in the future.")
+        validate_birth_date(birth_date)
         return birth_date
 
+    def clean_enrolled_on(self) -> date:
+        return self.cleaned_data["enrolled_on"] or self.instance.enrolled_on
+
     def clean(self) -> dict[str, Any]:
         cleaned = super().clean()
         classroom: Classroom | None = cleaned.get("classroom")
         if not classroom:
             return cleaned
 
-        qs = Child.objects.filter(classroom=classroom)
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-
-        if qs.count() >= classroom.capacity:
-            raise ValidationError(
-                {"classroom": f"{classroom.name} is at full capacity ({classroom.capacity})."}
-            )
+        # Quick pre-check; the view re-checks under a lock (services.occupancy).
+        occupied = Classroom.objects.with_occupancy().values_list("occupied", flat=True).get(pk=classroom.pk)
+        if self.instance.pk and self.instance.classroom_id == classroom.pk:
+            occupied -= 1
+        if occupied >= classroom.capacity:
+            raise ValidationError({"classroom": capacity_error(classroom)})
 
         return cleaned
 
 
-class GuardianForm(forms.ModelForm):
+class GuardianForm(CrispyCacheMixin, forms.ModelForm):
+    crispy_cache_versions = (CHILDREN,)
+
     class Meta:
         model = Guardian
         fields = ["first_name", "last_name", "phone", "email", "child", "is_primary"]
 
     def clean_phone(self) -> str:
         phone: str = self.cleaned_data["phone"]
-        compact = "".join(ch for ch in phone if ch.isdigit() or ch == "+")
-        if len([ch for ch in compact if ch.isdigit()]) < 7:
-            raise ValidationError("Enter a valid phone number.")
+        validate_phone(phone)
         return phone
 
     def save(self, commit: bool = True) -> Guardian:
@@ -102,18 +149,22 @@ class AttendanceForm(forms.ModelForm):
         status = cleaned.get("status")
         check_in = cleaned.get("check_in_time")
         check_out = cleaned.get("check_out_time")
-        reason = (cleaned.get("absence_reason") or "").strip()
-
-        if check_in and check_out and check_out < check_in:
-            raise ValidationError({"check_out_time": "Check-out must be after check-in."})
+        reason = cleaned.get("absence_reason") or ""
 
-        if status == AttendanceStatus.ABSENT and not reason:
-            raise ValidationError({"absence_reason": "Please provide an absence reason."})
+        errors = attendance_rule_errors(status, check_in, check_out, reason)
+        if errors:
+            raise ValidationError(errors)
 
         return cleaned
 
 
-class TariffForm(forms.ModelForm):
+class ChildImportForm(forms.Form):
+    file = forms.FileField(label="CSV fayl", help_text="UTF-8, birinchi qatorda ustun nomlari.")
+    delimiter = forms.ChoiceField(label="Ajratuvchi", choices=[(",", ","), (";", ";")], initial=",")
+    dry_run = forms.BooleanField(label="Faqat tekshirish", required=False)
+
+
+class TariffForm(CrispyCacheMixin, forms.ModelForm):
 
     class Meta:
         model = Tariff
@@ -123,6 +174,26 @@ class TariffForm(forms.ModelForm):
         }
 
 
+class PaymentForm(forms.ModelForm):
+    """Ledger entry for one billing row; saved through core.services.payments.record_payment."""
+
+    class Meta:
+        model = Payment
+        fields = ["kind", "amount", "method", "guardian", "paid_at", "notes"]
+        widgets = {
+            "paid_at": forms.DateTimeInput(attrs={"type": "datetime-local"}),
+            "notes": forms.Textarea(attrs={"rows": 2}),
+        }
+
+    def __init__(self, *args: Any, billing: MonthlyBilling, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.billing = billing
+        self.fields["guardian"].queryset = Guardian.objects.filter(child_id=billing.child_id)
+        self.fields["paid_at"].required = False
+        if billing.balance > 0:
+            self.fields["amount"].initial = billing.balance
+
+
 @dataclass(frozen=True)
 class SearchQuery:
     q: str
@@ -132,10 +203,48 @@ class SearchQuery:
         raw = (request.GET.get("q") or "").strip()
         return cls(q=raw)
 
+    def filter(self, qs: QuerySet, kind: str, prefix: str = "") -> QuerySet:
+        """Apply the configured search backend; a blank query returns `qs` unchanged."""
+        if not self.q:
+            return qs
+        return qs.filter(get_search_backend().filter(kind, self.q, prefix))
+
+
+@dataclass(frozen=True)
+class ListFilters:
+    """The q/classroom/status filters shared by the attendance and billing lists and exports."""
+
+    q: str = ""
+    classroom: str = ""
+    status: str = ""
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Any]) -> "ListFilters":
+        def clean(name: str) -> str:
+            return str(params.get(name) or "").strip()
+
+        classroom = clean("classroom")
+        return cls(q=clean("q"), classroom=classroom if classroom.isdigit() else "", status=clean("status"))
+
+    @classmethod
+    def from_request(cls, request: Any) -> "ListFilters":
+        return cls.from_params(request.GET)
+
+    def as_params(self) -> dict[str, str]:
+        return {name: value for name, value in vars(self).items() if value}
+
+    def apply(self, qs: QuerySet, kind: str = "child", prefix: str = "child__") -> QuerySet:
+        qs = SearchQuery(q=self.q).filter(qs, kind, prefix=prefix)
+        if self.classroom:
+            qs = qs.filter(**{f"{prefix}classroom_id": self.classroom})
+        if self.status:
+            qs = qs.filter(status=self.status)
+        return qs
+
 
-def classroom_search_filter(q: str) -> Q:
-    return Q(name__icontains=q)
+def classroom_search_filter(q: str, prefix: str = "") -> Q:
+    return get_search_backend().filter("classroom", q, prefix)
 
 
-def child_search_filter(q: str) -> Q:
-    return Q(first_name__icontains=q) | Q(last_name__icontains=q)
+def child_search_filter(q: str, prefix: str = "") -> Q:
+    return get_search_backend().filter("child", q, prefix)
@@ -0,0 +1,117 @@
+"""Rendered HTML of the attendance and billing list tables (rows plus pager).
+
+A fragment is stored under a key made of its template, the page's filters
+and the version of every table it shows (core.reference_cache versions,
+bumped by the writes in core.signals, the Attendance / MonthlyBilling
+querysets and core.services). An unchanged page is served from the cache
+without querying its rows; any write makes the next view render it again.
+The unbound static forms (core.templatetags.crispy_cache) are cached the
+same way.
+
+The row forms carry `{% csrf_token %}`, and tokens are per user: fragments
+are rendered with CSRF_PLACEHOLDER and the requesting user's token is put in
+on the way out. Misses that will be cached read from the primary, never a
+lagging replica. Uses the cache alias in FRAGMENT_CACHE_ALIAS; any backend
+that pickles str works, e.g. local memory or file.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+
+from .reference_cache import get_version
+from .routers import primary_reads
+
+ATTENDANCE = "attendance"
+BILLING = "billing"
+CHILDREN = "child"
+
+# Form fields reject NUL characters, so no rendered value contains this; at
+# worst a stray match would show the requesting user their own token.
+CSRF_PLACEHOLDER = mark_safe("\x00csrf\x00")
+
+
+def _cache():
+	return caches[getattr(settings, "FRAGMENT_CACHE_ALIAS", "default")]
+
+
+def _timeout() -> int:
+	return getattr(settings, "FRAGMENT_CACHE_TIMEOUT", 600)
+
+
+def fragment_key(name: str, versions: Sequence[str], params: Mapping[str, object]) -> str | None:
+	"""Cache key of a fragment, or None while the current transaction has uncommitted writes.
+
+	Such a transaction sees rows that may still roll back, and its writes have
+	already bumped the versions, so what it renders must not be shared.
+	"""
+	if transaction.get_connection().run_on_commit:
+		return None
+	raw = "\n".join(
+		[*(f"{name}={get_version(name)}" for name in versions), *(f"{k}={v}" for k, v in sorted(params.items()))]
+	)
+	return f"core:fragment:{name}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def render_fragment(template_name: str, context: Mapping[str, object]) -> str:
+	return render_to_string(template_name, {**context, "csrf_token": CSRF_PLACEHOLDER})
+
+
+def with_csrf_token(request: HttpRequest, html: str) -> SafeString:
+	return mark_safe(html.replace(CSRF_PLACEHOLDER, get_token(request)))
+
+
+def get_or_set(name: str, versions: Sequence[str], params: Mapping[str, object], render: Callable[[], str]) -> str:
+	"""The cached HTML for `params`; on a miss `render()` runs and its result is stored."""
+	key = fragment_key(name, versions, params)
+	html = _cache().get(key) if key else None
+	if html is None:
+		# A lagging replica must not fill the cache: the version has already moved on.
+		with primary_reads() if key else nullcontext():
+			html = render()
+		if key:
+			_cache().set(key, html, _timeout())
+	return html
+
+
+def get_or_render(
+	request: HttpRequest,
+	template_name: str,
+	versions: Sequence[str],
+	params: Mapping[str, object],
+	build_context: Callable[[], Mapping[str, object]],
+) -> SafeString:
+	"""The cached fragment for `params`; on a miss `build_context()` runs and the result is stored."""
+	html = get_or_set(
+		template_name, versions, params, lambda: render_fragment(template_name, {**params, **build_context()})
+	)
+	return with_csrf_token(request, html)
+
+
+async def aget_or_render(
+	request: HttpRequest,
+	template_name: str,
+	versions: Sequence[str],
+	params: Mapping[str, object],
+	build_context: Callable[[], Awaitable[Mapping[str, object]]],
+) -> SafeString:
+	"""Async `get_or_render()`; `build_context` is a coroutine function."""
+	key = await sync_to_async(fragment_key)(template_name, versions, params)
+	html = await _cache().aget(key) if key else None
+	if html is None:
+		with primary_reads() if key else nullcontext():
+			html = render_fragment(template_name, {**params, **await build_context()})
+		if key:
+			await _cache().aset(key, html, _timeout())
+	return with_csrf_token(request, html)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.db import connections
+
+MAX_SQL_LENGTH = 500
+
+
+@dataclass
+class QueryStats:
+	"""Queries executed while a `record_queries()` block is active."""
+
+	keep_slowest: int = 3
+	count: int = 0
+	total_ms: float = 0.0
+	_slowest: list[tuple[float, int, str]] = field(default_factory=list)
+
+	def add(self, sql: str, duration_ms: float) -> None:
+		self.count += 1
+		self.total_ms += duration_ms
+		if self.keep_slowest <= 0:
+			return
+		# Min-heap of the N slowest; SQL is only truncated when it is kept.
+		entry = (duration_ms, self.count, sql)
+		if len(self._slowest) < self.keep_slowest:
+			heapq.heappush(self._slowest, entry)
+		elif duration_ms > self._slowest[0][0]:
+			heapq.heapreplace(self._slowest, entry)
+
+	@property
+	def slowest(self) -> list[dict[str, object]]:
+		return [
+			{"ms": round(ms, 3), "sql": sql[:MAX_SQL_LENGTH]}
+			for ms, _seq, sql in sorted(self._slowest, reverse=True)
+		]
+
+
+@contextmanager
+def record_queries(keep_slowest: int = 3) -> Iterator[QueryStats]:
+	"""Time every query on every configured database alias for this thread."""
+	stats = QueryStats(keep_slowest=keep_slowest)
+
+	def wrapper(execute, sql, params, many, context):
+		started = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			stats.add(sql, (time.perf_counter() - started) * 1000)
+
+	with ExitStack() as stack:
+		for alias in connections:
+			stack.enter_context(connections[alias].execute_wrapper(wrapper))
+		yield stats
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+	if not sorted_values:
+		return 0.0
+	idx = min(len(sorted_values) - 1, int(round(pct * (len(sorted_values) - 1))))
+	return sorted_values[idx]
+
+
+class RollingHistogram:
+	"""Last `window` observations per view, kept in process memory."""
+
+	def __init__(self, window: int = 500) -> None:
+		self.window = window
+		self._lock = threading.Lock()
+		self._samples: dict[str, deque[tuple[float, float, int]]] = {}
+		self._totals: dict[str, int] = {}
+
+	def observe(self, view_name: str, duration_ms: float, sql_ms: float, queries: int) -> None:
+		with self._lock:
+			samples = self._samples.get(view_name)
+			if samples is None:
+				samples = self._samples[view_name] = deque(maxlen=self.window)
+			samples.append((duration_ms, sql_ms, queries))
+			self._totals[view_name] = self._totals.get(view_name, 0) + 1
+
+	def reset(self) -> None:
+		with self._lock:
+			self._samples.clear()
+			self._totals.clear()
+
+	def snapshot(self) -> dict[str, dict[str, float]]:
+		with self._lock:
+			copied = {name: list(samples) for name, samples in self._samples.items()}
+			totals = dict(self._totals)
+
+		result: dict[str, dict[str, float]] = {}
+		for name, samples in sorted(copied.items()):
+			durations = sorted(sample[0] for sample in samples)
+			sql = sorted(sample[1] for sample in samples)
+			queries = sorted(sample[2] for sample in samples)
+			result[name] = {
+				"requests": totals[name],
+				"window": len(samples),
+				"p50_ms": round(_percentile(durations, 0.50), 3),
+				"p95_ms": round(_percentile(durations, 0.95), 3),
+				"max_ms": round(durations[-1], 3),
+				"sql_p50_ms": round(_percentile(sql, 0.50), 3),
+				"sql_p95_ms": round(_percentile(sql, 0.95), 3),
+				"queries_p50": _percentile(queries, 0.50),
+				"queries_max": queries[-1],
+			}
+		return result
+
+
+histogram = RollingHistogram()
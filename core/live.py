@@ -0,0 +1,221 @@
+"""Pub/sub of attendance changes for the live attendance board (SSE).
+
+Writes publish the changed range — dates plus child ids, or `None` for "any
+child" — never row data; each stream re-reads the rows it shows. Events only
+leave the writer once its transaction commits.
+
+`LocalBroker` fans out to the SSE streams of the current process. With several
+ASGI worker processes on PostgreSQL, `PostgresBroker` carries events over
+LISTEN / NOTIFY so every worker sees every write. Chosen by LIVE_EVENTS_BACKEND.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+if TYPE_CHECKING:
+	from core.services.attendance_summary import SummaryScope
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "core_attendance"
+
+
+@dataclass(frozen=True)
+class AttendanceChange:
+	start: date
+	end: date
+	child_ids: frozenset[int] | None = None
+
+	def covers(self, day: date) -> bool:
+		return self.start <= day <= self.end
+
+	def as_payload(self) -> dict[str, Any]:
+		children = sorted(self.child_ids) if self.child_ids is not None else None
+		return {"start": self.start.isoformat(), "end": self.end.isoformat(), "children": children}
+
+	@classmethod
+	def from_payload(cls, payload: dict[str, Any]) -> "AttendanceChange":
+		children = payload.get("children")
+		return cls(
+			date.fromisoformat(payload["start"]),
+			date.fromisoformat(payload["end"]),
+			frozenset(children) if children is not None else None,
+		)
+
+
+class Subscription:
+	"""Change queue of one SSE stream, bound to the event loop it was opened on."""
+
+	def __init__(self) -> None:
+		self.loop = asyncio.get_running_loop()
+		self.queue: asyncio.Queue[AttendanceChange] = asyncio.Queue()
+
+	def push(self, change: AttendanceChange) -> None:
+		try:
+			self.loop.call_soon_threadsafe(self.queue.put_nowait, change)
+		except RuntimeError:
+			# The stream's loop is gone; it unsubscribes as it unwinds.
+			pass
+
+	async def get(self, timeout: float) -> list[AttendanceChange] | None:
+		"""Wait up to `timeout` seconds, then return every queued change (None on timeout)."""
+		try:
+			first = await asyncio.wait_for(self.queue.get(), timeout)
+		except asyncio.TimeoutError:
+			return None
+		return [first, *self.drain()]
+
+	def drain(self) -> list[AttendanceChange]:
+		changes = []
+		while not self.queue.empty():
+			changes.append(self.queue.get_nowait())
+		return changes
+
+
+class LocalBroker:
+	"""In-process fan-out; publishes on commit of the writing transaction."""
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._subscriptions: set[Subscription] = set()
+
+	def has_listeners(self) -> bool:
+		return bool(self._subscriptions)
+
+	def subscribe(self) -> Subscription:
+		subscription = Subscription()
+		with self._lock:
+			self._subscriptions.add(subscription)
+		return subscription
+
+	def unsubscribe(self, subscription: Subscription) -> None:
+		with self._lock:
+			self._subscriptions.discard(subscription)
+
+	async def atouch(self) -> None:
+		"""Called by every open stream when it subscribes and at least once per heartbeat."""
+
+	def publish(self, change: AttendanceChange) -> None:
+		transaction.on_commit(lambda: self.dispatch(change))
+
+	def dispatch(self, change: AttendanceChange) -> None:
+		with self._lock:
+			subscriptions = list(self._subscriptions)
+		for subscription in subscriptions:
+			subscription.push(change)
+
+
+class PostgresBroker(LocalBroker):
+	"""NOTIFY in the writing transaction; one LISTEN thread per process dispatches locally.
+
+	PostgreSQL delivers notifications only on commit, so no on_commit hook is
+	needed. Payloads stay well below the 8000 byte limit: scopes with more than
+	MAX_SCOPED_CHILDREN children carry no ids.
+
+	A process with open streams keeps `presence_key` alive in the default
+	cache; a writer without streams of its own skips the change scope and the
+	NOTIFY unless the key is set. With several worker processes the cache must
+	be shared (CACHE_URL), as for the fragment cache.
+	"""
+
+	reconnect_delay = 5.0
+	presence_key = "core:live:listeners"
+	# Refreshed every third of this at most, and each stream touches at least once per heartbeat.
+	presence_timeout = 60.0
+
+	def __init__(self) -> None:
+		super().__init__()
+		self._listener: threading.Thread | None = None
+		self._touched = 0.0
+
+	def has_listeners(self) -> bool:
+		return bool(self._subscriptions) or cache.get(self.presence_key) is not None
+
+	async def atouch(self) -> None:
+		now = time.monotonic()
+		if now - self._touched < self.presence_timeout / 3:
+			return
+		self._touched = now
+		await cache.aset(self.presence_key, True, self.presence_timeout)
+
+	def subscribe(self) -> Subscription:
+		with self._lock:
+			if self._listener is None:
+				self._listener = threading.Thread(target=self._listen, name="attendance-listen", daemon=True)
+				self._listener.start()
+		return super().subscribe()
+
+	def publish(self, change: AttendanceChange) -> None:
+		with connection.cursor() as cursor:
+			cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, json.dumps(change.as_payload())])
+
+	def _listen(self) -> None:
+		while True:
+			try:
+				raw = connection.get_new_connection(connection.get_connection_params())
+				raw.autocommit = True
+				with raw.cursor() as cursor:
+					cursor.execute(f"LISTEN {CHANNEL}")
+				for payload in self._notifications(raw):
+					self.dispatch(AttendanceChange.from_payload(json.loads(payload)))
+			except Exception:
+				logger.exception("Attendance LISTEN connection failed; reconnecting.")
+				time.sleep(self.reconnect_delay)
+
+	@staticmethod
+	def _notifications(raw: Any):
+		if callable(getattr(raw, "notifies", None)):
+			# psycopg 3
+			for notify in raw.notifies():
+				yield notify.payload
+			return
+		# psycopg2
+		while True:
+			select.select([raw], [], [], 60)
+			raw.poll()
+			while raw.notifies:
+				yield raw.notifies.pop(0).payload
+
+
+_broker: LocalBroker | None = None
+_broker_lock = threading.Lock()
+
+
+def _load_broker(path: str, vendor: str) -> LocalBroker:
+	if path == "auto":
+		return PostgresBroker() if vendor == "postgresql" else LocalBroker()
+	return import_string(path)()
+
+
+def get_broker() -> LocalBroker:
+	"""The process-wide broker (subscriptions live on it, so it is created once)."""
+	global _broker
+	with _broker_lock:
+		if _broker is None:
+			_broker = _load_broker(getattr(settings, "LIVE_EVENTS_BACKEND", "auto"), connection.vendor)
+		return _broker
+
+
+def publish_attendance_change(scope: "SummaryScope | None") -> None:
+	"""Announce that attendance rows in `scope` changed (no-op without listeners)."""
+	if scope is None:
+		return
+	broker = get_broker()
+	if not broker.has_listeners():
+		return
+	child_ids = scope.child_ids if isinstance(scope.child_ids, (set, frozenset)) else None
+	broker.publish(AttendanceChange(scope.start, scope.end, frozenset(child_ids) if child_ids is not None else None))
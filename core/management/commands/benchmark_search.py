@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import rolled_back
+from core.benchmarks.search import benchmark_search, seed_search_data
+
+
+class Command(BaseCommand):
+    help = "Qidiruv tezligini o‘lchash (sintetik maʼlumotlar; tranzaksiya oxirida bekor qilinadi)."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--children", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--output", help="Natijalarni JSON faylga yozish.")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            seed_search_data(options["children"])
+            timings = benchmark_search(repeat=options["repeat"])
+
+        for timing in timings:
+            self.stdout.write(f"{timing.name:<55} median {timing.median_ms:>9.3f} ms  p95 {timing.p95_ms:>9.3f} ms")
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(
+                    {"children": options["children"], "results": [t.as_dict() for t in timings]},
+                    fh,
+                    indent=2,
+                )
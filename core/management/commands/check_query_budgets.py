@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core.benchmarks import rolled_back
+from core.benchmarks.query_budget import format_report, run_budgets
+
+
+class Command(BaseCommand):
+    help = (
+        "core/urls.py dagi har bir GET sahifa uchun so‘rovlar soni va vaqtini ikki xil hajmdagi "
+        "demo maʼlumotda o‘lchash (so‘rovlar soni o‘zgarmasligi kerak). Barcha yozuvlar bekor qilinadi."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--output", help="Jadvalni faylga yozish.")
+
+    def handle(self, *args, **options):
+        with rolled_back(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            results = run_budgets()
+        report = format_report(results)
+        self.stdout.write(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(report + "\n")
+
+        failed = [row.name for row in results if not row.ok]
+        if failed:
+            raise CommandError(f"So‘rovlar byudjeti buzildi: {', '.join(failed)}")
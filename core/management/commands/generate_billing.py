@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import current_billing_month
+from core.services.billing import generate_billing
+
+
+class Command(BaseCommand):
+    help = "Faol bolalar uchun yetishmayotgan oylik to‘lov yozuvlarini yaratish (tarif bo‘yicha)."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--month", help="Boshlanish oyi (YYYY-MM). Standart: joriy oy.")
+        parser.add_argument("--through", help="Tugash oyi (YYYY-MM). Standart: --month.")
+
+    def handle(self, *args, **options):
+        month = options["month"] or current_billing_month()
+        try:
+            result = generate_billing(month, options["through"])
+        except ValidationError as exc:
+            raise CommandError("; ".join(exc.messages)) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Oylik to‘lovlar yaratildi: {result.created} ta "
+                f"({result.months[0]} – {result.months[-1]}, {result.elapsed:.3f} s)."
+            )
+        )
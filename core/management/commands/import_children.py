@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.importer import COLUMNS, DEFAULT_CHUNK_SIZE, import_children_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Bolalar, vasiylar va guruhlarni CSV fayldan ommaviy import qilish. "
+        f"Ustunlar: {', '.join(COLUMNS)}."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("path", help="CSV fayl (UTF-8).")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--delimiter", default=",")
+        parser.add_argument("--dry-run", action="store_true", help="Faqat tekshirish, bazaga yozmaslik.")
+        parser.add_argument("--errors", help="Xatolar hisobotini shu CSV faylga yozish.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as fh:
+                result = import_children_csv(
+                    fh,
+                    chunk_size=options["chunk_size"],
+                    dry_run=options["dry_run"],
+                    delimiter=options["delimiter"],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc)) from exc
+        except ValidationError as exc:
+            raise CommandError("; ".join(exc.messages)) from exc
+
+        if options["errors"]:
+            with open(options["errors"], "w", encoding="utf-8", newline="") as fh:
+                result.write_error_report(fh)
+        else:
+            for error in result.errors[:20]:
+                self.stderr.write(f"{error.line}-qator, {error.field}: {error.message}")
+            if len(result.errors) > 20:
+                self.stderr.write(f"... yana {len(result.errors) - 20} ta xato (--errors bilan to‘liq hisobot).")
+
+        prefix = "Tekshiruv (bazaga yozilmadi)" if result.dry_run else "Import tugadi"
+        message = (
+            f"{prefix}: {result.rows} qator, {result.children} bola, {result.guardians} vasiy, "
+            f"{result.classrooms} yangi guruh, {result.failed_rows} xato qator ({result.elapsed:.2f} s)."
+        )
+        self.stdout.write(self.style.WARNING(message) if result.errors else self.style.SUCCESS(message))
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.benchmarks.loadtest import MODES, LoadResult, drop_off_workload, restored_attendance, run_load_test
+from core.models import Attendance
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError as exc:
+        raise CommandError(f"Sana YYYY-MM-DD formatida bo‘lishi kerak: {value}") from exc
+
+
+class Command(BaseCommand):
+    help = (
+        "Davomat sahifasi va tezkor belgilash uchun WSGI va ASGI o‘tkazuvchanligini solishtirish "
+        "(ertalabki kelish vaqti yuklamasi). Belgilangan yozuvlar oxirida tiklanadi."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--mode", choices=[*MODES, "both"], default="both")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--children", type=int, default=200, help="Shuncha davomat yozuvi belgilanadi.")
+        parser.add_argument("--date", help="YYYY-MM-DD (standart: bugun).")
+        parser.add_argument("--output", help="Natijalarni JSON faylga yozish.")
+        parser.add_argument("--json", action="store_true", help="Natijani JSON qatori sifatida chiqarish.")
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            help="Xatolar soni bundan oshsa, buyruq xato bilan tugaydi (masalan, CI’da 0).",
+        )
+
+    def handle(self, *args, **options):
+        if options["mode"] == "both":
+            # ASYNC_VIEWS is read when the URLconf loads: one process per mode.
+            results = [self._run_in_subprocess(mode, options) for mode in MODES]
+        else:
+            results = [self._run(options)]
+
+        if options["json"]:
+            self.stdout.write(json.dumps([result.as_dict() for result in results]))
+        else:
+            self._report(results, options)
+        if options["max_errors"] is not None:
+            failed = [f"{result.mode}: {result.errors}" for result in results if result.errors > options["max_errors"]]
+            if failed:
+                raise CommandError(f"Xatolar soni {options['max_errors']} dan oshdi ({', '.join(failed)}).")
+
+    def _report(self, results: list[LoadResult], options) -> None:
+        for result in results:
+            self.stdout.write(
+                f"{result.mode:<5} ({result.views} views, {result.concurrency} parallel)  "
+                f"{result.throughput:>8.1f} req/s  p50 {result.p50_ms:>8.3f} ms  p95 {result.p95_ms:>8.3f} ms  "
+                f"max {result.max_ms:>8.3f} ms  errors {result.errors}/{result.requests}"
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump([result.as_dict() for result in results], fh, indent=2)
+
+    def _run(self, options) -> LoadResult:
+        day = _parse_day(options["date"]) if options["date"] else timezone.localdate()
+        ids = list(
+            Attendance.objects.filter(attendance_date=day).order_by("id").values_list("id", flat=True)[: options["children"]]
+        )
+        if not ids:
+            raise CommandError(f"{day} uchun davomat yozuvlari yo‘q (avval: materialize_attendance yoki seed_demo_data).")
+        workload = drop_off_workload(ids, day, options["requests"])
+        with restored_attendance(ids):
+            return run_load_test(options["mode"], workload, concurrency=options["concurrency"])
+
+    def _run_in_subprocess(self, mode: str, options) -> LoadResult:
+        command = [
+            sys.executable,
+            str(settings.BASE_DIR / "manage.py"),
+            "loadtest_attendance",
+            "--mode",
+            mode,
+            "--json",
+            f"--requests={options['requests']}",
+            f"--concurrency={options['concurrency']}",
+            f"--children={options['children']}",
+        ]
+        if options["date"]:
+            command.append(f"--date={options['date']}")
+        env = {**os.environ, "ASYNC_VIEWS": "1" if mode == "asgi" else "0"}
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        if proc.returncode:
+            raise CommandError(proc.stderr.strip() or f"{mode} load test failed")
+        (row,) = json.loads(proc.stdout.strip().splitlines()[-1])
+        row.pop("throughput")
+        return LoadResult(**row)
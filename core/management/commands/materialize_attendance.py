@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.services.attendance import materialize_attendance
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError as exc:
+        raise CommandError(f"Sana YYYY-MM-DD formatida bo‘lishi kerak: {value}") from exc
+
+
+class Command(BaseCommand):
+    help = "Faol bolalar uchun yetishmayotgan 'Kutilmoqda' davomat yozuvlarini yaratish (cron uchun)."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--date", help="Boshlanish sanasi (YYYY-MM-DD). Standart: bugun.")
+        parser.add_argument("--through", help="Tugash sanasi (YYYY-MM-DD). Standart: --date.")
+        parser.add_argument("--classroom", type=int, help="Faqat shu guruh uchun.")
+
+    def handle(self, *args, **options):
+        start = _parse_day(options["date"]) if options["date"] else timezone.localdate()
+        end = _parse_day(options["through"]) if options["through"] else start
+        if end < start:
+            raise CommandError("--through sanasi --date dan oldin bo‘lishi mumkin emas.")
+
+        result = materialize_attendance(start, end, classroom_id=options["classroom"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Davomat yozuvlari yaratildi: {result.created} ta "
+                f"({result.days} kun, {result.elapsed:.3f} s)."
+            )
+        )
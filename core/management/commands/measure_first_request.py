@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.startup import PROFILES, FirstRequestResult, first_requests, median_result
+
+
+class Command(BaseCommand):
+    help = (
+        "Yangi worker jarayonining birinchi so‘rovlari kechikishini o‘lchash: shablonlarni oldindan "
+        "yuklamasdan (cold) va core.warmup bilan (warm). Har bir o‘lchov alohida jarayonda bajariladi."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--profile", choices=[*PROFILES, "both"], default="both")
+        parser.add_argument("--repeat", type=int, default=3, help="Har bir profil uchun jarayonlar soni.")
+        parser.add_argument("--output", help="Natijalarni JSON faylga yozish.")
+        parser.add_argument("--json", action="store_true", help="Natijani JSON qatori sifatida chiqarish.")
+        parser.add_argument("--in-process", action="store_true", help="Joriy jarayonda bir marta o‘lchash (ichki).")
+
+    def handle(self, *args, **options):
+        profiles = PROFILES if options["profile"] == "both" else (options["profile"],)
+        if options["in_process"]:
+            results = [first_requests(profile) for profile in profiles]
+        else:
+            results = [
+                median_result([self._run_in_subprocess(profile) for _ in range(max(1, options["repeat"]))])
+                for profile in profiles
+            ]
+
+        if options["json"]:
+            self.stdout.write(json.dumps([result.as_dict() for result in results]))
+            return
+        for result in results:
+            pages = "  ".join(
+                f"{name} {result.first_ms[name]:.1f}/{result.second_ms[name]:.1f}" for name in result.first_ms
+            )
+            self.stdout.write(
+                f"{result.profile:<5} start-up {result.startup_ms:>8.1f} ms  "
+                f"first requests {result.first_total_ms:>8.1f} ms  (1st/2nd ms: {pages})"
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump([result.as_dict() for result in results], fh, indent=2)
+
+    def _run_in_subprocess(self, profile: str) -> FirstRequestResult:
+        command = [
+            sys.executable,
+            str(settings.BASE_DIR / "manage.py"),
+            "measure_first_request",
+            "--in-process",
+            "--json",
+            f"--profile={profile}",
+        ]
+        # A private cache, so no run reuses the form HTML another run stored.
+        env = {**os.environ, "CACHE_URL": "locmem://"}
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        if proc.returncode:
+            raise CommandError(proc.stderr.strip() or f"{profile} run failed")
+        (row,) = json.loads(proc.stdout.strip().splitlines()[-1])
+        row.pop("first_total_ms")
+        return FirstRequestResult(**row)
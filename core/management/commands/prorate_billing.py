@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import current_billing_month
+from core.services.billing import month_range
+from core.services.proration import DEFAULT_BATCH_SIZE, prorate_billing
+
+
+class Command(BaseCommand):
+    help = (
+        "To‘lanmagan oylik to‘lov summalarini qabul qilingan sana va davomat bo‘yicha qayta hisoblash "
+        "(BILLING_* sozlamalari)."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--month", help="Boshlanish oyi (YYYY-MM). Standart: joriy oy.")
+        parser.add_argument("--through", help="Tugash oyi (YYYY-MM). Standart: --month.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        month = options["month"] or current_billing_month()
+        try:
+            months = month_range(month, options["through"])
+        except ValidationError as exc:
+            raise CommandError("; ".join(exc.messages)) from exc
+
+        for billing_month in months:
+            result = prorate_billing(billing_month, batch_size=options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{result.month}: {result.rows} ta yozuv, {result.updated} ta summa o‘zgardi "
+                    f"({result.elapsed:.3f} s)."
+                )
+            )
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.attendance_summary import next_month, rebuild_attendance_summary
+from core.services.billing import month_range
+
+
+class Command(BaseCommand):
+    help = "Oylik davomat jamlanmasini (AttendanceMonthlySummary) davomat yozuvlaridan qayta qurish."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--month", help="Boshlanish oyi (YYYY-MM). Standart: davomatdagi eng birinchi oy.")
+        parser.add_argument("--through", help="Tugash oyi (YYYY-MM). Standart: --month yoki oxirgi oy.")
+
+    def handle(self, *args, **options):
+        start = end = None
+        if options["month"] or options["through"]:
+            try:
+                months = month_range(options["month"] or options["through"], options["through"])
+            except ValidationError as exc:
+                raise CommandError("; ".join(exc.messages)) from exc
+            start = date.fromisoformat(f"{months[0]}-01")
+            end = next_month(date.fromisoformat(f"{months[-1]}-01")) - date.resolution
+
+        result = rebuild_attendance_summary(start, end)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Oylik davomat jamlanmasi qayta qurildi: {result.months} oy, {result.rows} ta qator "
+                f"({result.elapsed:.3f} s)."
+            )
+        )
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Qidiruv indeksini qayta qurish (bulk_create/update kabi signalsiz yozuvlardan so‘ng)."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if not backend.maintains_index:
+            self.stdout.write(f"{type(backend).__name__}: alohida indeks talab qilinmaydi.")
+            return
+        total = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Qidiruv indeksi qayta qurildi: {total} ta yozuv."))
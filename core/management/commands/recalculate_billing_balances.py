@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.models import MonthlyBilling
+from core.services.payments import recalculate_balances
+
+
+class Command(BaseCommand):
+    help = "Oylik to‘lovlarning to‘langan summa / qoldiq / holatini to‘lovlar jurnalidan qayta hisoblash."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--month", help="Faqat shu oy (YYYY-MM). Standart: barcha oylar.")
+
+    def handle(self, *args, **options):
+        qs = MonthlyBilling.objects.all()
+        if options["month"]:
+            qs = qs.filter(billing_month=options["month"])
+        updated = recalculate_balances(qs)
+        self.stdout.write(self.style.SUCCESS(f"Qayta hisoblandi: {updated} ta yozuv."))
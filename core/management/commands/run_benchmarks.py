@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.suite import SECTIONS, compare, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Asosiy sahifalar, qidiruv, ommaviy belgilash va to‘lov generatsiyasi tezligini joriy bazada o‘lchash "
+        "(avval: seed_demo_data --scale production). Barcha yozuvlar bekor qilinadi."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--only", nargs="+", choices=SECTIONS, help="Faqat shu bo‘limlar.")
+        parser.add_argument("--output", help="Natijalarni JSON faylga yozish.")
+        parser.add_argument("--baseline", help="Oldingi JSON natija bilan solishtirish.")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="Median shu foizdan ko‘proq sekinlashsa, xato bilan tugatish (--baseline bilan).",
+        )
+
+    def handle(self, *args, **options):
+        report = run_suite(repeat=options["repeat"], sections=tuple(options["only"] or SECTIONS))
+
+        self.stdout.write(f"Dataset: {report['meta']['dataset']}")
+        for row in report["results"]:
+            self.stdout.write(
+                f"{row['name']:<55} median {row['median_ms']:>9.3f} ms  p95 {row['p95_ms']:>9.3f} ms"
+                f"  queries {row['queries']}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as fh:
+                baseline = json.load(fh)
+            regressions = []
+            for name, old, new, change in compare(report, baseline):
+                self.stdout.write(f"{name:<55} {old:>9.3f} -> {new:>9.3f} ms ({change:+.1f}%)")
+                if options["max_regression"] is not None and change > options["max_regression"]:
+                    regressions.append(name)
+            if regressions:
+                raise CommandError(f"Sekinlashish aniqlandi: {', '.join(regressions)}")
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ExportJob, ExportJobStatus
+from core.services.export import claim_export_job, run_export_job, runnable_export_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Navbatdagi eksportlarni bajarish (cron uchun). To‘xtab qolgan ishlar oxirgi "
+        "saqlangan nuqtadan davom ettiriladi."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--job", type=int, help="Faqat shu eksport (ID).")
+        parser.add_argument("--chunk-size", type=int, help="Har bir so‘rovdagi qatorlar soni.")
+        parser.add_argument("--max-chunks", type=int, help="Har bir eksport uchun ko‘pi bilan shuncha bo‘lak.")
+
+    def handle(self, *args, **options):
+        if options["job"]:
+            jobs = list(ExportJob.objects.filter(pk=options["job"]).exclude(status=ExportJobStatus.DONE))
+            if not jobs:
+                raise CommandError(f"Bajariladigan eksport topilmadi: {options['job']}")
+        else:
+            jobs = list(runnable_export_jobs())
+
+        for job in jobs:
+            if not claim_export_job(job):
+                continue
+            try:
+                run_export_job(job, chunk_size=options["chunk_size"], max_chunks=options["max_chunks"])
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f"#{job.pk}: {exc}"))
+                continue
+            if job.status == ExportJobStatus.DONE:
+                self.stdout.write(self.style.SUCCESS(f"#{job.pk}: {job.rows_written} qator -> {job.file_name}"))
+            else:
+                self.stdout.write(f"#{job.pk}: {job.rows_written} qator yozildi, davom ettiriladi.")
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import math
 import random
-from datetime import date, timedelta
+from dataclasses import dataclass
+from datetime import timedelta
 from decimal import Decimal
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Count, F
 from django.utils import timezone
 
 from core.models import (
@@ -20,6 +23,11 @@ from core.models import (
     MonthlyBillingStatus,
     Tariff,
 )
+from core.search import get_search_backend
+from core.services.attendance import materialize_attendance
+from core.services.attendance_summary import rebuild_attendance_summary, summary_paused
+from core.services.billing import generate_billing, recent_months
+from core.services.payments import record_payment, settle_billing
 
 
 FIRST_NAMES = [
@@ -55,132 +63,142 @@ LAST_NAMES = [
 PHONE_PREFIXES = ["+998"]
 
 
+@dataclass(frozen=True)
+class Scale:
+    classrooms: int
+    children: int
+    days: int
+    months: int
+
+
+SCALES = {
+    "small": Scale(classrooms=3, children=15, days=7, months=2),
+    "medium": Scale(classrooms=10, children=2_000, days=30, months=6),
+    "production": Scale(classrooms=50, children=20_000, days=365, months=24),
+}
+
+
 class Command(BaseCommand):
     help = "Demo maʼlumotlar (guruhlar, bolalar, vasiylar, tariflar, davomat, oylik to‘lovlar) yaratish."
 
     def add_arguments(self, parser) -> None:
-        parser.add_argument("--classrooms", type=int, default=3)
-        parser.add_argument("--children", type=int, default=15)
+        parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+        parser.add_argument("--classrooms", type=int, help="Guruhlar soni (--scale qiymatini almashtiradi).")
+        parser.add_argument("--children", type=int, help="Bolalar soni (--scale qiymatini almashtiradi).")
+        parser.add_argument("--days", type=int, help="Davomat kunlari soni.")
+        parser.add_argument("--months", type=int, help="Oylik to‘lov oylari soni.")
+        parser.add_argument("--batch-size", type=int, default=2_000)
+        parser.add_argument("--seed", type=int, help="Tasodifiy sonlar generatori uchun seed.")
 
     @transaction.atomic
     def handle(self, *args, **options):
-        classrooms_count: int = options["classrooms"]
-        children_count: int = options["children"]
-
-        classrooms = self._create_classrooms(classrooms_count)
-        self._create_children_and_guardians(classrooms, children_count)
+        scale = SCALES[options["scale"]]
+        classrooms_count: int = options["classrooms"] or scale.classrooms
+        children_count: int = options["children"] or scale.children
+        days: int = options["days"] or scale.days
+        months: int = options["months"] or scale.months
+        self.batch_size: int = options["batch_size"]
+        self.rng = random.Random(options["seed"])
 
         tariffs = self._create_tariffs()
+        capacity = math.ceil(children_count / max(classrooms_count, 1) * 1.1)
+        classrooms = self._create_classrooms(classrooms_count, min_capacity=capacity)
+        self._create_children(classrooms, tariffs, children_count)
         self._assign_tariffs_to_children(tariffs)
+        self._ensure_guardians_for_children()
         self._create_authorized_pickups()
-        self._create_attendance_seed(days=7)
-        self._create_monthly_billing_seed(months=2)
+        self._create_attendance_seed(days=days)
+        self._create_monthly_billing_seed(months=months)
+
+        backend = get_search_backend()
+        if backend.maintains_index:
+            backend.rebuild()
 
         self.stdout.write(self.style.SUCCESS("Demo maʼlumotlar yaratildi."))
 
     def _create_attendance_seed(self, *, days: int) -> None:
-        """Oxirgi `days` kun uchun davomat yozuvlarini yaratadi (kutilmoqda holati bilan)."""
+        """Oxirgi `days` kun uchun davomat yozuvlarini yaratadi; o‘tgan kunlar belgilab qo‘yiladi."""
         today = timezone.localdate()
-        active_children = Child.objects.filter(status=ChildStatus.ACTIVE)
-        if not active_children.exists():
+        if not Child.objects.filter(status=ChildStatus.ACTIVE).exists():
             self.stdout.write(self.style.WARNING("Faol bolalar topilmadi; davomat yaratilmadi."))
             return
 
-        created = 0
-        for offset in range(days):
-            d = today - timedelta(days=offset)
-            for child in active_children:
-                _, was_created = Attendance.objects.get_or_create(
-                    child=child,
-                    attendance_date=d,
-                    defaults={"status": AttendanceStatus.EXPECTED},
-                )
-                if was_created:
-                    created += 1
+        start = today - timedelta(days=days - 1)
+        # Har bir UPDATE uchun oylik jamlanma yangilanmaydi; oraliq oxirida bir marta qayta quriladi.
+        with summary_paused():
+            result = materialize_attendance(start, today)
+
+            # O‘tgan kunlarni id bo‘yicha taqsimlab belgilaymiz (bitta UPDATE har holat uchun).
+            past = Attendance.objects.filter(
+                attendance_date__gte=start,
+                attendance_date__lt=today,
+                status=AttendanceStatus.EXPECTED,
+            ).annotate(bucket=F("id") % 20)
+            past.filter(bucket__lt=14).update(status=AttendanceStatus.PRESENT)
+            past.filter(bucket__in=[14, 15]).update(status=AttendanceStatus.LATE)
+            past.filter(bucket__in=[16, 17]).update(status=AttendanceStatus.HALF_DAY)
+            past.filter(bucket__gte=18).update(status=AttendanceStatus.ABSENT, absence_reason="Kasal")
+        summary = rebuild_attendance_summary(start, today)
 
-        self.stdout.write(self.style.SUCCESS(f"Davomat yaratildi: {created} ta yozuv (oxirgi {days} kun)."))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Davomat yaratildi: {result.created} ta yozuv (oxirgi {days} kun, {result.elapsed:.1f} s); "
+                f"oylik jamlanma: {summary.rows} ta qator."
+            )
+        )
 
     def _create_monthly_billing_seed(self, *, months: int) -> None:
         """Joriy oy va oldingi oylar uchun oylik to'lov yozuvlarini yaratadi."""
         today = timezone.localdate()
-        active_children = list(Child.objects.filter(status=ChildStatus.ACTIVE).select_related("tariff"))
-        if not active_children:
+        if not Child.objects.filter(status=ChildStatus.ACTIVE).exists():
             self.stdout.write(self.style.WARNING("Faol bolalar topilmadi; oylik to‘lovlar yaratilmadi."))
             return
 
-        created_rows = 0
-        months_seeded: list[str] = []
-
-        for m in range(months):
-            # Build YYYY-MM going backwards.
-            y = today.year
-            mo = today.month - m
-            while mo <= 0:
-                mo += 12
-                y -= 1
-            billing_month = f"{y:04d}-{mo:02d}"
-            months_seeded.append(billing_month)
-
-            for child in active_children:
-                default_amount = child.tariff.amount if child.tariff else Decimal("500")
-                _, created = MonthlyBilling.objects.get_or_create(
-                    child=child,
-                    billing_month=billing_month,
-                    defaults={"amount": default_amount, "status": MonthlyBillingStatus.UNPAID},
-                )
-                if created:
-                    created_rows += 1
-
-        # Demo uchun bir nechta yozuvni "To‘langan" qilib belgilab qo'yamiz.
-        if created_rows:
-            to_mark = max(1, created_rows // 4)
-            ids = list(
-                MonthlyBilling.objects.filter(billing_month=months_seeded[0])
-                .order_by("id")
-                .values_list("id", flat=True)[:to_mark]
-            )
-            if ids:
-                MonthlyBilling.objects.filter(id__in=ids).update(
-                    status=MonthlyBillingStatus.PAID,
-                    paid_at=timezone.now(),
-                )
+        current = today.strftime("%Y-%m")
+        months_seeded = recent_months(months, current)
+        result = generate_billing(months_seeded[0], current)
+
+        # Demo uchun: o‘tgan oylarning ko‘pchiligi, joriy oyning chorak qismi "To‘langan",
+        # yana bir chorak qismi qisman to‘langan.
+        unpaid = MonthlyBilling.objects.filter(
+            billing_month__in=months_seeded, status=MonthlyBillingStatus.UNPAID
+        ).annotate(bucket=F("id") % 4)
+        settle_billing(unpaid.filter(billing_month__lt=current).exclude(bucket=0))
+        settle_billing(unpaid.filter(billing_month=current, bucket=0))
+        partial = unpaid.filter(billing_month=current, bucket=1, amount__gt=0)
+        for row in partial[:200]:
+            record_payment(row, (row.amount / 2).quantize(Decimal("1")))
 
-        months_text = ", ".join(months_seeded)
         self.stdout.write(
             self.style.SUCCESS(
-                f"Oylik to‘lovlar yaratildi: {created_rows} ta yozuv ({months_text})."
+                f"Oylik to‘lovlar yaratildi: {result.created} ta yozuv "
+                f"({months_seeded[0]} – {months_seeded[-1]})."
             )
         )
 
     def _create_authorized_pickups(self) -> None:
-        """Har bir bola uchun kamida 1 ta ruxsat etilgan olib ketuvchi shaxsni yaratadi."""
-        children = list(Child.objects.all())
-        if not children:
-            self.stdout.write(self.style.WARNING("Bolalar topilmadi; ruxsat etilgan olib ketuvchilar yaratilmadi."))
-            return
-
+        """Olib ketuvchisi yo‘q har bir bola uchun 1 ta ruxsat etilgan shaxs yaratadi."""
         defaults = [
             ("Oybek Karimov", "Amaki", "+998901234567"),
             ("Dilnoza Rahmonova", "Xola", "+998931112233"),
             ("Javohir Saidov", "Bobo", "+998991234321"),
         ]
-
-        created = 0
-        for child in children:
-            if AuthorizedPickup.objects.filter(child=child).exists():
-                continue
-            full_name, relationship, phone = random.choice(defaults)
-            AuthorizedPickup.objects.create(
-                child=child,
-                full_name=full_name,
-                relationship=relationship,
-                phone=phone,
-                id_document_number="AA1234567",
-                is_active=True,
+        child_ids = Child.objects.filter(authorized_pickups__isnull=True).values_list("id", flat=True)
+        pickups = []
+        for child_id in child_ids.iterator(chunk_size=self.batch_size):
+            full_name, relationship, phone = self.rng.choice(defaults)
+            pickups.append(
+                AuthorizedPickup(
+                    child_id=child_id,
+                    full_name=full_name,
+                    relationship=relationship,
+                    phone=phone,
+                    id_document_number="AA1234567",
+                    is_active=True,
+                )
             )
-            created += 1
-
-        self.stdout.write(self.style.SUCCESS(f"Olib ketuvchilar yaratildi: {created} ta."))
+        AuthorizedPickup.objects.bulk_create(pickups, batch_size=self.batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Olib ketuvchilar yaratildi: {len(pickups)} ta."))
 
     def _create_tariffs(self) -> list[Tariff]:
         defaults = [
@@ -204,22 +222,20 @@ class Command(BaseCommand):
         return tariffs
 
     def _assign_tariffs_to_children(self, tariffs: list[Tariff]) -> None:
+        """Tarifi yo‘q faol bolalarga tarif biriktiradi (har bir tarif uchun bitta UPDATE)."""
         if not tariffs:
             return
-        active_children = list(Child.objects.filter(status=ChildStatus.ACTIVE))
-        if not active_children:
-            return
+        without = Child.objects.filter(status=ChildStatus.ACTIVE, tariff__isnull=True).annotate(
+            bucket=F("id") % len(tariffs)
+        )
         assigned = 0
-        for child in active_children:
-            if child.tariff_id:
-                continue
-            child.tariff = random.choice(tariffs)
-            child.save(update_fields=["tariff", "updated_at"])
-            assigned += 1
+        for idx, tariff in enumerate(tariffs):
+            assigned += without.filter(bucket=idx).update(tariff=tariff, updated_at=timezone.now())
 
-        self.stdout.write(self.style.SUCCESS(f"Tarif biriktirildi: {assigned} ta faol bola (tarifi bo‘lmaganlariga)."))
+        if assigned:
+            self.stdout.write(self.style.SUCCESS(f"Tarif biriktirildi: {assigned} ta faol bola (tarifi bo‘lmaganlariga)."))
 
-    def _create_classrooms(self, count: int) -> list[Classroom]:
+    def _create_classrooms(self, count: int, *, min_capacity: int) -> list[Classroom]:
         defaults = [
             ("Quyoshgullar", "3-4 yosh", 10),
             ("Kamalak", "4-5 yosh", 12),
@@ -229,92 +245,87 @@ class Command(BaseCommand):
         classrooms: list[Classroom] = []
         for idx in range(count):
             name, age_group, capacity = defaults[idx % len(defaults)]
+            capacity = max(capacity, min_capacity)
             classroom, _ = Classroom.objects.get_or_create(
                 name=f"{name} {idx + 1}" if idx >= len(defaults) else name,
                 defaults={"age_group": age_group, "capacity": capacity},
             )
-            if classroom.age_group != age_group or classroom.capacity != capacity:
+            if classroom.age_group != age_group or classroom.capacity < capacity:
                 classroom.age_group = age_group
                 classroom.capacity = capacity
                 classroom.save(update_fields=["age_group", "capacity", "updated_at"])
             classrooms.append(classroom)
         return classrooms
 
-    def _create_children_and_guardians(self, classrooms: list[Classroom], count: int) -> None:
+    def _create_children(self, classrooms: list[Classroom], tariffs: list[Tariff], count: int) -> None:
         today = timezone.localdate()
         existing_children = Child.objects.count()
         to_create = max(0, count - existing_children)
-        created = 0
-        attempts = 0
 
         if to_create == 0:
             self.stdout.write(self.style.SUCCESS(f"Bolalar allaqachon yetarli: {existing_children} ta. Yangi bola qo‘shilmadi."))
-            self._ensure_guardians_for_children()
             return
 
-        while created < to_create and attempts < to_create * 10:
-            attempts += 1
-            classroom = random.choice(classrooms)
-
-            if Child.objects.filter(classroom=classroom).count() >= classroom.capacity:
-                continue
-
-            first_name = random.choice(FIRST_NAMES)
-            last_name = random.choice(LAST_NAMES)
-
-            birth_date = today - timedelta(days=random.randint(3 * 365, 6 * 365))
-
-            child = Child.objects.create(
-                first_name=first_name,
-                last_name=last_name,
-                birth_date=birth_date,
-                classroom=classroom,
-                status=random.choice([ChildStatus.ACTIVE, ChildStatus.INACTIVE]),
-            )
-
-            email_base = f"{first_name}.{last_name}.{child.pk}".lower()
-            primary_guardian = Guardian.objects.create(
-                first_name=random.choice(FIRST_NAMES),
-                last_name=last_name,
-                phone=f"{random.choice(PHONE_PREFIXES)}{random.randint(100000000, 999999999)}",
-                email=f"{email_base}@example.com",
-                child=child,
-                is_primary=True,
-            )
+        # Bo‘sh o‘rinlar bitta guruhlangan so‘rov bilan hisoblanadi.
+        occupied = dict(
+            Child.objects.filter(classroom__in=classrooms)
+            .values_list("classroom_id")
+            .annotate(total=Count("id"))
+        )
+        seats: list[int] = []
+        for classroom in classrooms:
+            seats.extend([classroom.pk] * max(0, classroom.capacity - occupied.get(classroom.pk, 0)))
+        self.rng.shuffle(seats)
+        seats = seats[:to_create]
 
-            if random.random() < 0.5:
-                Guardian.objects.create(
-                    first_name=random.choice(FIRST_NAMES),
-                    last_name=last_name,
-                    phone=f"{random.choice(PHONE_PREFIXES)}{random.randint(100000000, 999999999)}",
-                    email=f"{email_base}.alt@example.com",
-                    child=child,
-                    is_primary=False,
+        created = 0
+        for start in range(0, len(seats), self.batch_size):
+            batch = [
+                Child(
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    birth_date=today - timedelta(days=self.rng.randint(3 * 365, 6 * 365)),
+                    classroom_id=classroom_id,
+                    tariff=self.rng.choice(tariffs) if tariffs else None,
+                    status=ChildStatus.ACTIVE if self.rng.random() < 0.9 else ChildStatus.INACTIVE,
+                    enrolled_on=today - timedelta(days=self.rng.randint(0, 2 * 365)),
                 )
-
-            created += 1
+                for classroom_id in seats[start : start + self.batch_size]
+            ]
+            Child.objects.bulk_create(batch, batch_size=self.batch_size)
+            self._create_guardians(batch, secondary_ratio=0.5)
+            created += len(batch)
 
         self.stdout.write(self.style.SUCCESS(f"Bolalar qo‘shildi: {created} ta."))
-        self._ensure_guardians_for_children()
+
+    def _guardian(self, child: Child, *, primary: bool, suffix: str) -> Guardian:
+        email_base = f"{child.first_name}.{child.last_name}.{child.pk}".lower()
+        return Guardian(
+            first_name=self.rng.choice(FIRST_NAMES),
+            last_name=child.last_name,
+            phone=f"{self.rng.choice(PHONE_PREFIXES)}{self.rng.randint(100000000, 999999999)}",
+            email=f"{email_base}{suffix}@example.com",
+            child=child,
+            is_primary=primary,
+        )
+
+    def _create_guardians(self, children: list[Child], *, secondary_ratio: float) -> None:
+        guardians = [self._guardian(child, primary=True, suffix="") for child in children]
+        guardians.extend(
+            self._guardian(child, primary=False, suffix=".alt")
+            for child in children
+            if self.rng.random() < secondary_ratio
+        )
+        Guardian.objects.bulk_create(guardians, batch_size=self.batch_size)
 
     def _ensure_guardians_for_children(self) -> None:
         """Har bir bola uchun kamida 1 ta asosiy vasiy borligini taʼminlaydi."""
-        children = list(Child.objects.all())
-        created = 0
-        for child in children:
-            if Guardian.objects.filter(child=child, is_primary=True).exists():
-                continue
-            last_name = child.last_name
-            email_base = f"{child.first_name}.{last_name}.{child.pk}".lower()
-            Guardian.objects.create(
-                first_name=random.choice(FIRST_NAMES),
-                last_name=last_name,
-                phone=f"{random.choice(PHONE_PREFIXES)}{random.randint(100000000, 999999999)}",
-                email=f"{email_base}.primary@example.com",
-                child=child,
-                is_primary=True,
-            )
-            created += 1
-
-        if created:
-            self.stdout.write(self.style.SUCCESS(f"Asosiy vasiylar qo‘shildi: {created} ta."))
+        children = list(
+            Child.objects.exclude(guardians__is_primary=True).only("id", "first_name", "last_name")
+        )
+        Guardian.objects.bulk_create(
+            [self._guardian(child, primary=True, suffix=".primary") for child in children],
+            batch_size=self.batch_size,
+        )
+        if children:
+            self.stdout.write(self.style.SUCCESS(f"Asosiy vasiylar qo‘shildi: {len(children)} ta."))
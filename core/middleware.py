@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .instrumentation import QueryStats, histogram, record_queries
+from .routers import PIN_COOKIE, replica_configured
+
+logger = logging.getLogger("core.instrumentation")
+
+
+class QueryInstrumentationMiddleware:
+	"""Per-request query count, SQL time and slowest statements.
+
+	Adds a `Server-Timing` header, logs one JSON line per request (WARNING when
+	slower than INSTRUMENTATION_SLOW_REQUEST_MS, INFO otherwise) and feeds the
+	in-process histogram exposed at `core:instrumentation`.
+
+	Async-capable, so async views stay on the event loop under ASGI. There the
+	ORM runs on the request's thread-sensitive worker thread, so the query
+	recorder is installed and removed on that thread.
+	"""
+
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+		self.get_response = get_response
+		self.enabled = getattr(settings, "INSTRUMENTATION_ENABLED", True)
+		self.keep_slowest = getattr(settings, "INSTRUMENTATION_SLOW_QUERIES", 3)
+		self.slow_request_ms = getattr(settings, "INSTRUMENTATION_SLOW_REQUEST_MS", 500)
+		self.async_mode = iscoroutinefunction(get_response)
+		if self.async_mode:
+			markcoroutinefunction(self)
+
+	def __call__(self, request: HttpRequest) -> HttpResponse:
+		if self.async_mode:
+			return self.__acall__(request)
+		if not self.enabled:
+			return self.get_response(request)
+
+		started = time.perf_counter()
+		with record_queries(self.keep_slowest) as stats:
+			response = self.get_response(request)
+		self._report(request, response, started, stats)
+		return response
+
+	async def __acall__(self, request: HttpRequest) -> HttpResponse:
+		if not self.enabled:
+			return await self.get_response(request)
+
+		started = time.perf_counter()
+		stack = ExitStack()
+		stats = await sync_to_async(stack.enter_context)(record_queries(self.keep_slowest))
+		try:
+			response = await self.get_response(request)
+		finally:
+			await sync_to_async(stack.close)()
+		self._report(request, response, started, stats)
+		return response
+
+	def _report(self, request: HttpRequest, response: HttpResponse, started: float, stats: QueryStats) -> None:
+		duration_ms = (time.perf_counter() - started) * 1000
+
+		match = getattr(request, "resolver_match", None)
+		view_name = match.view_name if match else "<unresolved>"
+		histogram.observe(view_name, duration_ms, stats.total_ms, stats.count)
+		response["Server-Timing"] = (
+			f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", app;dur={duration_ms:.1f}'
+		)
+
+		level = logging.WARNING if duration_ms >= self.slow_request_ms else logging.INFO
+		if logger.isEnabledFor(level):
+			logger.log(
+				level,
+				json.dumps(
+					{
+						"event": "request",
+						"view": view_name,
+						"method": request.method,
+						"path": request.path,
+						"status": response.status_code,
+						"duration_ms": round(duration_ms, 3),
+						"queries": stats.count,
+						"sql_ms": round(stats.total_ms, 3),
+						"slowest": stats.slowest,
+					}
+				),
+			)
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+	"""After a write request, read from the primary for DATABASE_REPLICA_PIN_SECONDS (see core.routers)."""
+
+	def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+		if request.method not in {"GET", "HEAD", "OPTIONS"} and response.status_code < 400 and replica_configured():
+			response.set_cookie(
+				PIN_COOKIE,
+				"1",
+				max_age=getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5),
+				httponly=True,
+				samesite="Lax",
+			)
+		return response
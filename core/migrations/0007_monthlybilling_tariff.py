@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tariff_child_tariff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthlybilling',
+            name='tariff',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='monthly_billing', to='core.tariff'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='status',
+            field=models.CharField(choices=[('expected', 'Kutilmoqda'), ('present', 'Keldi'), ('absent', 'Kelmagan'), ('late', 'Kechikdi'), ('half_day', 'Yarim kun')], default='expected', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='child',
+            name='status',
+            field=models.CharField(choices=[('active', 'Faol'), ('inactive', 'Nofaol')], default='active', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='monthlybilling',
+            name='status',
+            field=models.CharField(choices=[('unpaid', 'To‘lanmagan'), ('paid', 'To‘langan')], default='unpaid', max_length=10),
+        ),
+    ]
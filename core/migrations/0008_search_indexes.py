@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# Searchable text columns per table; must match core.search.SEARCH_KINDS.
+SEARCH_COLUMNS = [
+    ("core_child", ("first_name", "last_name"), 1),
+    ("core_guardian", ("first_name", "last_name", "phone", "email"), 2),
+    ("core_classroom", ("name",), 3),
+    ("core_tariff", ("name", "description"), 4),
+]
+KIND_SHIFT = 40
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for table, columns, _code in SEARCH_COLUMNS:
+            for column in columns:
+                # Matches the UPPER("col"::text) LIKE UPPER(%s) emitted for icontains.
+                schema_editor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{table}_{column}_trgm" '
+                    f'ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+                )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS core_search_fts USING fts5(body, tokenize='trigram')"
+        )
+        for table, columns, code in SEARCH_COLUMNS:
+            body = " || char(10) || ".join(f'COALESCE("{column}", \'\')' for column in columns)
+            schema_editor.execute(
+                f'INSERT INTO core_search_fts (rowid, body) '
+                f'SELECT "id" + {code << KIND_SHIFT}, {body} FROM "{table}"'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for table, columns, _code in SEARCH_COLUMNS:
+            for column in columns:
+                schema_editor.execute(f'DROP INDEX IF EXISTS "{table}_{column}_trgm"')
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS core_search_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_monthlybilling_tariff'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_export_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('expected', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('half_day', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='core.child')),
+            ],
+            options={
+                'ordering': ['-month', 'child__last_name', 'child__first_name'],
+                'indexes': [models.Index(fields=['month'], name='core_attend_month_767072_idx')],
+                'constraints': [models.UniqueConstraint(fields=('child', 'month'), name='uniq_attendance_summary_child_month')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:48
+
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import TruncDate
+
+
+def backfill(apps, schema_editor):
+    # Existing children were enrolled when they were created; existing rows
+    # were generated at the full tariff amount.
+    Child = apps.get_model("core", "Child")
+    MonthlyBilling = apps.get_model("core", "MonthlyBilling")
+    Child.objects.update(enrolled_on=TruncDate("created_at"))
+    MonthlyBilling.objects.update(base_amount=F("amount"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_attendance_monthly_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='enrolled_on',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddField(
+            model_name='monthlybilling',
+            name='base_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill(apps, schema_editor):
+    # Rows marked paid before the ledger existed get one payment for the full
+    # amount; everything else still owes its amount.
+    MonthlyBilling = apps.get_model("core", "MonthlyBilling")
+    Payment = apps.get_model("core", "Payment")
+    paid = MonthlyBilling.objects.filter(status="paid")
+    batch = []
+    for pk, amount, paid_at, updated_at in paid.values_list("pk", "amount", "paid_at", "updated_at").iterator(chunk_size=2000):
+        batch.append(Payment(billing_id=pk, kind="payment", method="cash", amount=amount, paid_at=paid_at or updated_at))
+        if len(batch) >= 2000:
+            Payment.objects.bulk_create(batch)
+            batch = []
+    Payment.objects.bulk_create(batch)
+    paid.update(paid_amount=F("amount"), balance=0)
+    MonthlyBilling.objects.exclude(status="paid").update(balance=F("amount"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_billing_proration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('payment', 'To‘lov'), ('refund', 'Qaytarish')], default='payment', max_length=10)),
+                ('method', models.CharField(choices=[('cash', 'Naqd'), ('card', 'Karta'), ('transfer', 'O‘tkazma')], default='cash', max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('paid_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('notes', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-paid_at', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='monthlybilling',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='monthlybilling',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='monthlybilling',
+            name='status',
+            field=models.CharField(choices=[('unpaid', 'To‘lanmagan'), ('partial', 'Qisman to‘langan'), ('paid', 'To‘langan')], default='unpaid', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='monthlybilling',
+            index=models.Index(condition=models.Q(('balance__gt', 0)), fields=['child', 'billing_month', 'balance'], name='monthly_billing_debt_idx'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='billing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='core.monthlybilling'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='guardian',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='core.guardian'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='received_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments_received', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['billing', 'paid_at'], name='core_paymen_billing_d58485_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid_at'], name='core_paymen_paid_at_b57af1_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['attendance_date', 'child', 'status'], name='attendance_date_child_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='child',
+            index=models.Index(fields=['last_name', 'first_name'], name='child_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='child',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['classroom', 'last_name', 'first_name'], name='child_active_classroom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guardian',
+            index=models.Index(fields=['last_name', 'first_name'], name='guardian_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guardian',
+            index=models.Index(fields=['child', 'last_name', 'first_name'], name='guardian_child_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlybilling',
+            index=models.Index(fields=['billing_month', 'child', 'status'], name='monthly_billing_child_idx'),
+        ),
+    ]
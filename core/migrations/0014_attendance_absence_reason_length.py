@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_list_view_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='absence_reason',
+            field=models.TextField(blank=True, max_length=500),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_tariff(apps, schema_editor):
+    """Rows billed before 0007 have no tariff: take the child's (the only tariff default there is)."""
+    Child = apps.get_model("core", "Child")
+    MonthlyBilling = apps.get_model("core", "MonthlyBilling")
+    child_tariff = Child.objects.filter(pk=OuterRef("child_id")).values("tariff_id")[:1]
+    MonthlyBilling.objects.filter(tariff__isnull=True, child__tariff__isnull=False).update(
+        tariff_id=Subquery(child_tariff)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_attendance_absence_reason_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tariff, migrations.RunPython.noop),
+    ]
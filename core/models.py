@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from decimal import Decimal
 import re
-from datetime import date
+from datetime import date, time
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -17,21 +19,44 @@ class TimeStampedModel(models.Model):
 		abstract = True
 
 
+class ChildStatus(models.TextChoices):
+	ACTIVE = "active", "Faol"
+	INACTIVE = "inactive", "Nofaol"
+
+
+class ClassroomQuerySet(models.QuerySet):
+	def with_occupancy(self) -> "ClassroomQuerySet":
+		"""Annotate `occupied` (all children) and `active_children` in one grouped query."""
+		return self.annotate(
+			occupied=models.Count("children"),
+			active_children=models.Count("children", filter=models.Q(children__status=ChildStatus.ACTIVE)),
+		)
+
+
 class Classroom(TimeStampedModel):
 	name = models.CharField(max_length=120, unique=True)
 	age_group = models.CharField(max_length=50)
 	capacity = models.PositiveIntegerField()
 
+	objects = ClassroomQuerySet.as_manager()
+
 	class Meta:
 		ordering = ["name"]
 
 	def __str__(self) -> str:
 		return self.name
 
+	# The properties below need a `with_occupancy()` queryset.
 
-class ChildStatus(models.TextChoices):
-	ACTIVE = "active", "Faol"
-	INACTIVE = "inactive", "Nofaol"
+	@property
+	def seats_left(self) -> int:
+		return max(self.capacity - self.occupied, 0)
+
+	@property
+	def occupancy_percent(self) -> int:
+		if not self.capacity:
+			return 100
+		return min(round(self.occupied * 100 / self.capacity), 100)
 
 
 class Tariff(TimeStampedModel):
@@ -68,9 +93,21 @@ class Child(TimeStampedModel):
 		choices=ChildStatus.choices,
 		default=ChildStatus.ACTIVE,
 	)
+	# First day the child is billed for (monthly amounts are prorated from it).
+	enrolled_on = models.DateField(default=timezone.localdate)
 
 	class Meta:
 		ordering = ["last_name", "first_name"]
+		indexes = [
+			models.Index(fields=["last_name", "first_name"], name="child_name_idx"),
+			# Active children of one classroom (materialize, bulk mark present,
+			# occupancy), already in name order.
+			models.Index(
+				fields=["classroom", "last_name", "first_name"],
+				condition=models.Q(status=ChildStatus.ACTIVE),
+				name="child_active_classroom_idx",
+			),
+		]
 
 	def __str__(self) -> str:
 		return f"{self.first_name} {self.last_name}"
@@ -98,6 +135,11 @@ class Guardian(TimeStampedModel):
 
 	class Meta:
 		ordering = ["last_name", "first_name"]
+		indexes = [
+			models.Index(fields=["last_name", "first_name"], name="guardian_name_idx"),
+			# child.guardians.all() in Meta.ordering order.
+			models.Index(fields=["child", "last_name", "first_name"], name="guardian_child_name_idx"),
+		]
 
 	def __str__(self) -> str:
 		return f"{self.first_name} {self.last_name}"
@@ -111,6 +153,91 @@ class AttendanceStatus(models.TextChoices):
 	HALF_DAY = "half_day", "Yarim kun"
 
 
+ATTENDANCE_BADGES = {
+	AttendanceStatus.PRESENT: "success",
+	AttendanceStatus.LATE: "warning",
+	AttendanceStatus.ABSENT: "danger",
+	AttendanceStatus.HALF_DAY: "info",
+}
+
+
+def attendance_rule_errors(
+	status: str | None,
+	check_in: time | None,
+	check_out: time | None,
+	absence_reason: str,
+) -> dict[str, str]:
+	"""Cross-field attendance rules shared by AttendanceForm and the batch API."""
+	errors: dict[str, str] = {}
+	if check_in and check_out and check_out < check_in:
+		errors["check_out_time"] = "Check-out must be after check-in."
+	if status == AttendanceStatus.ABSENT and not absence_reason.strip():
+		errors["absence_reason"] = "Please provide an absence reason."
+	return errors
+
+
+# Attendance fields that decide which rollup bucket a row is counted in.
+SUMMARY_FIELDS = frozenset({"child", "child_id", "attendance_date", "status"})
+
+
+class AttendanceQuerySet(models.QuerySet):
+	"""Keeps AttendanceMonthlySummary and the live board in sync on the set-based paths, which send no signals."""
+
+	def update(self, **kwargs: object) -> int:
+		from core.fragment_cache import ATTENDANCE
+		from core.live import get_broker
+		from core.reference_cache import invalidate
+		from core.services.attendance_summary import SummaryScope, refresh_scope, summary_is_paused
+
+		rollup = bool(SUMMARY_FIELDS & kwargs.keys())
+		if summary_is_paused() or not (rollup or get_broker().has_listeners()):
+			rows = super().update(**kwargs)
+			if rows:
+				# Nothing to refresh, but the rendered attendance lists are stale.
+				invalidate(ATTENDANCE)
+			return rows
+		# Taken before the update: the filter may stop matching afterwards.
+		scope = SummaryScope.for_queryset(self)
+		rows = super().update(**kwargs)
+		if rows and scope is not None:
+			refresh_scope(scope.moved_to(kwargs), rollup=rollup)
+		return rows
+
+	def bulk_update(self, objs, fields, batch_size=None) -> int:
+		from core.services.attendance_summary import SummaryScope, refresh_scope, summary_paused
+
+		objs = list(objs)
+		# bulk_update() runs update() per batch; refresh once for all of them.
+		with summary_paused():
+			rows = super().bulk_update(objs, fields, batch_size=batch_size)
+		if rows:
+			refresh_scope(SummaryScope.for_objects(objs), rollup=bool(SUMMARY_FIELDS & set(fields)))
+		return rows
+
+	def bulk_create(self, objs, *args: object, **kwargs: object) -> list["Attendance"]:
+		from core.services.attendance_summary import SummaryScope, refresh_scope
+
+		created = super().bulk_create(objs, *args, **kwargs)
+		if created:
+			refresh_scope(SummaryScope.for_objects(created))
+		return created
+
+	def delete(self) -> tuple[int, dict[str, int]]:
+		from core.fragment_cache import ATTENDANCE
+		from core.reference_cache import invalidate
+		from core.services.attendance_summary import SummaryScope, refresh_scope, summary_is_paused
+
+		scope = None if summary_is_paused() else SummaryScope.for_queryset(self)
+		result = super().delete()
+		if result[0]:
+			if scope is not None:
+				refresh_scope(scope)
+			else:
+				# The rollup is refreshed by whoever paused it; the rendered lists are stale now.
+				invalidate(ATTENDANCE)
+		return result
+
+
 class Attendance(TimeStampedModel):
 	child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name="attendance")
 	attendance_date = models.DateField(default=timezone.localdate)
@@ -121,9 +248,11 @@ class Attendance(TimeStampedModel):
 	)
 	check_in_time = models.TimeField(blank=True, null=True)
 	check_out_time = models.TimeField(blank=True, null=True)
-	absence_reason = models.TextField(blank=True)
+	absence_reason = models.TextField(blank=True, max_length=500)
 	notes = models.TextField(blank=True)
 
+	objects = AttendanceQuerySet.as_manager()
+
 	class Meta:
 		ordering = ["-attendance_date", "child__last_name", "child__first_name"]
 		constraints = [
@@ -133,11 +262,78 @@ class Attendance(TimeStampedModel):
 		]
 		indexes = [
 			models.Index(fields=["attendance_date", "status"]),
+			# Day list per classroom and the per-classroom status counts: the
+			# join to child and the status come from the index alone.
+			models.Index(fields=["attendance_date", "child", "status"], name="attendance_date_child_idx"),
 		]
 
 	def __str__(self) -> str:
 		return f"{self.child} · {self.attendance_date}"
 
+	@property
+	def badge_class(self) -> str:
+		return ATTENDANCE_BADGES.get(self.status, "secondary")
+
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Rollup key as loaded, so moving a row to another child/month also
+		# refreshes the month it left.
+		instance._loaded_summary_key = (instance.__dict__.get("child_id"), instance.__dict__.get("attendance_date"))
+		return instance
+
+
+class AttendanceMonthlySummary(models.Model):
+	"""Per-child monthly attendance counts, maintained from Attendance writes.
+
+	See core.services.attendance_summary; `rebuild_attendance_summary` backfills.
+	"""
+	child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name="attendance_summaries")
+	# First day of the month.
+	month = models.DateField()
+	expected = models.PositiveIntegerField(default=0)
+	present = models.PositiveIntegerField(default=0)
+	absent = models.PositiveIntegerField(default=0)
+	late = models.PositiveIntegerField(default=0)
+	half_day = models.PositiveIntegerField(default=0)
+	updated_at = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		ordering = ["-month", "child__last_name", "child__first_name"]
+		constraints = [
+			models.UniqueConstraint(fields=["child", "month"], name="uniq_attendance_summary_child_month"),
+		]
+		indexes = [
+			models.Index(fields=["month"]),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.child} · {self.month:%Y-%m}"
+
+	@property
+	def total(self) -> int:
+		return self.expected + self.present + self.absent + self.late + self.half_day
+
+	@property
+	def attended(self) -> int:
+		return self.present + self.late + self.half_day
+
+	@property
+	def attendance_rate(self) -> float | None:
+		"""Attended share of the marked days (unmarked 'expected' days excluded)."""
+		marked = self.attended + self.absent
+		return round(self.attended * 100 / marked, 1) if marked else None
+
+
+class AuthorizedPickupQuerySet(models.QuerySet):
+	def active_on(self, day: date) -> "AuthorizedPickupQuerySet":
+		"""Active pickups whose validity window (open-ended where unset) covers `day`."""
+		return self.filter(
+			models.Q(valid_from__isnull=True) | models.Q(valid_from__lte=day),
+			models.Q(valid_until__isnull=True) | models.Q(valid_until__gte=day),
+			is_active=True,
+		)
+
 
 class AuthorizedPickup(TimeStampedModel):
 	child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name="authorized_pickups")
@@ -149,6 +345,8 @@ class AuthorizedPickup(TimeStampedModel):
 	valid_from = models.DateField(blank=True, null=True)
 	valid_until = models.DateField(blank=True, null=True)
 
+	objects = AuthorizedPickupQuerySet.as_manager()
+
 	class Meta:
 		ordering = ["-is_active", "full_name"]
 
@@ -170,14 +368,61 @@ def current_billing_month() -> str:
 
 class MonthlyBillingStatus(models.TextChoices):
 	UNPAID = "unpaid", "To‘lanmagan"
+	PARTIAL = "partial", "Qisman to‘langan"
 	PAID = "paid", "To‘langan"
 
 
+class MonthlyBillingQuerySet(models.QuerySet):
+	"""Invalidates the rendered billing lists (core.fragment_cache) on the set-based paths, which send no signals."""
+
+	def _invalidate(self) -> None:
+		from core.fragment_cache import BILLING
+		from core.reference_cache import invalidate
+
+		invalidate(BILLING)
+
+	def update(self, **kwargs: object) -> int:
+		rows = super().update(**kwargs)
+		if rows:
+			self._invalidate()
+		return rows
+
+	def bulk_create(self, objs, *args: object, **kwargs: object) -> list["MonthlyBilling"]:
+		created = super().bulk_create(objs, *args, **kwargs)
+		if created:
+			self._invalidate()
+		return created
+
+	def delete(self) -> tuple[int, dict[str, int]]:
+		result = super().delete()
+		if result[0]:
+			self._invalidate()
+		return result
+
+
 class MonthlyBilling(TimeStampedModel):
 	"""Simplified billing (attendance-style): one row per child per month."""
 	child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name="monthly_billing")
+	# Tariff the amount was taken from when the row was generated (snapshot;
+	# later tariff edits or reassignment do not change existing rows).
+	tariff = models.ForeignKey(
+		Tariff,
+		on_delete=models.SET_NULL,
+		related_name="monthly_billing",
+		blank=True,
+		null=True,
+	)
 	billing_month = models.CharField(max_length=7, default=current_billing_month, validators=[_validate_billing_month])
+	# Full-month tariff amount snapshotted with the tariff; `amount` is what is
+	# charged after proration (core.services.proration), recomputed from it.
+	base_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
 	amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
+	# Denormalized from the Payment ledger (payments minus refunds) and
+	# `amount - paid_amount`; written by core.services.payments in the same
+	# transaction as the ledger row, and re-derived by save(). Status follows
+	# from them.
+	paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
+	balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
 	status = models.CharField(
 		max_length=10,
 		choices=MonthlyBillingStatus.choices,
@@ -186,6 +431,8 @@ class MonthlyBilling(TimeStampedModel):
 	paid_at = models.DateTimeField(blank=True, null=True)
 	notes = models.TextField(blank=True)
 
+	objects = MonthlyBillingQuerySet.as_manager()
+
 	class Meta:
 		ordering = ["-billing_month", "child__last_name", "child__first_name"]
 		constraints = [
@@ -196,6 +443,15 @@ class MonthlyBilling(TimeStampedModel):
 		]
 		indexes = [
 			models.Index(fields=["billing_month", "status"]),
+			# Same shape as attendance_date_child_idx for the monthly billing list.
+			models.Index(fields=["billing_month", "child", "status"], name="monthly_billing_child_idx"),
+			# Debtors report: only rows with something left to pay, covering
+			# the per-child SUM(balance) / MIN(billing_month).
+			models.Index(
+				fields=["child", "billing_month", "balance"],
+				condition=models.Q(balance__gt=0),
+				name="monthly_billing_debt_idx",
+			),
 		]
 
 	def __str__(self) -> str:
@@ -203,14 +459,153 @@ class MonthlyBilling(TimeStampedModel):
 
 	@property
 	def badge_class(self) -> str:
-		return "success" if self.status == MonthlyBillingStatus.PAID else "secondary"
+		return {
+			MonthlyBillingStatus.PAID: "success",
+			MonthlyBillingStatus.PARTIAL: "warning",
+		}.get(self.status, "secondary")
+
+	@staticmethod
+	def status_for(amount: Decimal, paid_amount: Decimal) -> str:
+		if paid_amount <= 0:
+			return MonthlyBillingStatus.UNPAID
+		return MonthlyBillingStatus.PARTIAL if paid_amount < amount else MonthlyBillingStatus.PAID
+
+	def save(self, *args: object, **kwargs: object) -> None:
+		# Rows created or edited outside core.services.payments (ORM, admin)
+		# would otherwise keep a stale balance / status.
+		self.balance = Decimal(self.amount) - Decimal(self.paid_amount)
+		self.status = self.status_for(Decimal(self.amount), Decimal(self.paid_amount))
+		if kwargs.get("update_fields") is not None:
+			kwargs["update_fields"] = {*kwargs["update_fields"], "balance", "status"}
+		super().save(*args, **kwargs)
+
+	def mark_paid(self, *, received_by: models.Model | None = None) -> None:
+		"""Record a payment of the remaining balance."""
+		from core.services.payments import record_payment
+
+		remaining = Decimal(self.amount) - Decimal(self.paid_amount)
+		if remaining > 0:
+			record_payment(self, remaining, received_by=received_by)
+
+	def mark_unpaid(self, *, received_by: models.Model | None = None) -> None:
+		"""Refund everything paid so far."""
+		from core.services.payments import record_payment
+
+		if self.paid_amount > 0:
+			record_payment(self, self.paid_amount, kind=PaymentKind.REFUND, received_by=received_by)
+
+
+class PaymentKind(models.TextChoices):
+	PAYMENT = "payment", "To‘lov"
+	REFUND = "refund", "Qaytarish"
+
+
+class PaymentMethod(models.TextChoices):
+	CASH = "cash", "Naqd"
+	CARD = "card", "Karta"
+	TRANSFER = "transfer", "O‘tkazma"
+
+
+class Payment(TimeStampedModel):
+	"""Ledger row: money received (or refunded) against a MonthlyBilling row.
+
+	Rows are append-only; create them through core.services.payments so the
+	billing row's paid_amount / balance stay in step.
+	"""
+	billing = models.ForeignKey(MonthlyBilling, on_delete=models.CASCADE, related_name="payments")
+	kind = models.CharField(max_length=10, choices=PaymentKind.choices, default=PaymentKind.PAYMENT)
+	method = models.CharField(max_length=10, choices=PaymentMethod.choices, default=PaymentMethod.CASH)
+	# Always positive; `kind` gives the sign.
+	amount = models.DecimalField(max_digits=12, decimal_places=2)
+	paid_at = models.DateTimeField(default=timezone.now)
+	guardian = models.ForeignKey(
+		Guardian,
+		on_delete=models.SET_NULL,
+		related_name="payments",
+		blank=True,
+		null=True,
+	)
+	received_by = models.ForeignKey(
+		settings.AUTH_USER_MODEL,
+		on_delete=models.SET_NULL,
+		related_name="payments_received",
+		blank=True,
+		null=True,
+	)
+	notes = models.TextField(blank=True)
+
+	class Meta:
+		ordering = ["-paid_at", "-id"]
+		indexes = [
+			models.Index(fields=["billing", "paid_at"]),
+			models.Index(fields=["paid_at"]),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.billing} · {self.get_kind_display()} {self.amount}"
 
-	def mark_paid(self) -> None:
-		self.status = MonthlyBillingStatus.PAID
-		self.paid_at = timezone.now()
-		self.save(update_fields=["status", "paid_at", "updated_at"])
+	@property
+	def signed_amount(self) -> Decimal:
+		return -self.amount if self.kind == PaymentKind.REFUND else self.amount
+
+
+class ExportKind(models.TextChoices):
+	ATTENDANCE = "attendance", "Davomat"
+	BILLING = "billing", "Oylik to‘lov"
+
+
+class ExportFormat(models.TextChoices):
+	CSV = "csv", "CSV"
+	XLSX = "xlsx", "Excel (XLSX)"
+
+
+class ExportJobStatus(models.TextChoices):
+	PENDING = "pending", "Navbatda"
+	RUNNING = "running", "Bajarilmoqda"
+	DONE = "done", "Tayyor"
+	FAILED = "failed", "Xato"
+
+
+class ExportJob(TimeStampedModel):
+	"""Background export that is too large to stream; resumed from `cursor` after a crash."""
+	kind = models.CharField(max_length=20, choices=ExportKind.choices)
+	file_format = models.CharField(max_length=4, choices=ExportFormat.choices, default=ExportFormat.CSV)
+	# Query-string style filters (date_from/date_to or month_from/month_to, classroom, status, q).
+	params = models.JSONField(default=dict, blank=True)
+	status = models.CharField(
+		max_length=10,
+		choices=ExportJobStatus.choices,
+		default=ExportJobStatus.PENDING,
+	)
+	requested_by = models.ForeignKey(
+		settings.AUTH_USER_MODEL,
+		on_delete=models.SET_NULL,
+		related_name="export_jobs",
+		blank=True,
+		null=True,
+	)
+	# Checkpoint: ordering key of the last written row and the size of the
+	# partial file at that point.
+	cursor = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+	rows_written = models.PositiveBigIntegerField(default=0)
+	bytes_written = models.PositiveBigIntegerField(default=0)
+	file_name = models.CharField(max_length=255, blank=True)
+	error = models.TextField(blank=True)
+	finished_at = models.DateTimeField(blank=True, null=True)
+
+	class Meta:
+		ordering = ["-created_at"]
+		indexes = [
+			models.Index(fields=["status", "updated_at"]),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.get_kind_display()} · {self.get_file_format_display()} · {self.get_status_display()}"
 
-	def mark_unpaid(self) -> None:
-		self.status = MonthlyBillingStatus.UNPAID
-		self.paid_at = None
-		self.save(update_fields=["status", "paid_at", "updated_at"])
+	@property
+	def badge_class(self) -> str:
+		return {
+			ExportJobStatus.DONE: "success",
+			ExportJobStatus.FAILED: "danger",
+			ExportJobStatus.RUNNING: "info",
+		}.get(self.status, "secondary")
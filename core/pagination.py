@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import math
+from collections.abc import Sequence
+from functools import cached_property
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Model, Q, QuerySet
+from django.http import Http404
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATED = "estimated"
+COUNT_NONE = "none"
+COUNT_MODES = {COUNT_EXACT, COUNT_ESTIMATED, COUNT_NONE}
+
+
+def estimate_count(queryset: QuerySet) -> int | None:
+	"""Planner row estimate for `queryset` (PostgreSQL only; None elsewhere)."""
+	connection = connections[queryset.db]
+	if connection.vendor != "postgresql":
+		return None
+	sql, params = queryset.order_by().query.sql_with_params()
+	with connection.cursor() as cursor:
+		cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+		plan = cursor.fetchone()[0]
+	if isinstance(plan, str):
+		plan = json.loads(plan)
+	return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+	"""Offset paginator (e.g. for admin changelists) that reports the planner estimate for large results.
+
+	Results estimated below `exact_below` rows are still counted exactly; off
+	PostgreSQL there is no estimate, so it behaves like `Paginator`.
+	"""
+
+	exact_below = 10_000
+
+	@cached_property
+	def count(self) -> int:
+		estimate = estimate_count(self.object_list)
+		if estimate is None or estimate < self.exact_below:
+			return super().count
+		return estimate
+
+
+def _encode_token(direction: str, values: list[Any], number: int) -> str:
+	raw = json.dumps({"d": direction, "k": values, "n": number}, cls=DjangoJSONEncoder, separators=(",", ":"))
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_token(token: str) -> tuple[str, list[Any], int]:
+	try:
+		raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+		data = json.loads(raw)
+		direction, values, number = data["d"], data["k"], int(data["n"])
+	except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+		raise InvalidPage("Invalid page cursor.") from exc
+	if direction not in {"n", "p"} or not isinstance(values, list):
+		raise InvalidPage("Invalid page cursor.")
+	return direction, values, max(number, 1)
+
+
+def seek_filter(ordering: Sequence[str], values: list[Any], *, forward: bool = True) -> Q:
+	"""Rows strictly after (or before) `values` in `ordering`; the last field must be unique."""
+	if len(values) != len(ordering):
+		raise InvalidPage("Invalid page cursor.")
+	condition = Q()
+	for idx, field in enumerate(ordering):
+		name = field.lstrip("-")
+		descending = field.startswith("-")
+		lookup = "gt" if forward != descending else "lt"
+		term = Q(**{f"{name}__{lookup}": values[idx]})
+		for prev_field, prev_value in zip(ordering[:idx], values[:idx]):
+			term &= Q(**{prev_field.lstrip("-"): prev_value})
+		condition |= term
+	return condition
+
+
+class KeysetPage(Sequence):
+	"""Page object compatible with the `page_obj` API used by the list templates.
+
+	`next_page_number()` / `previous_page_number()` return opaque cursor tokens
+	instead of integers, so the templates' `?page=...` links work unchanged.
+	"""
+
+	def __init__(
+		self,
+		object_list: list[Model],
+		number: int,
+		paginator: "KeysetPaginator",
+		*,
+		has_next: bool,
+		has_previous: bool,
+	) -> None:
+		self.object_list = object_list
+		self.number = number
+		self.paginator = paginator
+		self._has_next = has_next
+		self._has_previous = has_previous
+
+	def __repr__(self) -> str:
+		return f"<Keyset page {self.number}>"
+
+	def __len__(self) -> int:
+		return len(self.object_list)
+
+	def __getitem__(self, index):
+		return self.object_list[index]
+
+	def has_next(self) -> bool:
+		return self._has_next
+
+	def has_previous(self) -> bool:
+		return self._has_previous
+
+	def has_other_pages(self) -> bool:
+		return self._has_next or self._has_previous
+
+	def next_page_number(self) -> str:
+		return _encode_token("n", self.paginator.key_for(self.object_list[-1]), self.number + 1)
+
+	def previous_page_number(self) -> str:
+		return _encode_token("p", self.paginator.key_for(self.object_list[0]), self.number - 1)
+
+
+class KeysetPaginator:
+	"""Cursor paginator ordered on a unique key (the last field must be unique, e.g. `id`).
+
+	Avoids OFFSET scans; the total is computed according to `count_mode`:
+	"exact" (COUNT(*)), "estimated" (planner estimate, PostgreSQL) or "none".
+	"""
+
+	def __init__(
+		self,
+		object_list: QuerySet,
+		per_page: int,
+		ordering: Sequence[str],
+		*,
+		count_mode: str = COUNT_EXACT,
+	) -> None:
+		if count_mode not in COUNT_MODES:
+			raise ValueError(f"Unknown count mode: {count_mode}")
+		if not ordering:
+			raise ValueError("Keyset pagination requires an ordering.")
+		self.object_list = object_list
+		self.per_page = int(per_page)
+		self.ordering = tuple(ordering)
+		self.count_mode = count_mode
+
+	@property
+	def is_estimated(self) -> bool:
+		return self.count_mode == COUNT_ESTIMATED
+
+	@cached_property
+	def count(self) -> int | None:
+		if self.count_mode == COUNT_EXACT:
+			return self.object_list.count()
+		if self.count_mode == COUNT_ESTIMATED:
+			return estimate_count(self.object_list)
+		return None
+
+	@cached_property
+	def num_pages(self) -> int | None:
+		if self.count is None:
+			return None
+		return max(1, math.ceil(self.count / self.per_page))
+
+	def key_for(self, obj: Model) -> list[Any]:
+		values = []
+		for field in self.ordering:
+			value: Any = obj
+			for part in field.lstrip("-").split("__"):
+				value = getattr(value, part)
+			values.append(value)
+		return values
+
+	def _seek(self, values: list[Any], *, forward: bool) -> Q:
+		return seek_filter(self.ordering, values, forward=forward)
+
+	def _page_query(self, token: str | None) -> tuple[QuerySet, str, int]:
+		qs = self.object_list
+		if not token:
+			return qs.order_by(*self.ordering)[: self.per_page + 1], "", 1
+		direction, values, number = _decode_token(token)
+		if direction == "n":
+			return qs.filter(self._seek(values, forward=True)).order_by(*self.ordering)[: self.per_page + 1], direction, number
+		reverse = [field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering]
+		return qs.filter(self._seek(values, forward=False)).order_by(*reverse)[: self.per_page + 1], direction, number
+
+	def _build_page(self, rows: list[Model], direction: str, number: int) -> KeysetPage:
+		if direction != "p":
+			return KeysetPage(
+				rows[: self.per_page], number, self, has_next=len(rows) > self.per_page, has_previous=bool(direction)
+			)
+		has_previous = len(rows) > self.per_page
+		rows = rows[: self.per_page][::-1]
+		return KeysetPage(rows, number if has_previous else 1, self, has_next=True, has_previous=has_previous)
+
+	def page(self, token: str | None) -> KeysetPage:
+		qs, direction, number = self._page_query(token)
+		return self._build_page(list(qs), direction, number)
+
+	async def apage(self, token: str | None) -> KeysetPage:
+		"""Async `page()`; also resolves the total so templates never query it."""
+		qs, direction, number = self._page_query(token)
+		rows = [obj async for obj in qs]
+		if "count" not in self.__dict__:
+			if self.count_mode == COUNT_EXACT:
+				self.count = await self.object_list.acount()
+			elif self.count_mode == COUNT_ESTIMATED:
+				self.count = await sync_to_async(estimate_count)(self.object_list)
+		return self._build_page(rows, direction, number)
+
+
+class KeysetPaginationMixin:
+	"""Keyset pagination for a ListView, opt-in per view or per request.
+
+	A cursor token in the `page` parameter is always served by KeysetPaginator;
+	a view with `keyset_pagination = True` also starts on a keyset first page,
+	so its pager links carry cursors. Numeric `?page=N` links (and every page
+	of a view that has not opted in) use offset pagination, as without the mixin.
+	"""
+
+	keyset_pagination = False
+	keyset_ordering: Sequence[str] = ()
+	keyset_count_mode: str | None = None
+
+	def get_keyset_count_mode(self) -> str:
+		return self.keyset_count_mode or getattr(settings, "LIST_COUNT_MODE", COUNT_EXACT)
+
+	def get_page_token(self) -> str:
+		"""The raw `page` parameter: a cursor token, an offset page number or ""."""
+		return (self.request.GET.get(self.page_kwarg) or "").strip()
+
+	def uses_keyset(self, token: str) -> bool:
+		if token.isdigit():
+			return False
+		return bool(token) or self.keyset_pagination
+
+	def _keyset_paginator(self, queryset: QuerySet, page_size: int) -> KeysetPaginator:
+		return KeysetPaginator(queryset, page_size, self.keyset_ordering, count_mode=self.get_keyset_count_mode())
+
+	def _offset_page(self, queryset: QuerySet, page_size: int, token: str) -> Page:
+		paginator_class = EstimatedCountPaginator if self.get_keyset_count_mode() == COUNT_ESTIMATED else Paginator
+		paginator = paginator_class(queryset.order_by(*self.keyset_ordering), page_size)
+		try:
+			page = paginator.page(int(token or 1))
+		except InvalidPage as exc:
+			raise Http404(str(exc)) from exc
+		page.object_list = list(page.object_list)
+		return page
+
+	def paginate_queryset(self, queryset: QuerySet, page_size: int):
+		token = self.get_page_token()
+		if not self.uses_keyset(token):
+			page = self._offset_page(queryset, page_size, token)
+			return page.paginator, page, page.object_list, page.has_other_pages()
+		paginator = self._keyset_paginator(queryset, page_size)
+		try:
+			page = paginator.page(token)
+		except InvalidPage as exc:
+			raise Http404(str(exc)) from exc
+		return paginator, page, page.object_list, page.has_other_pages()
+
+	async def apaginate_queryset(self, queryset: QuerySet, page_size: int):
+		token = self.get_page_token()
+		if not self.uses_keyset(token):
+			page = await sync_to_async(self._offset_page)(queryset, page_size, token)
+			return page.paginator, page, page.object_list, page.has_other_pages()
+		paginator = self._keyset_paginator(queryset, page_size)
+		try:
+			page = await paginator.apage(token)
+		except InvalidPage as exc:
+			raise Http404(str(exc)) from exc
+		return paginator, page, page.object_list, page.has_other_pages()
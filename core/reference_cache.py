@@ -0,0 +1,100 @@
+"""Read-through cache for small, rarely changing lookup tables.
+
+Every cached value is stored under a key that includes a per-table version.
+Writes bump the version (see core.signals), so stale entries are never read
+again and simply expire. core.fragment_cache keys its rendered tables on the
+same versions. Misses are read from the primary, also inside replica_reads().
+Uses the cache alias in REFERENCE_CACHE_ALIAS.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Classroom, Tariff
+from .routers import primary_reads
+
+T = TypeVar("T")
+
+CLASSROOMS = "classroom"
+TARIFFS = "tariff"
+
+
+def _cache():
+	return caches[getattr(settings, "REFERENCE_CACHE_ALIAS", "default")]
+
+
+def _version_key(name: str) -> str:
+	return f"core:refver:{name}"
+
+
+def get_version(name: str) -> int:
+	cache = _cache()
+	version = cache.get(_version_key(name))
+	if version is None:
+		# Seed from the clock rather than 1 so an evicted counter can never
+		# come back at a value that still has stale entries cached under it.
+		cache.add(_version_key(name), time.time_ns(), timeout=None)
+		version = cache.get(_version_key(name), 0)
+	return version
+
+
+def bump_version(name: str) -> None:
+	cache = _cache()
+	try:
+		cache.incr(_version_key(name))
+	except ValueError:
+		cache.set(_version_key(name), time.time_ns(), timeout=None)
+
+
+def invalidate(name: str) -> None:
+	"""Bump the version of `name` now and again after commit.
+
+	A concurrent reader could otherwise re-cache the pre-commit rows under
+	the first new version.
+	"""
+	bump_version(name)
+	transaction.on_commit(lambda: bump_version(name))
+
+
+def cached(name: str, part: str, builder: Callable[[], T]) -> T:
+	cache = _cache()
+	key = f"core:ref:{name}:{part}:{get_version(name)}"
+	value = cache.get(key)
+	if value is None:
+		# Never from a lagging replica: the entry is shared under the current version.
+		with primary_reads():
+			value = builder()
+		cache.set(key, value, getattr(settings, "REFERENCE_CACHE_TIMEOUT", 3600))
+	return value
+
+
+def classrooms() -> list[Classroom]:
+	return cached(CLASSROOMS, "all", lambda: list(Classroom.objects.order_by("name")))
+
+
+def tariffs() -> list[Tariff]:
+	return cached(TARIFFS, "all", lambda: list(Tariff.objects.order_by("-is_active", "name")))
+
+
+def active_tariffs() -> list[Tariff]:
+	return [tariff for tariff in tariffs() if tariff.is_active]
+
+
+def classroom_choices() -> list[tuple[int, str]]:
+	return [(classroom.pk, str(classroom)) for classroom in classrooms()]
+
+
+def tariff_choices(include_pk: int | None = None) -> list[tuple[int, str]]:
+	"""Active tariffs, plus `include_pk` (e.g. a child's current, now inactive tariff)."""
+	return [
+		(tariff.pk, str(tariff))
+		for tariff in tariffs()
+		if tariff.is_active or tariff.pk == include_pk
+	]
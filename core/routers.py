@@ -0,0 +1,66 @@
+"""Read-replica routing for the list and report views.
+
+Reads go to the "replica" alias (DATABASE_REPLICA_URL) only inside
+`replica_reads()`, which `ReplicaReadMixin` wraps around those views; every
+write, and every read elsewhere, uses "default". A client that has just
+written (see ReplicaPinMiddleware) keeps reading from the primary for
+DATABASE_REPLICA_PIN_SECONDS, so replication lag never hides its own change.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "db_primary"
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+
+def replica_configured() -> bool:
+	return REPLICA_ALIAS in settings.DATABASES
+
+
+def pinned_to_primary(request: HttpRequest) -> bool:
+	return PIN_COOKIE in request.COOKIES
+
+
+@contextmanager
+def replica_reads(request: HttpRequest | None = None) -> Iterator[None]:
+	"""Route reads in the block to the replica, unless `request` is pinned to the primary."""
+	token = _use_replica.set(replica_configured() and not (request is not None and pinned_to_primary(request)))
+	try:
+		yield
+	finally:
+		_use_replica.reset(token)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+	"""Route reads in the block to the primary, e.g. for results cached beyond the request."""
+	token = _use_replica.set(False)
+	try:
+		yield
+	finally:
+		_use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+	def db_for_read(self, model: type, **hints: object) -> str | None:
+		return REPLICA_ALIAS if _use_replica.get() else None
+
+	def db_for_write(self, model: type, **hints: object) -> str:
+		# Explicit, so saving an object read from the replica still writes to the primary.
+		return DEFAULT_DB_ALIAS
+
+	def allow_relation(self, obj1: object, obj2: object, **hints: object) -> bool:
+		return True
+
+	def allow_migrate(self, db: str, app_label: str, **hints: object) -> bool:
+		return db != REPLICA_ALIAS
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from functools import lru_cache, reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Model, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Child, Classroom, Guardian, Tariff
+
+FTS_TABLE = "core_search_fts"
+KIND_SHIFT = 40
+
+# Searchable kinds: model and the text fields matched by a query. The integer
+# code is packed into the high bits of the FTS rowid ((code << 40) + pk), so
+# rows are replaced by rowid and a MATCH is limited to one kind with a rowid
+# range, which FTS5 applies while walking the index.
+SEARCH_KINDS: dict[str, tuple[type[Model], tuple[str, ...], int]] = {
+	"child": (Child, ("first_name", "last_name"), 1),
+	"guardian": (Guardian, ("first_name", "last_name", "phone", "email"), 2),
+	"classroom": (Classroom, ("name",), 3),
+	"tariff": (Tariff, ("name", "description"), 4),
+}
+MODEL_KINDS: dict[type[Model], str] = {model: kind for kind, (model, _f, _c) in SEARCH_KINDS.items()}
+
+
+class SearchBackend:
+	"""Turns a free-text query into a `Q` for one searchable kind.
+
+	`prefix` is the lookup path from the queried model to the searched one,
+	e.g. "child__" when filtering Attendance by child name.
+	"""
+
+	maintains_index = False
+
+	def filter(self, kind: str, q: str, prefix: str = "") -> Q:
+		raise NotImplementedError
+
+	def index_object(self, obj: Model) -> None:
+		pass
+
+	def index_objects(self, objs: Iterable[Model]) -> None:
+		"""Index rows written without signals (e.g. `bulk_create`)."""
+		for obj in objs:
+			self.index_object(obj)
+
+	def remove_object(self, obj: Model) -> None:
+		pass
+
+	def rebuild(self) -> int:
+		return 0
+
+
+class LikeSearchBackend(SearchBackend):
+	"""`icontains` ORs.
+
+	On PostgreSQL migration 0008 adds `gin_trgm_ops` indexes on `UPPER(col::text)`,
+	which is exactly the expression Django emits for `icontains`, so these
+	lookups become index scans there.
+	"""
+
+	def filter(self, kind: str, q: str, prefix: str = "") -> Q:
+		_model, fields, _code = SEARCH_KINDS[kind]
+		return reduce(or_, (Q(**{f"{prefix}{field}__icontains": q}) for field in fields))
+
+
+class SqliteFtsSearchBackend(SearchBackend):
+	"""SQLite FTS5 (trigram tokenizer) shadow table kept in sync by signals.
+
+	Trigrams need at least three characters; shorter queries use LIKE.
+	"""
+
+	maintains_index = True
+	min_length = 3
+
+	def __init__(self) -> None:
+		self.fallback = LikeSearchBackend()
+
+	def filter(self, kind: str, q: str, prefix: str = "") -> Q:
+		if len(q) < self.min_length:
+			return self.fallback.filter(kind, q, prefix)
+		_model, _fields, code = SEARCH_KINDS[kind]
+		match = '"{}"'.format(q.replace('"', '""'))
+		low = code << KIND_SHIFT
+		subquery = RawSQL(
+			f"SELECT rowid - %s FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid >= %s AND rowid < %s",
+			(low, match, low, (code + 1) << KIND_SHIFT),
+		)
+		return Q(**{f"{prefix}pk__in": subquery})
+
+	@staticmethod
+	def _body(obj: Model, fields: tuple[str, ...]) -> str:
+		return "\n".join(str(getattr(obj, field) or "") for field in fields)
+
+	def index_object(self, obj: Model) -> None:
+		kind = MODEL_KINDS[type(obj)]
+		_model, fields, code = SEARCH_KINDS[kind]
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)",
+				[(code << KIND_SHIFT) + obj.pk, self._body(obj, fields)],
+			)
+
+	def index_objects(self, objs: Iterable[Model]) -> None:
+		rows = []
+		for obj in objs:
+			_model, fields, code = SEARCH_KINDS[MODEL_KINDS[type(obj)]]
+			rows.append(((code << KIND_SHIFT) + obj.pk, self._body(obj, fields)))
+		with connection.cursor() as cursor:
+			cursor.executemany(f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)", rows)
+
+	def remove_object(self, obj: Model) -> None:
+		_model, _fields, code = SEARCH_KINDS[MODEL_KINDS[type(obj)]]
+		with connection.cursor() as cursor:
+			cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(code << KIND_SHIFT) + obj.pk])
+
+	def rebuild(self) -> int:
+		qn = connection.ops.quote_name
+		total = 0
+		with connection.cursor() as cursor:
+			cursor.execute(f"DELETE FROM {FTS_TABLE}")
+			for model, fields, code in SEARCH_KINDS.values():
+				meta = model._meta
+				body = " || char(10) || ".join(
+					f"COALESCE({qn(meta.get_field(field).column)}, '')" for field in fields
+				)
+				cursor.execute(
+					f"INSERT INTO {FTS_TABLE} (rowid, body) "
+					f"SELECT {qn(meta.pk.column)} + %s, {body} FROM {qn(meta.db_table)}",
+					[code << KIND_SHIFT],
+				)
+				total += max(cursor.rowcount, 0)
+		return total
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path: str, vendor: str) -> SearchBackend:
+	if path == "auto":
+		return SqliteFtsSearchBackend() if vendor == "sqlite" else LikeSearchBackend()
+	return import_string(path)()
+
+
+def get_search_backend() -> SearchBackend:
+	return _load_backend(getattr(settings, "SEARCH_BACKEND", "auto"), connection.vendor)
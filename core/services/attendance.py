@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Attendance, AttendanceStatus, Child, ChildStatus, attendance_rule_errors
+from core.services.attendance_summary import SummaryScope, refresh_scope, summary_paused
+
+# Dates per INSERT statement; keeps the parameter count well below SQLite's limit.
+DAYS_PER_STATEMENT = 62
+
+
+@dataclass(frozen=True)
+class MaterializeResult:
+	created: int
+	days: int
+	elapsed: float
+
+
+def _date_range(start: date, end: date) -> list[date]:
+	return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def _insert_sql(day_count: int, with_classroom: bool) -> str:
+	att = Attendance._meta
+	child = Child._meta
+
+	def col(meta, name: str) -> str:
+		return connection.ops.quote_name(meta.get_field(name).column)
+
+	day_param = "CAST(%s AS DATE)" if connection.vendor == "postgresql" else "%s"
+	days_sql = " UNION ALL ".join(f"SELECT {day_param} AS day" for _ in range(day_count))
+	classroom_sql = f" AND c.{col(child, 'classroom')} = %s" if with_classroom else ""
+	return (
+		f"INSERT INTO {connection.ops.quote_name(att.db_table)} "
+		f"({col(att, 'child')}, {col(att, 'attendance_date')}, {col(att, 'status')}, "
+		f"{col(att, 'absence_reason')}, {col(att, 'notes')}, {col(att, 'created_at')}, {col(att, 'updated_at')}) "
+		f"SELECT c.{col(child, 'id')}, d.day, %s, '', '', %s, %s "
+		f"FROM {connection.ops.quote_name(child.db_table)} c CROSS JOIN ({days_sql}) d "
+		f"WHERE c.{col(child, 'status')} = %s{classroom_sql} "
+		f"AND NOT EXISTS (SELECT 1 FROM {connection.ops.quote_name(att.db_table)} a "
+		f"WHERE a.{col(att, 'child')} = c.{col(child, 'id')} AND a.{col(att, 'attendance_date')} = d.day) "
+		f"ON CONFLICT ({col(att, 'child')}, {col(att, 'attendance_date')}) DO NOTHING"
+	)
+
+
+def materialize_attendance(
+	start: date,
+	end: date | None = None,
+	*,
+	classroom_id: int | str | None = None,
+) -> MaterializeResult:
+	"""Insert missing EXPECTED rows for every active child and every day in [start, end].
+
+	Idempotent: rows that already exist are left untouched, so re-running it
+	(e.g. from cron, or after a child is activated mid-day) only fills gaps.
+	"""
+	end = end or start
+	if end < start:
+		raise ValueError("End date must not be before start date.")
+
+	started = time.perf_counter()
+	days = _date_range(start, end)
+	now = connection.ops.adapt_datetimefield_value(timezone.now())
+	created = 0
+	with transaction.atomic(), connection.cursor() as cursor:
+		for idx in range(0, len(days), DAYS_PER_STATEMENT):
+			chunk = days[idx : idx + DAYS_PER_STATEMENT]
+			params: list[object] = [AttendanceStatus.EXPECTED.value, now, now]
+			params.extend(connection.ops.adapt_datefield_value(day) for day in chunk)
+			params.append(ChildStatus.ACTIVE.value)
+			if classroom_id is not None:
+				params.append(int(classroom_id))
+			cursor.execute(_insert_sql(len(chunk), classroom_id is not None), params)
+			created += max(cursor.rowcount, 0)
+		if created:
+			children = Child.objects.filter(classroom_id=classroom_id).values("id") if classroom_id is not None else None
+			refresh_scope(SummaryScope(start, end, children))
+	return MaterializeResult(created=created, days=len(days), elapsed=time.perf_counter() - started)
+
+
+MAX_BATCH_ITEMS = 500
+BATCH_FIELDS = ("status", "check_in_time", "check_out_time", "absence_reason")
+
+
+@dataclass
+class _BatchItem:
+	index: int
+	attendance_id: int | None = None
+	child_id: int | None = None
+	attendance_date: date | None = None
+	changes: dict[str, object] = field(default_factory=dict)
+	errors: dict[str, str] = field(default_factory=dict)
+	row: Attendance | None = None
+
+
+def _parse_int(value: object) -> int | None:
+	if isinstance(value, bool):
+		return None
+	try:
+		return int(value)  # type: ignore[arg-type]
+	except (TypeError, ValueError):
+		return None
+
+
+def _parse_batch_item(index: int, raw: object, default_date: date) -> _BatchItem:
+	item = _BatchItem(index=index)
+	if not isinstance(raw, dict):
+		item.errors["__all__"] = "Item must be an object."
+		return item
+
+	if raw.get("attendance_id") is not None:
+		item.attendance_id = _parse_int(raw["attendance_id"])
+		if item.attendance_id is None:
+			item.errors["attendance_id"] = "Invalid attendance id."
+	elif raw.get("child_id") is not None:
+		item.child_id = _parse_int(raw["child_id"])
+		if item.child_id is None:
+			item.errors["child_id"] = "Invalid child id."
+		try:
+			item.attendance_date = (
+				datetime.strptime(raw["date"], "%Y-%m-%d").date() if raw.get("date") else default_date
+			)
+		except (TypeError, ValueError):
+			item.errors["date"] = "Date must be in YYYY-MM-DD format."
+	else:
+		item.errors["__all__"] = "attendance_id or child_id is required."
+
+	if "status" in raw:
+		if raw["status"] not in AttendanceStatus.values:
+			item.errors["status"] = "Invalid status."
+		else:
+			item.changes["status"] = raw["status"]
+	for name in ("check_in_time", "check_out_time"):
+		if name not in raw:
+			continue
+		if raw[name] in (None, ""):
+			item.changes[name] = None
+			continue
+		try:
+			item.changes[name] = datetime.strptime(str(raw[name]), "%H:%M").time()
+		except ValueError:
+			item.errors[name] = "Time must be in HH:MM format."
+	if "absence_reason" in raw:
+		reason = str(raw["absence_reason"] or "")
+		max_length = Attendance._meta.get_field("absence_reason").max_length
+		if max_length is not None and len(reason) > max_length:
+			item.errors["absence_reason"] = f"Absence reason must be at most {max_length} characters."
+		else:
+			item.changes["absence_reason"] = reason
+	return item
+
+
+def apply_attendance_batch(raw_items: list[object], default_date: date) -> list[dict[str, object]]:
+	"""Validate and apply many attendance changes in one transaction.
+
+	Rows are addressed by `attendance_id`, or by `child_id` (+ optional `date`),
+	in which case a missing row is created, but only for an item that passes
+	validation. Valid rows are written with a single bulk_update; invalid rows
+	are reported and left untouched.
+	"""
+	items = [_parse_batch_item(idx, raw, default_date) for idx, raw in enumerate(raw_items)]
+	pending = [item for item in items if not item.errors]
+
+	with transaction.atomic():
+		# The inserts and the bulk_update share one rollup refresh below.
+		with summary_paused():
+			by_id = Attendance.objects.in_bulk([item.attendance_id for item in pending if item.attendance_id])
+			for item in pending:
+				if item.attendance_id:
+					item.row = by_id.get(item.attendance_id)
+
+			keyed = [item for item in pending if item.child_id]
+			if keyed:
+				known_children = set(
+					Child.objects.filter(pk__in={item.child_id for item in keyed}).values_list("pk", flat=True)
+				)
+				# A row also addressed by attendance_id shares that object, so
+				# the changes of both items are merged rather than overwritten.
+				by_key = {
+					(row.child_id, row.attendance_date): by_id.setdefault(row.pk, row)
+					for row in Attendance.objects.filter(
+						child_id__in=known_children, attendance_date__in={item.attendance_date for item in keyed}
+					)
+				}
+				for item in keyed:
+					key = (item.child_id, item.attendance_date)
+					if key not in by_key and item.child_id in known_children:
+						# Unsaved until an item for it passes validation.
+						by_key[key] = Attendance(
+							child_id=item.child_id, attendance_date=item.attendance_date, status=AttendanceStatus.EXPECTED
+						)
+					item.row = by_key.get(key)
+
+			now = timezone.now()
+			to_update: dict[int, Attendance] = {}
+			to_create: dict[tuple[int, date], Attendance] = {}
+			for item in pending:
+				row = item.row
+				if row is None:
+					item.errors["__all__"] = "Attendance not found."
+					continue
+				merged = {name: item.changes.get(name, getattr(row, name)) for name in BATCH_FIELDS}
+				rule_errors = attendance_rule_errors(
+					merged["status"], merged["check_in_time"], merged["check_out_time"], merged["absence_reason"]
+				)
+				if rule_errors:
+					item.errors.update(rule_errors)
+					continue
+				for name, value in merged.items():
+					setattr(row, name, value)
+				row.updated_at = now
+				if row.pk is None:
+					to_create[(row.child_id, row.attendance_date)] = row
+				else:
+					to_update[row.pk] = row
+
+			if to_create:
+				# Inserted as EXPECTED and then updated like the rest, so a row
+				# another request created meanwhile gets the same changes.
+				Attendance.objects.bulk_create(
+					[
+						Attendance(child_id=child_id, attendance_date=day, status=AttendanceStatus.EXPECTED)
+						for child_id, day in to_create
+					],
+					ignore_conflicts=True,
+				)
+				stored = {
+					(row.child_id, row.attendance_date): row
+					for row in Attendance.objects.filter(
+						child_id__in={child_id for child_id, _ in to_create},
+						attendance_date__in={day for _, day in to_create},
+					)
+				}
+				for key, draft in to_create.items():
+					row = stored[key]
+					for name in (*BATCH_FIELDS, "updated_at"):
+						setattr(row, name, getattr(draft, name))
+					to_update[row.pk] = row
+				for item in pending:
+					if not item.errors and item.row.pk is None:
+						item.row = stored[(item.row.child_id, item.row.attendance_date)]
+
+			if to_update:
+				Attendance.objects.bulk_update(list(to_update.values()), [*BATCH_FIELDS, "updated_at"])
+		refresh_scope(SummaryScope.for_objects(item.row for item in pending if item.row is not None and item.row.pk))
+
+	results: list[dict[str, object]] = []
+	for item in items:
+		if item.errors:
+			results.append({"index": item.index, "ok": False, "errors": item.errors})
+			continue
+		row = item.row
+		results.append(
+			{
+				"index": item.index,
+				"ok": True,
+				"attendance_id": row.pk,
+				"child_id": row.child_id,
+				"date": row.attendance_date.isoformat(),
+				"status": row.status,
+				"check_in_time": row.check_in_time.strftime("%H:%M") if row.check_in_time else None,
+				"check_out_time": row.check_out_time.strftime("%H:%M") if row.check_out_time else None,
+			}
+		)
+	return results
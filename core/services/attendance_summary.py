@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, QuerySet
+from django.utils import timezone
+
+from core.fragment_cache import ATTENDANCE
+from core.live import publish_attendance_change
+from core.models import Attendance, AttendanceMonthlySummary, AttendanceStatus
+from core.reference_cache import invalidate
+
+# Above this many children a scope refreshes whole months instead of an IN list.
+MAX_SCOPED_CHILDREN = 500
+
+_paused: ContextVar[bool] = ContextVar("attendance_summary_paused", default=False)
+
+
+@contextmanager
+def summary_paused() -> Iterator[None]:
+	"""Skip incremental refreshes and live events (bulk loads); refresh the affected range afterwards."""
+	token = _paused.set(True)
+	try:
+		yield
+	finally:
+		_paused.reset(token)
+
+
+def summary_is_paused() -> bool:
+	return _paused.get()
+
+
+def _month_start(value: date) -> date:
+	return value.replace(day=1)
+
+
+def next_month(value: date) -> date:
+	return (value.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def months_between(start: date, end: date) -> list[date]:
+	months = []
+	month = _month_start(start)
+	while month <= end:
+		months.append(month)
+		month = next_month(month)
+	return months
+
+
+@dataclass(frozen=True)
+class SummaryScope:
+	"""Date range and (optionally) children whose monthly rollups must be recomputed."""
+
+	start: date
+	end: date
+	child_ids: frozenset[int] | None = None
+
+	@classmethod
+	def _build(cls, dates: Iterable[date], child_ids: set[int]) -> "SummaryScope | None":
+		dates = [value for value in dates if value is not None]
+		if not dates:
+			return None
+		ids = frozenset(child_ids) if len(child_ids) <= MAX_SCOPED_CHILDREN else None
+		return cls(min(dates), max(dates), ids)
+
+	@classmethod
+	def for_objects(cls, objs: Iterable[Attendance]) -> "SummaryScope | None":
+		dates: list[date] = []
+		child_ids: set[int] = set()
+		for obj in objs:
+			keys = [(obj.child_id, obj.attendance_date)]
+			if hasattr(obj, "_loaded_summary_key"):
+				keys.append(obj._loaded_summary_key)
+			for child_id, day in keys:
+				if child_id is not None and day is not None:
+					child_ids.add(child_id)
+					dates.append(day)
+		return cls._build(dates, child_ids)
+
+	@classmethod
+	def for_queryset(cls, qs: QuerySet[Attendance]) -> "SummaryScope | None":
+		stats = qs.order_by().aggregate(
+			start=Min("attendance_date"),
+			end=Max("attendance_date"),
+			children=Count("child_id", distinct=True),
+		)
+		if stats["start"] is None:
+			return None
+		child_ids = None
+		if stats["children"] <= MAX_SCOPED_CHILDREN:
+			child_ids = frozenset(qs.order_by().values_list("child_id", flat=True).distinct())
+		return cls(stats["start"], stats["end"], child_ids)
+
+	def moved_to(self, changes: Mapping[str, object]) -> "SummaryScope":
+		"""Widen the scope for an update() that moves rows to another date or child."""
+		start, end, child_ids = self.start, self.end, self.child_ids
+		new_date = changes.get("attendance_date")
+		if isinstance(new_date, date):
+			start, end = min(start, new_date), max(end, new_date)
+		if "child" in changes or "child_id" in changes:
+			new_child = changes.get("child_id", changes.get("child"))
+			new_child = getattr(new_child, "pk", new_child)
+			child_ids = child_ids | {new_child} if child_ids is not None and isinstance(new_child, int) else None
+		return SummaryScope(start, end, child_ids)
+
+
+def _upsert_sql(month_sql: str) -> str:
+	qn = connection.ops.quote_name
+	meta = AttendanceMonthlySummary._meta
+	counts = list(AttendanceStatus.values)
+	columns = ["child", "month", *counts, "updated_at"]
+	target = ", ".join(qn(meta.get_field(name).column) for name in columns)
+	month_param = "CAST(%s AS DATE)" if connection.vendor == "postgresql" else "%s"
+	select = ", ".join(["s.child_id", month_param, *(f"s.{qn(name)}" for name in counts), "%s"])
+	update = ", ".join(
+		f"{qn(meta.get_field(name).column)} = excluded.{qn(meta.get_field(name).column)}"
+		for name in [*counts, "updated_at"]
+	)
+	unique = f"{qn(meta.get_field('child').column)}, {qn(meta.get_field('month').column)}"
+	# "WHERE true" lets SQLite parse ON CONFLICT after INSERT ... SELECT.
+	return (
+		f"INSERT INTO {qn(meta.db_table)} ({target}) "
+		f"SELECT {select} FROM ({month_sql}) s WHERE true "
+		f"ON CONFLICT ({unique}) DO UPDATE SET {update}"
+	)
+
+
+def refresh_attendance_summary(
+	start: date,
+	end: date | None = None,
+	*,
+	child_ids: Iterable[int] | QuerySet | None = None,
+) -> int:
+	"""Recompute the rollup rows of every month touching [start, end].
+
+	One grouped INSERT ... SELECT upsert per month, then rollup rows left with
+	no attendance are removed. `child_ids` (ids or a values("id") queryset)
+	limits the refresh to those children.
+	"""
+	refreshed = 0
+	with transaction.atomic():
+		for month in months_between(start, end or start):
+			attendance = Attendance.objects.filter(attendance_date__gte=month, attendance_date__lt=next_month(month))
+			summaries = AttendanceMonthlySummary.objects.filter(month=month)
+			if child_ids is not None:
+				attendance = attendance.filter(child_id__in=child_ids)
+				summaries = summaries.filter(child_id__in=child_ids)
+			grouped = (
+				attendance.order_by()
+				.values("child_id")
+				.annotate(**{status: Count("pk", filter=Q(status=status)) for status in AttendanceStatus.values})
+			)
+			sql, params = grouped.query.sql_with_params()
+			now = timezone.now()
+			ops = connection.ops
+			with connection.cursor() as cursor:
+				cursor.execute(
+					_upsert_sql(sql),
+					[ops.adapt_datefield_value(month), ops.adapt_datetimefield_value(now), *params],
+				)
+				refreshed += max(cursor.rowcount, 0)
+			summaries.exclude(updated_at=now).delete()
+	return refreshed
+
+
+def refresh_scope(scope: SummaryScope | None, *, rollup: bool = True) -> int:
+	"""Announce `scope` to the live board and the list fragments and, if `rollup`, recompute its summary rows."""
+	if scope is None:
+		return 0
+	invalidate(ATTENDANCE)
+	if summary_is_paused():
+		return 0
+	publish_attendance_change(scope)
+	if not rollup:
+		return 0
+	return refresh_attendance_summary(scope.start, scope.end, child_ids=scope.child_ids)
+
+
+@dataclass(frozen=True)
+class SummaryRebuildResult:
+	months: int
+	rows: int
+	elapsed: float
+
+
+def rebuild_attendance_summary(start: date | None = None, end: date | None = None) -> SummaryRebuildResult:
+	"""Backfill: recompute every month in [start, end] (default: all attendance), one transaction per month."""
+	started = time.perf_counter()
+	if start is None or end is None:
+		bounds = Attendance.objects.order_by().aggregate(start=Min("attendance_date"), end=Max("attendance_date"))
+		start = start or bounds["start"]
+		end = end or bounds["end"]
+	if start is None or end is None:
+		return SummaryRebuildResult(0, 0, time.perf_counter() - started)
+	months = months_between(start, end)
+	rows = sum(refresh_attendance_summary(month) for month in months)
+	return SummaryRebuildResult(len(months), rows, time.perf_counter() - started)
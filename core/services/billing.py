@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.fragment_cache import BILLING
+from core.models import (
+	Child,
+	ChildStatus,
+	MonthlyBilling,
+	MonthlyBillingStatus,
+	Tariff,
+	_validate_billing_month,
+	current_billing_month,
+)
+from core.reference_cache import invalidate
+
+
+@dataclass(frozen=True)
+class BillingRunResult:
+	months: list[str]
+	created: int
+	elapsed: float
+
+
+def month_range(start: str, end: str | None = None) -> list[str]:
+	"""Inclusive list of YYYY-MM strings from `start` to `end`."""
+	end = end or start
+	for value in (start, end):
+		_validate_billing_month(value)
+	year, month = int(start[:4]), int(start[5:7])
+	end_key = (int(end[:4]), int(end[5:7]))
+	if (year, month) > end_key:
+		raise ValidationError("End month must not be before start month.")
+	months: list[str] = []
+	while (year, month) <= end_key:
+		months.append(f"{year:04d}-{month:02d}")
+		month += 1
+		if month > 12:
+			month = 1
+			year += 1
+	return months
+
+
+def recent_months(count: int, through: str | None = None) -> list[str]:
+	"""The last `count` YYYY-MM months, ending with `through` (default: the current month)."""
+	through = through or current_billing_month()
+	_validate_billing_month(through)
+	index = int(through[:4]) * 12 + int(through[5:7]) - count
+	return month_range(f"{index // 12:04d}-{index % 12 + 1:02d}", through)
+
+
+def _insert_sql() -> str:
+	qn = connection.ops.quote_name
+	mb = MonthlyBilling._meta
+	child = Child._meta
+	tariff = Tariff._meta
+
+	def col(meta, name: str) -> str:
+		return qn(meta.get_field(name).column)
+
+	return (
+		f"INSERT INTO {qn(mb.db_table)} "
+		f"({col(mb, 'child')}, {col(mb, 'tariff')}, {col(mb, 'billing_month')}, {col(mb, 'base_amount')}, "
+		f"{col(mb, 'amount')}, {col(mb, 'paid_amount')}, {col(mb, 'balance')}, {col(mb, 'status')}, "
+		f"{col(mb, 'notes')}, {col(mb, 'created_at')}, {col(mb, 'updated_at')}) "
+		f"SELECT c.{col(child, 'id')}, c.{col(child, 'tariff')}, %s, COALESCE(t.{col(tariff, 'amount')}, 0), "
+		f"COALESCE(t.{col(tariff, 'amount')}, 0), 0, COALESCE(t.{col(tariff, 'amount')}, 0), %s, '', %s, %s "
+		f"FROM {qn(child.db_table)} c "
+		f"LEFT JOIN {qn(tariff.db_table)} t ON t.{col(tariff, 'id')} = c.{col(child, 'tariff')} "
+		f"WHERE c.{col(child, 'status')} = %s "
+		f"AND NOT EXISTS (SELECT 1 FROM {qn(mb.db_table)} b "
+		f"WHERE b.{col(mb, 'child')} = c.{col(child, 'id')} AND b.{col(mb, 'billing_month')} = %s) "
+		f"ON CONFLICT ({col(mb, 'child')}, {col(mb, 'billing_month')}) DO NOTHING"
+	)
+
+
+def generate_billing(month: str, through: str | None = None) -> BillingRunResult:
+	"""Create missing UNPAID rows for every active child, one statement per month.
+
+	The amount and tariff are snapshotted from the child's tariff at run time
+	(prorate with core.services.proration); existing rows (paid or not) are
+	never modified, so re-running is safe.
+	"""
+	started = time.perf_counter()
+	months = month_range(month, through)
+	sql = _insert_sql()
+	now = connection.ops.adapt_datetimefield_value(timezone.now())
+	created = 0
+	with transaction.atomic(), connection.cursor() as cursor:
+		for billing_month in months:
+			cursor.execute(
+				sql,
+				[billing_month, MonthlyBillingStatus.UNPAID.value, now, now, ChildStatus.ACTIVE.value, billing_month],
+			)
+			created += max(cursor.rowcount, 0)
+	if created:
+		# Raw SQL: MonthlyBillingQuerySet never sees these rows.
+		invalidate(BILLING)
+	return BillingRunResult(months=months, created=created, elapsed=time.perf_counter() - started)
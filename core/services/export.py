@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import csv
+import os
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from core.forms import ListFilters
+from core.models import (
+	Attendance,
+	AttendanceStatus,
+	ExportFormat,
+	ExportJob,
+	ExportJobStatus,
+	ExportKind,
+	MonthlyBilling,
+	MonthlyBillingStatus,
+	current_billing_month,
+)
+from core.pagination import seek_filter
+from core.services.billing import month_range
+from core.xlsx import stream_xlsx
+
+CONTENT_TYPES = {
+	ExportFormat.CSV: "text/csv; charset=utf-8",
+	ExportFormat.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# A RUNNING job whose checkpoint is older than this is assumed to belong to a
+# crashed worker and may be resumed by another one.
+STALE_AFTER = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class Column:
+	header: str
+	field: str
+	numeric: bool = False
+	labels: Mapping[str, str] = field(default_factory=dict)
+
+	def format(self, value: Any) -> str:
+		if value is None:
+			return ""
+		if self.labels:
+			return str(self.labels.get(value, value))
+		if isinstance(value, datetime):
+			return timezone.localtime(value).strftime("%Y-%m-%d %H:%M")
+		if isinstance(value, date):
+			return value.isoformat()
+		if isinstance(value, time):
+			return value.strftime("%H:%M")
+		return str(value)
+
+
+ATTENDANCE_COLUMNS = (
+	Column("Sana", "attendance_date"),
+	Column("Familiya", "child__last_name"),
+	Column("Ism", "child__first_name"),
+	Column("Guruh", "child__classroom__name"),
+	Column("Holat", "status", labels=dict(AttendanceStatus.choices)),
+	Column("Kirish vaqti", "check_in_time"),
+	Column("Chiqish vaqti", "check_out_time"),
+	Column("Sabab", "absence_reason"),
+	Column("Izoh", "notes"),
+)
+
+BILLING_COLUMNS = (
+	Column("Oy", "billing_month"),
+	Column("Familiya", "child__last_name"),
+	Column("Ism", "child__first_name"),
+	Column("Guruh", "child__classroom__name"),
+	Column("Tarif", "tariff__name"),
+	Column("Summa", "amount", numeric=True),
+	Column("To‘langan summa", "paid_amount", numeric=True),
+	Column("Qoldiq", "balance", numeric=True),
+	Column("Holat", "status", labels=dict(MonthlyBillingStatus.choices)),
+	Column("To‘langan vaqt", "paid_at"),
+	Column("Izoh", "notes"),
+)
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+	"""A filtered export: `queryset` yields value tuples of the columns followed by `id`."""
+
+	kind: str
+	columns: tuple[Column, ...]
+	queryset: QuerySet
+	filename: str
+
+	@property
+	def header(self) -> list[str]:
+		return [column.header for column in self.columns]
+
+	@property
+	def numeric(self) -> list[bool]:
+		return [column.numeric for column in self.columns]
+
+	@property
+	def ordering(self) -> tuple[str, str]:
+		# The first column (date / month) plus the primary key: a unique key
+		# that both the stream and resumable jobs read in.
+		return (self.columns[0].field, "id")
+
+	def key_for(self, row: tuple) -> list[Any]:
+		return [row[0], row[-1]]
+
+	def format_row(self, row: tuple) -> list[str]:
+		return [column.format(value) for column, value in zip(self.columns, row)]
+
+	def exceeds(self, limit: int) -> bool:
+		"""True when the export has more than `limit` rows (bounded count)."""
+		return self.queryset.order_by()[: limit + 1].count() > limit
+
+
+def _parse_day(value: Any, name: str) -> date | None:
+	value = str(value or "").strip()
+	if not value:
+		return None
+	try:
+		return datetime.strptime(value, "%Y-%m-%d").date()
+	except ValueError:
+		raise ValidationError({name: "Enter a date in YYYY-MM-DD format."})
+
+
+def attendance_export(params: Mapping[str, Any]) -> ExportSpec:
+	start = _parse_day(params.get("date_from"), "date_from") or _parse_day(params.get("date"), "date")
+	start = start or timezone.localdate()
+	end = _parse_day(params.get("date_to"), "date_to") or start
+	if end < start:
+		raise ValidationError({"date_to": "End date must not be before start date."})
+
+	qs = Attendance.objects.filter(attendance_date__range=(start, end))
+	filename = f"davomat_{start:%Y%m%d}" + (f"-{end:%Y%m%d}" if end != start else "")
+	return _spec(ExportKind.ATTENDANCE, ATTENDANCE_COLUMNS, ListFilters.from_params(params).apply(qs), filename)
+
+
+def billing_export(params: Mapping[str, Any]) -> ExportSpec:
+	first = str(params.get("month_from") or params.get("month") or current_billing_month()).strip()[:7]
+	last = str(params.get("month_to") or first).strip()[:7]
+	months = month_range(first, last)
+
+	qs = MonthlyBilling.objects.filter(billing_month__gte=months[0], billing_month__lte=months[-1])
+	filename = f"oylik_tolov_{months[0]}" + (f"_{months[-1]}" if len(months) > 1 else "")
+	return _spec(ExportKind.BILLING, BILLING_COLUMNS, ListFilters.from_params(params).apply(qs), filename)
+
+
+def _spec(kind: str, columns: tuple[Column, ...], qs: QuerySet, filename: str) -> ExportSpec:
+	fields = [column.field for column in columns]
+	qs = qs.order_by(columns[0].field, "id").values_list(*fields, "id")
+	return ExportSpec(kind, columns, qs, filename)
+
+
+EXPORTS: dict[str, Callable[[Mapping[str, Any]], ExportSpec]] = {
+	ExportKind.ATTENDANCE: attendance_export,
+	ExportKind.BILLING: billing_export,
+}
+
+
+def build_export(kind: str, params: Mapping[str, Any]) -> ExportSpec:
+	try:
+		return EXPORTS[kind](params)
+	except KeyError:
+		raise ValidationError(f"Unknown export: {kind}")
+
+
+class _Echo:
+	"""File-like object whose write() returns the value, for csv.writer streaming."""
+
+	def write(self, value: str) -> str:
+		return value
+
+
+def _rows(spec: ExportSpec, chunk_size: int) -> Iterator[list[str]]:
+	for row in spec.queryset.iterator(chunk_size=chunk_size):
+		yield spec.format_row(row)
+
+
+def stream_csv(spec: ExportSpec, *, chunk_size: int | None = None) -> Iterator[bytes]:
+	"""CSV export (UTF-8 with BOM so Excel detects the encoding), one read chunk per yield."""
+	chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+	writer = csv.writer(_Echo())
+	yield ("\ufeff" + writer.writerow(spec.header)).encode()
+	pending: list[str] = []
+	for row in _rows(spec, chunk_size):
+		pending.append(writer.writerow(row))
+		if len(pending) >= chunk_size:
+			yield "".join(pending).encode()
+			pending.clear()
+	if pending:
+		yield "".join(pending).encode()
+
+
+def stream_export(spec: ExportSpec, file_format: str, *, chunk_size: int | None = None) -> Iterator[bytes]:
+	chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+	if file_format == ExportFormat.XLSX:
+		return stream_xlsx(
+			spec.header,
+			spec.numeric,
+			_rows(spec, chunk_size),
+			sheet_name=spec.filename,
+			rows_per_chunk=chunk_size,
+		)
+	return stream_csv(spec, chunk_size=chunk_size)
+
+
+def export_filename(spec: ExportSpec, file_format: str) -> str:
+	return f"{spec.filename}.{file_format}"
+
+
+def export_root() -> Path:
+	root = Path(settings.EXPORT_ROOT)
+	root.mkdir(parents=True, exist_ok=True)
+	return root
+
+
+def _part_path(job: ExportJob) -> Path:
+	return export_root() / f"job-{job.pk}.csv.part"
+
+
+def job_file_path(job: ExportJob) -> Path:
+	return export_root() / job.file_name
+
+
+def claim_export_job(job: ExportJob) -> bool:
+	"""Atomically move a pending or stale running job to RUNNING for this worker."""
+	now = timezone.now()
+	claimed = ExportJob.objects.filter(
+		pk=job.pk, status=job.status, updated_at=job.updated_at
+	).update(status=ExportJobStatus.RUNNING, updated_at=now)
+	if claimed:
+		job.status = ExportJobStatus.RUNNING
+		job.updated_at = now
+	return bool(claimed)
+
+
+def runnable_export_jobs() -> QuerySet[ExportJob]:
+	stale = timezone.now() - STALE_AFTER
+	return ExportJob.objects.filter(
+		Q(status=ExportJobStatus.PENDING) | Q(status=ExportJobStatus.RUNNING, updated_at__lt=stale)
+	).order_by("created_at")
+
+
+def run_export_job(job: ExportJob, *, chunk_size: int | None = None, max_chunks: int | None = None) -> ExportJob:
+	"""Write `job` to EXPORT_ROOT in keyset chunks, checkpointing after each one.
+
+	Rows are appended to a CSV part file; after a crash the file is truncated to
+	the last checkpoint and the export continues after `job.cursor`. XLSX jobs
+	convert the finished part file. `max_chunks` stops early and re-queues the job.
+	"""
+	chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+	try:
+		spec = build_export(job.kind, job.params)
+		if _write_part(job, spec, chunk_size, max_chunks):
+			_finish(job, spec)
+		else:
+			# Stopped by `max_chunks`: hand the job back to the queue.
+			job.status = ExportJobStatus.PENDING
+			job.save(update_fields=["status", "updated_at"])
+	except Exception as exc:
+		job.status = ExportJobStatus.FAILED
+		job.error = str(exc)
+		job.finished_at = timezone.now()
+		job.save(update_fields=["status", "error", "finished_at", "updated_at"])
+		raise
+	return job
+
+
+def _write_part(job: ExportJob, spec: ExportSpec, chunk_size: int, max_chunks: int | None) -> bool:
+	path = _part_path(job)
+	if job.bytes_written and path.exists():
+		fh = path.open("r+b")
+		fh.truncate(job.bytes_written)
+		fh.seek(job.bytes_written)
+	else:
+		fh = path.open("wb")
+		job.cursor, job.rows_written = None, 0
+		fh.write("\ufeff".encode() + _csv_line(spec.header))
+
+	chunks = 0
+	with fh:
+		while max_chunks is None or chunks < max_chunks:
+			qs = spec.queryset
+			if job.cursor is not None:
+				qs = qs.filter(seek_filter(spec.ordering, job.cursor))
+			rows = list(qs[:chunk_size])
+			if rows:
+				fh.write(b"".join(_csv_line(spec.format_row(row)) for row in rows))
+				fh.flush()
+				os.fsync(fh.fileno())
+				job.cursor = spec.key_for(rows[-1])
+				job.rows_written += len(rows)
+			job.bytes_written = fh.tell()
+			job.save(update_fields=["cursor", "rows_written", "bytes_written", "updated_at"])
+			chunks += 1
+			if len(rows) < chunk_size:
+				return True
+	return False
+
+
+def _csv_line(values: Iterable[str]) -> bytes:
+	return csv.writer(_Echo()).writerow(list(values)).encode()
+
+
+def _finish(job: ExportJob, spec: ExportSpec) -> None:
+	part = _part_path(job)
+	name = f"job-{job.pk}-{export_filename(spec, job.file_format)}"
+	target = export_root() / name
+	if job.file_format == ExportFormat.XLSX:
+		with part.open(encoding="utf-8-sig", newline="") as src, target.open("wb") as dst:
+			reader = csv.reader(src)
+			next(reader)
+			for chunk in stream_xlsx(spec.header, spec.numeric, reader, sheet_name=spec.filename):
+				dst.write(chunk)
+		part.unlink()
+	else:
+		part.replace(target)
+	job.file_name = name
+	job.status = ExportJobStatus.DONE
+	job.error = ""
+	job.finished_at = timezone.now()
+	job.save(update_fields=["file_name", "status", "error", "finished_at", "updated_at"])
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import csv
+import time
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import TextIO
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from core import fragment_cache, reference_cache
+from core.forms import capacity_error, validate_birth_date, validate_phone
+from core.models import Child, ChildStatus, Classroom, Guardian, Tariff
+from core.search import get_search_backend
+
+DEFAULT_CHUNK_SIZE = 1000
+
+CHILD_COLUMNS = ("first_name", "last_name", "birth_date", "classroom")
+GUARDIAN_COLUMNS = ("guardian_first_name", "guardian_last_name", "guardian_phone", "guardian_email")
+# Full header, in template order; only CHILD_COLUMNS are required.
+COLUMNS = (
+	*CHILD_COLUMNS,
+	"classroom_age_group",
+	"classroom_capacity",
+	"tariff",
+	"status",
+	*GUARDIAN_COLUMNS,
+	"guardian_is_primary",
+)
+
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y")
+TRUE_VALUES = {"1", "true", "yes", "ha", "x"}
+
+
+@dataclass(frozen=True)
+class RowError:
+	line: int
+	field: str
+	message: str
+
+
+@dataclass
+class ImportResult:
+	rows: int = 0
+	children: int = 0
+	guardians: int = 0
+	classrooms: int = 0
+	errors: list[RowError] = field(default_factory=list)
+	elapsed: float = 0.0
+	dry_run: bool = False
+
+	@property
+	def failed_rows(self) -> int:
+		return len({error.line for error in self.errors})
+
+	def write_error_report(self, fh: TextIO) -> None:
+		writer = csv.writer(fh)
+		writer.writerow(["line", "field", "message"])
+		writer.writerows((error.line, error.field, error.message) for error in self.errors)
+
+
+class _RowInvalid(Exception):
+	def __init__(self, errors: dict[str, str]) -> None:
+		self.errors = errors
+
+
+def _parse_date(value: str) -> date:
+	for fmt in DATE_FORMATS:
+		try:
+			return datetime.strptime(value, fmt).date()
+		except ValueError:
+			continue
+	raise ValidationError("Enter a date in YYYY-MM-DD or DD.MM.YYYY format.")
+
+
+def _child_key(first_name: str, last_name: str, birth_date: date, classroom: str) -> tuple:
+	return (first_name.casefold(), last_name.casefold(), birth_date, classroom.casefold())
+
+
+class ChildImporter:
+	"""Validates child/guardian/classroom CSV rows in memory and writes them in chunks.
+
+	Lookups (classrooms, tariffs, per-classroom child counts, existing children)
+	are loaded once up front, so validation issues no per-row queries. Valid
+	rows are written with `bulk_create`, one transaction per chunk; invalid rows
+	are skipped and reported. Repeating a child (same name, birth date and
+	classroom) on later rows adds further guardians to it.
+	"""
+
+	def __init__(self, *, chunk_size: int = DEFAULT_CHUNK_SIZE, dry_run: bool = False) -> None:
+		self.chunk_size = chunk_size
+		self.dry_run = dry_run
+		self.result = ImportResult(dry_run=dry_run)
+
+		self.classrooms = {c.name.casefold(): c for c in Classroom.objects.with_occupancy()}
+		# Not reference_cache.tariffs(): a stale entry would reject a new tariff, or
+		# assign a deleted one and fail the chunk on its foreign key.
+		self.tariffs = {t.name.casefold(): t for t in Tariff.objects.all()}
+		by_id = {c.pk: name for name, c in self.classrooms.items()}
+		self.occupancy: Counter[str] = Counter({name: c.occupied for name, c in self.classrooms.items()})
+		self.existing = {
+			_child_key(first, last, birth, by_id[classroom_id])
+			for first, last, birth, classroom_id in Child.objects.values_list(
+				"first_name", "last_name", "birth_date", "classroom_id"
+			).iterator(chunk_size=5000)
+		}
+		self.statuses = {value: value for value in ChildStatus.values}
+		self.statuses.update({str(label).casefold(): value for value, label in ChildStatus.choices})
+
+		self.seen: dict[tuple, Child] = {}
+		self.primary: set[tuple] = set()
+		self.pending_classrooms: list[Classroom] = []
+		self.pending_children: list[Child] = []
+		self.pending_guardians: list[Guardian] = []
+
+	def run(self, rows: Iterable[Mapping[str, str]], *, first_line: int = 2) -> ImportResult:
+		started = time.perf_counter()
+		for line, row in enumerate(rows, start=first_line):
+			# csv readers know the real line (quoted fields may span lines).
+			line = getattr(rows, "line_num", line)
+			self.result.rows += 1
+			try:
+				self._accept(row)
+			except _RowInvalid as exc:
+				self.result.errors.extend(RowError(line, name, message) for name, message in exc.errors.items())
+			if len(self.pending_children) + len(self.pending_guardians) >= self.chunk_size:
+				self._flush()
+		self._flush()
+		self.result.elapsed = time.perf_counter() - started
+		return self.result
+
+	def _accept(self, row: Mapping[str, str]) -> None:
+		values = {name: str(row.get(name) or "").strip() for name in COLUMNS}
+		errors: dict[str, str] = {}
+		for name in CHILD_COLUMNS:
+			if not values[name]:
+				errors[name] = "This field is required."
+
+		birth_date = None
+		if values["birth_date"]:
+			try:
+				birth_date = _parse_date(values["birth_date"])
+				validate_birth_date(birth_date)
+			except ValidationError as exc:
+				errors["birth_date"] = exc.messages[0]
+
+		status = self.statuses.get(values["status"].casefold() or ChildStatus.ACTIVE)
+		if status is None:
+			errors["status"] = f"Unknown status: {values['status']}."
+		tariff = None
+		if values["tariff"]:
+			tariff = self.tariffs.get(values["tariff"].casefold())
+			if tariff is None:
+				errors["tariff"] = f"Unknown tariff: {values['tariff']}."
+
+		guardian = self._guardian(values, errors)
+		if errors:
+			raise _RowInvalid(errors)
+
+		key = _child_key(values["first_name"], values["last_name"], birth_date, values["classroom"])
+		child = self.seen.get(key)
+		if child is None:
+			if key in self.existing:
+				raise _RowInvalid({"first_name": "This child already exists in the classroom."})
+			classroom = self._classroom(values)
+			child = Child(
+				first_name=values["first_name"],
+				last_name=values["last_name"],
+				birth_date=birth_date,
+				classroom=classroom,
+				tariff=tariff,
+				status=status,
+			)
+			self.occupancy[classroom.name.casefold()] += 1
+			self.seen[key] = child
+			self.pending_children.append(child)
+
+		if guardian is not None:
+			if guardian.is_primary:
+				if key in self.primary:
+					raise _RowInvalid({"guardian_is_primary": "The child already has a primary guardian."})
+				self.primary.add(key)
+			guardian.child = child
+			self.pending_guardians.append(guardian)
+
+	def _classroom(self, values: dict[str, str]) -> Classroom:
+		name = values["classroom"]
+		key = name.casefold()
+		classroom = self.classrooms.get(key)
+		if classroom is None:
+			if not (values["classroom_age_group"] and values["classroom_capacity"].isdigit()):
+				raise _RowInvalid(
+					{"classroom": f"Unknown classroom: {name} (give classroom_age_group and classroom_capacity to create it)."}
+				)
+			classroom = Classroom(
+				name=name,
+				age_group=values["classroom_age_group"],
+				capacity=int(values["classroom_capacity"]),
+			)
+		if self.occupancy[key] >= classroom.capacity:
+			raise _RowInvalid({"classroom": capacity_error(classroom)})
+		if key not in self.classrooms:
+			# A new classroom is only created together with its first accepted child.
+			self.classrooms[key] = classroom
+			self.pending_classrooms.append(classroom)
+		return classroom
+
+	def _guardian(self, values: dict[str, str], errors: dict[str, str]) -> Guardian | None:
+		if not any(values[name] for name in GUARDIAN_COLUMNS):
+			return None
+		for name in GUARDIAN_COLUMNS:
+			if not values[name]:
+				errors[name] = "This field is required."
+		for name, validator in (("guardian_phone", validate_phone), ("guardian_email", validate_email)):
+			if values[name]:
+				try:
+					validator(values[name])
+				except ValidationError as exc:
+					errors[name] = exc.messages[0]
+		return Guardian(
+			first_name=values["guardian_first_name"],
+			last_name=values["guardian_last_name"],
+			phone=values["guardian_phone"],
+			email=values["guardian_email"],
+			is_primary=values["guardian_is_primary"].casefold() in TRUE_VALUES,
+		)
+
+	def _flush(self) -> None:
+		classrooms, children, guardians = self.pending_classrooms, self.pending_children, self.pending_guardians
+		self.pending_classrooms, self.pending_children, self.pending_guardians = [], [], []
+		self.result.classrooms += len(classrooms)
+		self.result.children += len(children)
+		self.result.guardians += len(guardians)
+		if self.dry_run or not (classrooms or children or guardians):
+			return
+
+		with transaction.atomic():
+			for classroom in classrooms:
+				# Few rows; save() keeps the search index and reference cache in sync.
+				classroom.save()
+			Child.objects.bulk_create(children)
+			Guardian.objects.bulk_create(guardians)
+			if children:
+				# bulk_create() sends no post_save; cached forms list the children.
+				reference_cache.invalidate(fragment_cache.CHILDREN)
+			backend = get_search_backend()
+			if backend.maintains_index:
+				backend.index_objects([*children, *guardians])
+
+
+def import_children_csv(
+	fh: TextIO,
+	*,
+	chunk_size: int = DEFAULT_CHUNK_SIZE,
+	dry_run: bool = False,
+	delimiter: str = ",",
+) -> ImportResult:
+	"""Import a children CSV (see `COLUMNS`) streamed from `fh`."""
+	reader = csv.DictReader(fh, delimiter=delimiter)
+	missing = [name for name in CHILD_COLUMNS if name not in (reader.fieldnames or [])]
+	if missing:
+		raise ValidationError(f"Missing CSV columns: {', '.join(missing)}.")
+	return ChildImporter(chunk_size=chunk_size, dry_run=dry_run).run(reader)
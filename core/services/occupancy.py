@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import F
+from django.db.transaction import TransactionManagementError
+
+from core.forms import capacity_error
+from core.models import Child, Classroom
+
+
+def lock_classroom(classroom_id: int) -> Classroom:
+	"""Lock the classroom row until the surrounding transaction ends."""
+	if connection.features.has_select_for_update:
+		return Classroom.objects.select_for_update().get(pk=classroom_id)
+	# SQLite has no row locks: a no-op UPDATE takes the database write lock,
+	# so a concurrent reservation waits here until this transaction commits.
+	Classroom.objects.filter(pk=classroom_id).update(capacity=F("capacity"))
+	return Classroom.objects.get(pk=classroom_id)
+
+
+def reserve_seat(classroom: Classroom, *, child: Child | None = None) -> Classroom:
+	"""Check capacity under the classroom lock; save `child` in the same transaction.
+
+	Two concurrent saves both passing `ChildForm.clean` are serialized here, so
+	the second one sees the first one's child and is rejected.
+	"""
+	if not connection.in_atomic_block:
+		raise TransactionManagementError("reserve_seat() must run inside transaction.atomic().")
+	locked = lock_classroom(classroom.pk)
+	taken = Child.objects.filter(classroom_id=locked.pk)
+	if child is not None and child.pk:
+		taken = taken.exclude(pk=child.pk)
+	if taken.count() >= locked.capacity:
+		raise ValidationError({"classroom": capacity_error(locked)})
+	return locked
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, F, Min, OuterRef, QuerySet, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+from django.utils import timezone
+
+from core.models import (
+	Guardian,
+	MonthlyBilling,
+	MonthlyBillingStatus,
+	Payment,
+	PaymentKind,
+	PaymentMethod,
+)
+
+ZERO = Decimal("0")
+
+
+def _status_after(change: Decimal) -> Case:
+	# Evaluated inside the UPDATE, so it sees the row's values before `change`.
+	return Case(
+		When(paid_amount__lte=-change, then=Value(MonthlyBillingStatus.UNPAID.value)),
+		When(amount__gt=F("paid_amount") + change, then=Value(MonthlyBillingStatus.PARTIAL.value)),
+		default=Value(MonthlyBillingStatus.PAID.value),
+	)
+
+
+def record_payment(
+	billing: MonthlyBilling,
+	amount: Decimal,
+	*,
+	kind: str = PaymentKind.PAYMENT,
+	method: str = PaymentMethod.CASH,
+	guardian: Guardian | None = None,
+	received_by: object | None = None,
+	paid_at: datetime | None = None,
+	notes: str = "",
+) -> Payment:
+	"""Append a payment or refund to the ledger and update `billing` in the same transaction.
+
+	paid_amount / balance / status are changed with a single relative UPDATE,
+	so concurrent payments against the same row cannot overwrite each other;
+	a refund larger than what is paid matches no row and is rejected.
+	"""
+	amount = Decimal(amount)
+	if amount <= 0:
+		raise ValidationError({"amount": "Amount must be greater than zero."})
+	if guardian is not None and guardian.child_id != billing.child_id:
+		raise ValidationError({"guardian": "The guardian does not belong to this child."})
+	change = -amount if kind == PaymentKind.REFUND else amount
+	now = timezone.now()
+	paid_at = paid_at or now
+
+	with transaction.atomic():
+		rows = MonthlyBilling.objects.filter(pk=billing.pk)
+		if kind == PaymentKind.REFUND:
+			rows = rows.filter(paid_amount__gte=amount)
+		status = _status_after(change)
+		updated = rows.update(
+			paid_amount=F("paid_amount") + change,
+			balance=F("amount") - F("paid_amount") - change,
+			status=status,
+			paid_at=Case(When(amount__lte=F("paid_amount") + change, paid_amount__gt=-change, then=Value(paid_at)), default=None),
+			updated_at=now,
+		)
+		if not updated:
+			raise ValidationError({"amount": "A refund cannot exceed the amount paid."})
+		payment = Payment.objects.create(
+			billing=billing,
+			kind=kind,
+			method=method,
+			amount=amount,
+			paid_at=paid_at,
+			guardian=guardian,
+			received_by=received_by,
+			notes=notes,
+		)
+	billing.refresh_from_db(fields=["paid_amount", "balance", "status", "paid_at", "updated_at"])
+	return payment
+
+
+def settle_billing(
+	qs: QuerySet[MonthlyBilling],
+	*,
+	method: str = PaymentMethod.CASH,
+	paid_at: datetime | None = None,
+	notes: str = "",
+) -> int:
+	"""Pay off the remaining balance of every row in `qs`: one INSERT ... SELECT, one UPDATE."""
+	qn = connection.ops.quote_name
+	pay = Payment._meta
+	mb = MonthlyBilling._meta
+
+	def col(meta, name: str) -> str:
+		return qn(meta.get_field(name).column)
+
+	now = timezone.now()
+	paid_at = paid_at or now
+	open_rows = qs.filter(balance__gt=0).order_by().values("pk")
+	sql, params = open_rows.query.sql_with_params()
+	adapt = connection.ops.adapt_datetimefield_value
+	with transaction.atomic():
+		with connection.cursor() as cursor:
+			cursor.execute(
+				f"INSERT INTO {qn(pay.db_table)} ({col(pay, 'billing')}, {col(pay, 'kind')}, {col(pay, 'method')}, "
+				f"{col(pay, 'amount')}, {col(pay, 'paid_at')}, {col(pay, 'notes')}, {col(pay, 'created_at')}, "
+				f"{col(pay, 'updated_at')}) "
+				f"SELECT b.{col(mb, 'id')}, %s, %s, b.{col(mb, 'balance')}, %s, %s, %s, %s "
+				f"FROM {qn(mb.db_table)} b WHERE b.{col(mb, 'id')} IN ({sql})",
+				[PaymentKind.PAYMENT.value, method, adapt(paid_at), notes, adapt(now), adapt(now), *params],
+			)
+			settled = max(cursor.rowcount, 0)
+		MonthlyBilling.objects.filter(pk__in=open_rows).update(
+			paid_amount=F("amount"),
+			balance=ZERO,
+			status=MonthlyBillingStatus.PAID,
+			paid_at=paid_at,
+			updated_at=now,
+		)
+	return settled
+
+
+def recalculate_balances(qs: QuerySet[MonthlyBilling] | None = None) -> int:
+	"""Recompute paid_amount / balance / status of `qs` (default: all rows) from the ledger."""
+	qs = MonthlyBilling.objects.all() if qs is None else qs
+	money = DecimalField(max_digits=12, decimal_places=2)
+	ledger = (
+		Payment.objects.filter(billing=OuterRef("pk"))
+		.order_by()
+		.values("billing")
+		.annotate(
+			total=Sum(
+				Case(When(kind=PaymentKind.REFUND, then=-F("amount")), default=F("amount"), output_field=money)
+			)
+		)
+		.values("total")
+	)
+	paid = Coalesce(Subquery(ledger, output_field=money), Value(ZERO), output_field=money)
+	# One UPDATE: every SET expression sees the recomputed ledger total.
+	return qs.update(
+		paid_amount=paid,
+		balance=F("amount") - paid,
+		status=Case(
+			When(LessThanOrEqual(paid, ZERO), then=Value(MonthlyBillingStatus.UNPAID.value)),
+			When(GreaterThan(F("amount"), paid), then=Value(MonthlyBillingStatus.PARTIAL.value)),
+			default=Value(MonthlyBillingStatus.PAID.value),
+		),
+	)
+
+
+def debtors(*, through: str | None = None, classroom_id: int | str | None = None, min_months: int = 1) -> QuerySet:
+	"""Per-child open balance (debt, months owed, oldest month), largest debt first.
+
+	`balance > 0` matches the partial monthly_billing_debt_idx index, which
+	also covers the aggregated columns, so settled rows are never read.
+	"""
+	qs = MonthlyBilling.objects.filter(balance__gt=0)
+	if through:
+		qs = qs.filter(billing_month__lte=through)
+	if classroom_id:
+		qs = qs.filter(child__classroom_id=classroom_id)
+	qs = (
+		qs.order_by()
+		.values("child_id")
+		.annotate(debt=Sum("balance"), months=Count("billing_month"), oldest=Min("billing_month"))
+	)
+	if min_months > 1:
+		qs = qs.filter(months__gte=min_months)
+	return qs.order_by("-debt", "child_id")
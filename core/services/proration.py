@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+
+from core.models import MonthlyBilling, MonthlyBillingStatus, _validate_billing_month
+from core.services.attendance_summary import next_month
+
+DEFAULT_BATCH_SIZE = 2000
+
+ZERO = Decimal("0")
+HUNDRED = Decimal("100")
+CENT = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class ProrationRules:
+	"""How a full-month tariff is turned into the amount charged (see BILLING_* settings)."""
+
+	workdays: frozenset[int] = frozenset(range(5))
+	# Share of the daily rate credited back per absent day, after the first
+	# `absence_free_days` absences of the month.
+	absence_credit_percent: Decimal = ZERO
+	absence_free_days: int = 0
+	# Share of the daily rate credited back per half day.
+	half_day_credit_percent: Decimal = ZERO
+	# Lower bound for an enrolled child's charge, as a share of the tariff.
+	min_charge_percent: Decimal = ZERO
+	# Step amounts are rounded to; 0 or None leaves them at CENT, the precision of the column.
+	round_to: Decimal | None = CENT
+
+	@classmethod
+	def from_settings(cls) -> "ProrationRules":
+		return cls(
+			workdays=frozenset(settings.BILLING_WORKDAYS),
+			absence_credit_percent=Decimal(settings.BILLING_ABSENCE_CREDIT_PERCENT),
+			absence_free_days=settings.BILLING_ABSENCE_FREE_DAYS,
+			half_day_credit_percent=Decimal(settings.BILLING_HALF_DAY_CREDIT_PERCENT),
+			min_charge_percent=Decimal(settings.BILLING_MIN_CHARGE_PERCENT),
+			round_to=Decimal(settings.BILLING_ROUND_TO or 0),
+		)
+
+	def round(self, value: Decimal) -> Decimal:
+		if not self.round_to:
+			return value.quantize(CENT, rounding=ROUND_HALF_UP)
+		return (value / self.round_to).quantize(Decimal("1"), rounding=ROUND_HALF_UP) * self.round_to
+
+
+def working_days(start: date, end: date, workdays: Iterable[int]) -> int:
+	"""Number of days in [start, end] whose weekday is in `workdays`."""
+	if end < start:
+		return 0
+	workdays = set(workdays)
+	weeks, extra = divmod((end - start).days + 1, 7)
+	tail = sum(1 for offset in range(extra) if (start.weekday() + offset) % 7 in workdays)
+	return weeks * len(workdays) + tail
+
+
+def prorate_amount(
+	base: Decimal,
+	*,
+	working: int,
+	billable: int,
+	absent: int = 0,
+	half_day: int = 0,
+	rules: ProrationRules,
+) -> Decimal:
+	"""Amount charged for `billable` of the month's `working` days."""
+	if not working:
+		return rules.round(base)
+	if billable <= 0:
+		return ZERO
+	daily = base / working
+	charge = daily * min(billable, working)
+	credit = daily * (
+		max(absent - rules.absence_free_days, 0) * rules.absence_credit_percent
+		+ half_day * rules.half_day_credit_percent
+	) / HUNDRED
+	floor = base * rules.min_charge_percent / HUNDRED
+	return rules.round(max(charge - credit, floor, ZERO))
+
+
+@dataclass(frozen=True)
+class ProrationResult:
+	month: str
+	rows: int
+	updated: int
+	elapsed: float
+
+
+def prorate_billing(
+	month: str,
+	*,
+	rules: ProrationRules | None = None,
+	batch_size: int = DEFAULT_BATCH_SIZE,
+) -> ProrationResult:
+	"""Recompute `amount` (and balance) of every not fully paid row of `month` from its `base_amount`.
+
+	One query reads each row with the child's enrollment date and its
+	AttendanceMonthlySummary counts (LEFT JOIN; no row means no absences);
+	changed amounts are written back with bulk_update, `batch_size` rows at a time.
+	Idempotent: PAID rows and unchanged amounts are left alone.
+	"""
+	_validate_billing_month(month)
+	rules = rules or ProrationRules.from_settings()
+	started = time.perf_counter()
+	first = date(int(month[:4]), int(month[5:7]), 1)
+	last = next_month(first) - timedelta(days=1)
+	working = working_days(first, last, rules.workdays)
+
+	rows = (
+		MonthlyBilling.objects.filter(billing_month=month)
+		.exclude(status=MonthlyBillingStatus.PAID)
+		.annotate(summary=FilteredRelation("child__attendance_summaries", condition=Q(child__attendance_summaries__month=first)))
+		.order_by("pk")
+		.values_list(
+			"pk", "base_amount", "amount", "paid_amount", "child__enrolled_on", "summary__absent", "summary__half_day"
+		)
+	)
+	now = timezone.now()
+	total = updated = 0
+	last_pk = 0
+	with transaction.atomic():
+		# Keyset chunks rather than one open cursor: the chunk is written back
+		# before the next one is read.
+		while chunk := list(rows.filter(pk__gt=last_pk)[:batch_size]):
+			last_pk = chunk[-1][0]
+			total += len(chunk)
+			changed: list[MonthlyBilling] = []
+			for pk, base, current, paid, enrolled_on, absent, half_day in chunk:
+				billable = working_days(max(first, enrolled_on), last, rules.workdays) if enrolled_on <= last else 0
+				amount = prorate_amount(
+					base, working=working, billable=billable, absent=absent or 0, half_day=half_day or 0, rules=rules
+				)
+				if amount != current:
+					changed.append(
+						MonthlyBilling(
+							pk=pk,
+							amount=amount,
+							balance=amount - paid,
+							status=MonthlyBilling.status_for(amount, paid),
+							updated_at=now,
+						)
+					)
+			if changed:
+				updated += MonthlyBilling.objects.bulk_update(changed, ["amount", "balance", "status", "updated_at"])
+	return ProrationResult(month=month, rows=total, updated=updated, elapsed=time.perf_counter() - started)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db.models import Count, Q, QuerySet, Sum
+
+from core.models import Attendance, AttendanceMonthlySummary, AttendanceStatus, MonthlyBilling, MonthlyBillingStatus
+
+
+@dataclass(frozen=True)
+class StatusSummary:
+	"""Status counts for one date/month, overall and per classroom."""
+
+	counts: dict[str, int]
+	by_classroom: dict[int, dict[str, int]] = field(default_factory=dict)
+
+	@property
+	def total(self) -> int:
+		return sum(self.counts.values())
+
+	def get(self, status: str) -> int:
+		return self.counts.get(status, 0)
+
+	def for_classroom(self, classroom_id: int) -> dict[str, int]:
+		return self.by_classroom.get(classroom_id, {status: 0 for status in self.counts})
+
+
+def _grouped(qs: QuerySet, statuses: list[str]) -> QuerySet:
+	# One grouped query with a conditional COUNT per status; the overall
+	# totals are summed from the per-classroom rows in Python.
+	return (
+		qs.order_by()
+		.values("child__classroom_id")
+		.annotate(**{status: Count("pk", filter=Q(status=status)) for status in statuses})
+	)
+
+
+def _fold(rows: Iterable[dict], statuses: list[str]) -> StatusSummary:
+	counts = {status: 0 for status in statuses}
+	by_classroom: dict[int, dict[str, int]] = {}
+	for row in rows:
+		bucket = {status: row[status] for status in statuses}
+		by_classroom[row["child__classroom_id"]] = bucket
+		for status, value in bucket.items():
+			counts[status] += value
+	return StatusSummary(counts=counts, by_classroom=by_classroom)
+
+
+def _summarize(qs: QuerySet, statuses: list[str]) -> StatusSummary:
+	return _fold(_grouped(qs, statuses), statuses)
+
+
+def attendance_summary(attendance_date: date) -> StatusSummary:
+	qs = Attendance.objects.filter(attendance_date=attendance_date)
+	return _summarize(qs, list(AttendanceStatus.values))
+
+
+async def aattendance_summary(attendance_date: date) -> StatusSummary:
+	statuses = list(AttendanceStatus.values)
+	rows = _grouped(Attendance.objects.filter(attendance_date=attendance_date), statuses)
+	return _fold([row async for row in rows], statuses)
+
+
+def billing_summary(billing_month: str) -> StatusSummary:
+	qs = MonthlyBilling.objects.filter(billing_month=billing_month)
+	return _summarize(qs, list(MonthlyBillingStatus.values))
+
+
+def attendance_month_summary(month: date) -> StatusSummary:
+	"""Status counts for a month, read from the rollup instead of the daily rows."""
+	statuses = list(AttendanceStatus.values)
+	rows = (
+		AttendanceMonthlySummary.objects.filter(month=month.replace(day=1))
+		.order_by()
+		.values("child__classroom_id")
+		.annotate(**{f"{status}_total": Sum(status) for status in statuses})
+	)
+	counts = {status: 0 for status in statuses}
+	by_classroom: dict[int, dict[str, int]] = {}
+	for row in rows:
+		bucket = {status: row[f"{status}_total"] or 0 for status in statuses}
+		by_classroom[row["child__classroom_id"]] = bucket
+		for status, value in bucket.items():
+			counts[status] += value
+	return StatusSummary(counts=counts, by_classroom=by_classroom)
+
+
+def attendance_rate(counts: dict[str, int]) -> float | None:
+	"""Attended share of the marked days, as AttendanceMonthlySummary.attendance_rate."""
+	attended = counts.get(AttendanceStatus.PRESENT, 0) + counts.get(AttendanceStatus.LATE, 0) + counts.get(AttendanceStatus.HALF_DAY, 0)
+	marked = attended + counts.get(AttendanceStatus.ABSENT, 0)
+	return round(attended * 100 / marked, 1) if marked else None
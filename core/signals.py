@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .fragment_cache import BILLING, CHILDREN
+from .models import SUMMARY_FIELDS, Attendance, Child, Classroom, Guardian, MonthlyBilling, Tariff
+from .reference_cache import CLASSROOMS, TARIFFS, invalidate
+from .search import get_search_backend
+from .services.attendance_summary import SummaryScope, refresh_scope
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Guardian)
+@receiver(post_save, sender=Classroom)
+@receiver(post_save, sender=Tariff)
+def index_searchable(sender: type[Model], instance: Model, raw: bool = False, **kwargs: object) -> None:
+	backend = get_search_backend()
+	if backend.maintains_index and not raw:
+		backend.index_object(instance)
+
+
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Guardian)
+@receiver(post_delete, sender=Classroom)
+@receiver(post_delete, sender=Tariff)
+def unindex_searchable(sender: type[Model], instance: Model, **kwargs: object) -> None:
+	backend = get_search_backend()
+	if backend.maintains_index:
+		backend.remove_object(instance)
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+def invalidate_classroom_cache(sender: type[Model], **kwargs: object) -> None:
+	invalidate(CLASSROOMS)
+
+
+@receiver(post_save, sender=Tariff)
+@receiver(post_delete, sender=Tariff)
+def invalidate_tariff_cache(sender: type[Model], **kwargs: object) -> None:
+	invalidate(TARIFFS)
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_delete, sender=Child)
+def invalidate_child_fragments(sender: type[Model], **kwargs: object) -> None:
+	# The attendance and billing tables show child names.
+	invalidate(CHILDREN)
+
+
+@receiver(post_save, sender=MonthlyBilling)
+def invalidate_billing_fragments_on_save(sender: type[Model], raw: bool = False, **kwargs: object) -> None:
+	if not raw:
+		invalidate(BILLING)
+
+
+@receiver(post_delete, sender=MonthlyBilling)
+def invalidate_billing_fragments_on_delete(
+	sender: type[Model], instance: MonthlyBilling, origin: object = None, **kwargs: object
+) -> None:
+	# QuerySet.delete() invalidates once; child cascades bump the child version.
+	if origin is instance:
+		invalidate(BILLING)
+
+
+@receiver(post_save, sender=Attendance)
+def refresh_attendance_summary_on_save(
+	sender: type[Model], instance: Attendance, raw: bool = False, update_fields: frozenset[str] | None = None, **kwargs: object
+) -> None:
+	if raw:
+		return
+	rollup = update_fields is None or bool(SUMMARY_FIELDS.intersection(update_fields))
+	refresh_scope(SummaryScope.for_objects([instance]), rollup=rollup)
+	if rollup:
+		instance._loaded_summary_key = (instance.child_id, instance.attendance_date)
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_summary_on_delete(sender: type[Model], instance: Attendance, origin: object = None, **kwargs: object) -> None:
+	# QuerySet.delete() (and child cascades) refresh once for the whole batch.
+	if origin is instance:
+		refresh_scope(SummaryScope.for_objects([instance]))
@@ -0,0 +1,37 @@
+"""`{{ form|crispy_cached }}`: crispy's `|crispy` filter, cached for unbound CrispyCacheMixin forms.
+
+Every field and widget template of the crispy pack renders again for each
+`|crispy`, although a create or edit page shows the same unbound form over and
+over. Bound forms (with data or errors) always render afresh.
+"""
+
+from __future__ import annotations
+
+from crispy_forms.templatetags.crispy_forms_filters import as_crispy_form
+from crispy_forms.utils import TEMPLATE_PACK
+from django import template
+from django.forms import BaseForm
+from django.utils.safestring import SafeString, mark_safe
+
+from core import fragment_cache
+from core.forms import CrispyCacheMixin
+
+register = template.Library()
+
+
+@register.filter
+def crispy_cached(form: BaseForm, template_pack: str = TEMPLATE_PACK) -> SafeString:
+	if form.is_bound or not isinstance(form, CrispyCacheMixin):
+		return as_crispy_form(form, template_pack)
+	form_class = type(form)
+	params = {
+		"form": f"{form_class.__module__}.{form_class.__qualname__}",
+		"pack": str(template_pack),
+		"prefix": form.prefix,
+		"auto_id": form.auto_id,
+		"values": [(field.html_name, field.value()) for field in form],
+	}
+	html = fragment_cache.get_or_set(
+		"crispy", form.crispy_cache_versions, params, lambda: as_crispy_form(form, template_pack)
+	)
+	return mark_safe(html)
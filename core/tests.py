@@ -1,21 +1,77 @@
 from __future__ import annotations
 
-from datetime import date
+import importlib
+import json
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.http import HttpResponse
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
 from django.urls import reverse
+from django.utils import timezone
+
+from kindergarten_crm.settings import database_from_url
 
 from .models import (
 	Attendance,
+	AttendanceMonthlySummary,
 	AttendanceStatus,
+	AuthorizedPickup,
 	Child,
 	ChildStatus,
 	Classroom,
+	ExportJob,
+	ExportJobStatus,
 	Guardian,
 	MonthlyBilling,
 	MonthlyBillingStatus,
+	Payment,
+	PaymentKind,
 	Tariff,
 )
+from . import fragment_cache, reference_cache, views
+from .benchmarks.query_budget import format_report, get_routes, run_budgets
+from .benchmarks.suite import compare
+from .forms import ChildForm, ClassroomForm, GuardianForm, child_search_filter
+from .instrumentation import histogram, record_queries
+from .live import PostgresBroker, get_broker
+from .middleware import QueryInstrumentationMiddleware
+from .pagination import KeysetPage, KeysetPaginator
+from .routers import PIN_COOKIE, PrimaryReplicaRouter, replica_reads
+from .search import get_search_backend
+from .services.attendance import apply_attendance_batch, materialize_attendance
+from .services.attendance_summary import rebuild_attendance_summary, summary_paused
+from .services.billing import generate_billing, month_range, recent_months
+from .services.export import build_export, run_export_job, stream_export
+from .services.importer import import_children_csv
+from .services.occupancy import reserve_seat
+from .services.payments import debtors, recalculate_balances, record_payment, settle_billing
+from .services.proration import ProrationRules, prorate_amount, prorate_billing, working_days
+from .services.summary import attendance_summary, billing_summary
+from .templatetags.crispy_cache import crispy_cached
+from .warmup import warm_up
 
 
 class ModelSmokeTests(TestCase):
@@ -65,7 +121,7 @@ class AttendanceTests(TestCase):
 		self.assertIn(AttendanceStatus.LATE, values)
 		self.assertIn(AttendanceStatus.HALF_DAY, values)
 
-	def test_list_view_autocreates_records_for_empty_date_when_logged_in(self) -> None:
+	def test_list_view_does_not_write_and_shows_materialized_rows(self) -> None:
 		User = get_user_model()
 		user = User.objects.create_user(username="attuser", password="testpass123")
 		classroom = Classroom.objects.create(name="Stars", age_group="5-6", capacity=10)
@@ -77,18 +133,68 @@ class AttendanceTests(TestCase):
 			status=ChildStatus.ACTIVE,
 		)
 
-		self.assertEqual(Attendance.objects.count(), 0)
-
 		self.client.force_login(user)
 		resp = self.client.get(reverse("core:attendance_list"))
-
 		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(Attendance.objects.count(), 0)
+
+		resp = self.client.post(reverse("core:attendance_materialize"), {"date": ""})
+		self.assertEqual(resp.status_code, 302)
 		self.assertTrue(Attendance.objects.filter(child=child).exists())
+
+		resp = self.client.get(reverse("core:attendance_list"))
 		self.assertContains(resp, child.last_name)
 
 
+class MaterializeAttendanceTests(TestCase):
+	def setUp(self) -> None:
+		self.classroom = Classroom.objects.create(name="Moons", age_group="4-5", capacity=10)
+		self.active = Child.objects.create(
+			first_name="Ali",
+			last_name="Valiyev",
+			birth_date=date(2020, 1, 1),
+			classroom=self.classroom,
+		)
+		self.inactive = Child.objects.create(
+			first_name="Vali",
+			last_name="Aliyev",
+			birth_date=date(2020, 1, 1),
+			classroom=self.classroom,
+			status=ChildStatus.INACTIVE,
+		)
+
+	def test_creates_expected_rows_for_active_children_over_range(self) -> None:
+		result = materialize_attendance(date(2025, 12, 1), date(2025, 12, 3))
+
+		self.assertEqual(result.created, 3)
+		self.assertEqual(result.days, 3)
+		self.assertEqual(
+			Attendance.objects.filter(child=self.active, status=AttendanceStatus.EXPECTED).count(), 3
+		)
+		self.assertFalse(Attendance.objects.filter(child=self.inactive).exists())
+
+	def test_is_idempotent_and_fills_rows_for_newly_activated_children(self) -> None:
+		day = date(2025, 12, 1)
+		materialize_attendance(day)
+		Attendance.objects.filter(child=self.active).update(status=AttendanceStatus.PRESENT)
+
+		self.assertEqual(materialize_attendance(day).created, 0)
+
+		self.inactive.status = ChildStatus.ACTIVE
+		self.inactive.save()
+		self.assertEqual(materialize_attendance(day).created, 1)
+		self.assertEqual(Attendance.objects.get(child=self.active).status, AttendanceStatus.PRESENT)
+
+	def test_command_reports_created_rows(self) -> None:
+		out = StringIO()
+		call_command("materialize_attendance", date="2025-12-01", through="2025-12-02", stdout=out)
+
+		self.assertIn("2 ta", out.getvalue())
+		self.assertEqual(Attendance.objects.count(), 2)
+
+
 class MonthlyBillingTests(TestCase):
-	def test_list_view_autocreates_rows_for_month(self) -> None:
+	def test_list_view_is_read_only_and_shows_generated_rows(self) -> None:
 		User = get_user_model()
 		user = User.objects.create_user(username="mbuser", password="testpass123")
 
@@ -103,13 +209,18 @@ class MonthlyBillingTests(TestCase):
 			status=ChildStatus.ACTIVE,
 		)
 
-		self.assertEqual(MonthlyBilling.objects.count(), 0)
 		self.client.force_login(user)
 		resp = self.client.get(reverse("core:billing_monthly_list"), {"month": "2025-12"})
 		self.assertEqual(resp.status_code, 200)
-		self.assertTrue(MonthlyBilling.objects.filter(child=child, billing_month="2025-12").exists())
+		self.assertEqual(MonthlyBilling.objects.count(), 0)
+
+		resp = self.client.post(reverse("core:billing_monthly_generate"), {"month": "2025-12"})
+		self.assertEqual(resp.status_code, 302)
 		row = MonthlyBilling.objects.get(child=child, billing_month="2025-12")
 		self.assertEqual(str(row.amount), "500.00")
+		self.assertEqual(row.tariff, tariff)
+
+		resp = self.client.get(reverse("core:billing_monthly_list"), {"month": "2025-12"})
 		self.assertContains(resp, child.last_name)
 
 	def test_mark_paid_uses_child_and_month(self) -> None:
@@ -137,4 +248,1491 @@ class MonthlyBillingTests(TestCase):
 		self.assertEqual(row.status, MonthlyBillingStatus.PAID)
 		self.assertIsNotNone(row.paid_at)
 
+
+class BackfillBillingTariffTests(TestCase):
+	def test_rows_without_a_tariff_take_the_childs(self) -> None:
+		migration = importlib.import_module("core.migrations.0015_backfill_monthlybilling_tariff")
+		classroom = Classroom.objects.create(name="Eski", age_group="3-4", capacity=10)
+		tariff = Tariff.objects.create(name="Eski tarif", amount="400.00")
+		other = Tariff.objects.create(name="Boshqa", amount="300.00")
+		with_tariff = Child.objects.create(
+			first_name="A", last_name="Eski", birth_date=date(2020, 1, 1), classroom=classroom, tariff=tariff
+		)
+		without = Child.objects.create(first_name="B", last_name="Eski", birth_date=date(2020, 1, 1), classroom=classroom)
+		legacy = MonthlyBilling.objects.create(child=with_tariff, billing_month="2025-10", amount="400.00")
+		snapshot = MonthlyBilling.objects.create(child=with_tariff, billing_month="2025-11", amount="300.00", tariff=other)
+		untouched = MonthlyBilling.objects.create(child=without, billing_month="2025-10", amount="0")
+
+		migration.backfill_tariff(django_apps, None)
+
+		for row in (legacy, snapshot, untouched):
+			row.refresh_from_db()
+		self.assertEqual((legacy.tariff, snapshot.tariff, untouched.tariff), (tariff, other, None))
+
+
+class GenerateBillingTests(TestCase):
+	def setUp(self) -> None:
+		classroom = Classroom.objects.create(name="Suns", age_group="3-4", capacity=10)
+		self.tariff = Tariff.objects.create(name="Base", amount="450.00")
+		self.child = Child.objects.create(
+			first_name="Malika",
+			last_name="Karimova",
+			birth_date=date(2020, 1, 1),
+			classroom=classroom,
+			tariff=self.tariff,
+		)
+		self.no_tariff = Child.objects.create(
+			first_name="Aziz",
+			last_name="Karimov",
+			birth_date=date(2020, 1, 1),
+			classroom=classroom,
+		)
+		Child.objects.create(
+			first_name="Sabina",
+			last_name="Saidova",
+			birth_date=date(2020, 1, 1),
+			classroom=classroom,
+			status=ChildStatus.INACTIVE,
+		)
+
+	def test_generates_one_statement_per_month_with_tariff_snapshot(self) -> None:
+		# SAVEPOINT + one INSERT ... SELECT per month + RELEASE.
+		with self.assertNumQueries(5):
+			result = generate_billing("2025-11", "2026-01")
+
+		self.assertEqual(result.months, ["2025-11", "2025-12", "2026-01"])
+		self.assertEqual(result.created, 6)
+		row = MonthlyBilling.objects.get(child=self.child, billing_month="2026-01")
+		self.assertEqual(row.tariff, self.tariff)
+		self.assertEqual(str(row.amount), "450.00")
+		empty = MonthlyBilling.objects.get(child=self.no_tariff, billing_month="2026-01")
+		self.assertIsNone(empty.tariff)
+		self.assertEqual(empty.amount, 0)
+
+	def test_rerun_keeps_existing_rows_untouched(self) -> None:
+		generate_billing("2025-12")
+		self.tariff.amount = "999.00"
+		self.tariff.save()
+
+		self.assertEqual(generate_billing("2025-12").created, 0)
+		self.assertEqual(str(MonthlyBilling.objects.get(child=self.child).amount), "450.00")
+
+	def test_command_rejects_invalid_month(self) -> None:
+		with self.assertRaises(CommandError):
+			call_command("generate_billing", month="2025-13", stdout=StringIO())
+
+		out = StringIO()
+		call_command("generate_billing", month="2025-12", stdout=out)
+		self.assertIn("2 ta", out.getvalue())
+
+
+class AttendanceBatchMarkTests(TestCase):
+	def setUp(self) -> None:
+		user = get_user_model().objects.create_user(username="teacher", password="testpass123")
+		self.client.force_login(user)
+		classroom = Classroom.objects.create(name="Batch", age_group="3-4", capacity=30)
+		self.children = [
+			Child.objects.create(
+				first_name=f"Bola{idx}",
+				last_name="Batch",
+				birth_date=date(2020, 1, 1),
+				classroom=classroom,
+			)
+			for idx in range(3)
+		]
+		self.day = date(2025, 12, 1)
+		self.row = Attendance.objects.create(child=self.children[0], attendance_date=self.day)
+		self.url = reverse("core:attendance_batch_mark")
+
+	def post(self, payload: object):
+		return self.client.post(self.url, json.dumps(payload), content_type="application/json")
+
+	def test_applies_valid_rows_and_reports_invalid_ones(self) -> None:
+		payload = {
+			"date": "2025-12-01",
+			"items": [
+				{"attendance_id": self.row.pk, "status": "present", "check_in_time": "08:15"},
+				{"child_id": self.children[1].pk, "status": "late", "check_in_time": "09:05"},
+				{"child_id": self.children[2].pk, "status": "absent"},
+				{"child_id": self.children[2].pk, "check_in_time": "10:00", "check_out_time": "09:00"},
+				{"attendance_id": 999999, "status": "present"},
+				{"child_id": self.children[2].pk, "status": "bogus"},
+			],
+		}
+		# session + user, savepoint, in_bulk, child check, existing rows, insert of the
+		# validated new rows, refetch, bulk_update, monthly rollup refresh (savepoint,
+		# upsert, stale delete, release), release.
+		with self.assertNumQueries(14):
+			resp = self.post(payload)
+
+		self.assertEqual(resp.status_code, 200)
+		body = resp.json()
+		self.assertEqual(body["updated"], 2)
+		self.assertEqual([row["ok"] for row in body["results"]], [True, True, False, False, False, False])
+		self.assertIn("absence_reason", body["results"][2]["errors"])
+		self.assertIn("check_out_time", body["results"][3]["errors"])
+		self.assertIn("status", body["results"][5]["errors"])
+
+		self.row.refresh_from_db()
+		self.assertEqual(self.row.status, AttendanceStatus.PRESENT)
+		self.assertEqual(self.row.check_in_time.strftime("%H:%M"), "08:15")
+		late = Attendance.objects.get(child=self.children[1], attendance_date=self.day)
+		self.assertEqual(late.status, AttendanceStatus.LATE)
+		# Every item for this child was rejected, so no row was created for it.
+		self.assertFalse(Attendance.objects.filter(child=self.children[2]).exists())
+
+	def test_items_addressing_one_row_by_id_and_by_child_are_merged(self) -> None:
+		body = self.post(
+			{
+				"date": "2025-12-01",
+				"items": [
+					{"attendance_id": self.row.pk, "status": "present", "check_in_time": "08:15"},
+					{"child_id": self.children[0].pk, "check_out_time": "17:30"},
+				],
+			}
+		).json()
+		self.assertEqual([row["ok"] for row in body["results"]], [True, True])
+		self.assertEqual(body["results"][1]["check_in_time"], "08:15")
+
+		self.row.refresh_from_db()
+		self.assertEqual(self.row.status, AttendanceStatus.PRESENT)
+		self.assertEqual(self.row.check_in_time.strftime("%H:%M"), "08:15")
+		self.assertEqual(self.row.check_out_time.strftime("%H:%M"), "17:30")
+
+	def test_rejects_an_overlong_absence_reason(self) -> None:
+		limit = Attendance._meta.get_field("absence_reason").max_length
+		body = self.post(
+			{
+				"date": "2025-12-01",
+				"items": [{"child_id": self.children[1].pk, "status": "absent", "absence_reason": "x" * (limit + 1)}],
+			}
+		).json()
+		self.assertEqual(body["updated"], 0)
+		self.assertIn("absence_reason", body["results"][0]["errors"])
+		self.assertFalse(Attendance.objects.filter(child=self.children[1]).exists())
+
+	def test_rejects_malformed_payloads(self) -> None:
+		self.assertEqual(self.client.post(self.url, "nope", content_type="application/json").status_code, 400)
+		self.assertEqual(self.post({"items": []}).status_code, 400)
+		self.assertEqual(self.post({"items": [{}] * 501}).status_code, 400)
+		item = {"attendance_id": self.row.pk, "status": "present"}
+		self.assertEqual(self.post({"items": [item]}).status_code, 400)
+		self.assertEqual(self.post({"date": "2025-13-01", "items": [item]}).status_code, 400)
+		self.row.refresh_from_db()
+		self.assertEqual(self.row.status, AttendanceStatus.EXPECTED)
+
+
+class ReferenceCacheTests(TestCase):
+	def setUp(self) -> None:
+		cache.clear()
+		self.classroom = Classroom.objects.create(name="Cached", age_group="3-4", capacity=10)
+		self.active = Tariff.objects.create(name="Active", amount="100.00")
+		self.retired = Tariff.objects.create(name="Retired", amount="90.00", is_active=False)
+
+	def test_lists_are_served_from_cache_until_a_write(self) -> None:
+		self.assertEqual(reference_cache.classrooms(), [self.classroom])
+		with self.assertNumQueries(0):
+			reference_cache.classrooms()
+			reference_cache.classroom_choices()
+
+		other = Classroom.objects.create(name="Another", age_group="4-5", capacity=10)
+		self.assertEqual(reference_cache.classrooms(), [other, self.classroom])
+		other.delete()
+		self.assertEqual(reference_cache.classrooms(), [self.classroom])
+
+		self.assertEqual(reference_cache.active_tariffs(), [self.active])
+		self.retired.is_active = True
+		self.retired.save()
+		self.assertEqual(len(reference_cache.active_tariffs()), 2)
+
+	@override_settings(DATABASE_ROUTERS=["core.routers.PrimaryReplicaRouter"])
+	def test_misses_inside_replica_reads_are_filled_from_the_primary(self) -> None:
+		# There is no "replica" connection here, so a read routed to it would raise.
+		with mock.patch("core.routers.replica_configured", return_value=True), replica_reads():
+			self.assertEqual(PrimaryReplicaRouter().db_for_read(Classroom), "replica")
+			with CaptureQueriesContext(connection) as ctx:
+				self.assertEqual(reference_cache.classrooms(), [self.classroom])
+		self.assertEqual(len(ctx.captured_queries), 1)
+		with self.assertNumQueries(0):
+			reference_cache.classrooms()
+
+	def test_child_form_renders_choices_without_queries(self) -> None:
+		ChildForm()
+		with self.assertNumQueries(0):
+			html = str(ChildForm())
+		self.assertIn("Cached", html)
+		self.assertNotIn("Retired", html)
+
+		child = Child.objects.create(
+			first_name="Eski",
+			last_name="Tarif",
+			birth_date=date(2020, 1, 1),
+			classroom=self.classroom,
+			tariff=self.retired,
+		)
+		self.assertIn("Retired", str(ChildForm(instance=child)))
+
+
+class InstrumentationTests(TestCase):
+	def setUp(self) -> None:
+		histogram.reset()
+		Classroom.objects.create(name="Timed", age_group="3-4", capacity=10)
+
+	def test_response_carries_server_timing_and_feeds_histogram(self) -> None:
+		user = get_user_model().objects.create_user(username="timed", password="testpass123")
+		self.client.force_login(user)
+
+		resp = self.client.get(reverse("core:classroom_list"))
+		self.assertRegex(resp["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+$')
+		stats = histogram.snapshot()["core:classroom_list"]
+		self.assertEqual(stats["requests"], 1)
+		self.assertGreater(stats["queries_max"], 0)
+
+	async def test_async_mode_records_queries_of_async_views(self) -> None:
+		async def view(request):
+			await Classroom.objects.acount()
+			return HttpResponse()
+
+		middleware = QueryInstrumentationMiddleware(view)
+		resp = await middleware(AsyncRequestFactory().get("/"))
+		self.assertIn('desc="1 queries"', resp["Server-Timing"])
+
+	def test_histogram_endpoint_is_staff_only(self) -> None:
+		user = get_user_model().objects.create_user(username="plain", password="testpass123")
+		self.client.force_login(user)
+		self.assertEqual(self.client.get(reverse("core:instrumentation")).status_code, 403)
+
+		user.is_staff = True
+		user.save()
+		resp = self.client.get(reverse("core:instrumentation"))
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn("views", resp.json())
+
+	def test_record_queries_keeps_slowest_statements(self) -> None:
+		with record_queries(keep_slowest=2) as stats:
+			list(Classroom.objects.all())
+			Classroom.objects.count()
+			Classroom.objects.exists()
+		self.assertEqual(stats.count, 3)
+		self.assertEqual(len(stats.slowest), 2)
+		self.assertGreaterEqual(stats.slowest[0]["ms"], stats.slowest[1]["ms"])
+
+
+class KeysetPaginationTests(TestCase):
+	def setUp(self) -> None:
+		classroom = Classroom.objects.create(name="Keys", age_group="3-4", capacity=10)
+		self.day = date(2025, 12, 1)
+		for last_name in ["Aliyev", "Botirov", "Botirov", "Karimov", "Saidov"]:
+			child = Child.objects.create(
+				first_name="Bola",
+				last_name=last_name,
+				birth_date=date(2020, 1, 1),
+				classroom=classroom,
+			)
+			Attendance.objects.create(child=child, attendance_date=self.day)
+		self.qs = Attendance.objects.select_related("child").filter(attendance_date=self.day)
+		self.ordering = ("child__last_name", "child__first_name", "id")
+
+	def test_walks_forward_and_back_without_offset(self) -> None:
+		paginator = KeysetPaginator(self.qs, 2, self.ordering, count_mode="none")
+		first = paginator.page(None)
+		self.assertEqual([a.child.last_name for a in first], ["Aliyev", "Botirov"])
+		self.assertFalse(first.has_previous())
+
+		with CaptureQueriesContext(connection) as ctx:
+			second = paginator.page(first.next_page_number())
+		self.assertNotIn("OFFSET", ctx.captured_queries[0]["sql"])
+		self.assertEqual([a.child.last_name for a in second], ["Botirov", "Karimov"])
+		self.assertEqual(second.number, 2)
+
+		third = paginator.page(second.next_page_number())
+		self.assertEqual([a.child.last_name for a in third], ["Saidov"])
+		self.assertFalse(third.has_next())
+
+		back = paginator.page(third.previous_page_number())
+		self.assertEqual([a.pk for a in back], [a.pk for a in second])
+		back = paginator.page(back.previous_page_number())
+		self.assertEqual([a.pk for a in back], [a.pk for a in first])
+		self.assertEqual(back.number, 1)
+		self.assertFalse(back.has_previous())
+		self.assertIsNone(paginator.num_pages)
+
+	def test_exact_count_mode_reports_num_pages(self) -> None:
+		paginator = KeysetPaginator(self.qs, 2, self.ordering)
+		self.assertEqual(paginator.num_pages, 3)
+
+	def test_list_view_follows_cursor_links_and_rejects_garbage(self) -> None:
+		user = get_user_model().objects.create_user(username="keyset", password="testpass123")
+		self.client.force_login(user)
+		url = reverse("core:attendance_list")
+		with self.settings(LIST_COUNT_MODE="none"):
+			resp = self.client.get(url, {"date": "2025-12-01"})
+		page = resp.context["page_obj"]
+		self.assertEqual(len(page), 5)
+
+		paginator = KeysetPaginator(self.qs, 2, self.ordering)
+		token = paginator.page(None).next_page_number()
+		resp = self.client.get(url, {"date": "2025-12-01", "page": token})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(self.client.get(url, {"page": "not-a-cursor"}).status_code, 404)
+
+	def test_numeric_pages_use_offset_pagination(self) -> None:
+		self.client.force_login(get_user_model().objects.create_user(username="offset", password="testpass123"))
+		url = reverse("core:attendance_list")
+		expected = [a.pk for a in KeysetPaginator(self.qs, 2, self.ordering).page(None)]
+		with mock.patch.object(views.AttendanceListMixin, "paginate_by", 2):
+			# The bookmark for page 2 shows page 2, not the first page.
+			second = self.client.get(url, {"date": "2025-12-01", "page": "2"}).context["page_obj"]
+			self.assertEqual(second.number, 2)
+			self.assertEqual(second.next_page_number(), 3)
+			self.assertEqual([a.child.last_name for a in second], ["Botirov", "Karimov"])
+			self.assertEqual(self.client.get(url, {"date": "2025-12-01", "page": "9"}).status_code, 404)
+			first = self.client.get(url, {"date": "2025-12-01"}).context["page_obj"]
+			self.assertIsInstance(first, KeysetPage)
+			self.assertEqual([a.pk for a in first], expected)
+
+		class OffsetReport(views.AttendanceReportView):
+			keyset_pagination = False
+
+		request = RequestFactory().get("/", {"month": "2025-12"})
+		request.user = get_user_model().objects.get(username="offset")
+		# A view that has not opted in keeps offset pagination on its first page too.
+		self.assertNotIsInstance(OffsetReport.as_view()(request).context_data["page_obj"], KeysetPage)
+
+
+class SearchBackendTests(TestCase):
+	def setUp(self) -> None:
+		self.classroom = Classroom.objects.create(name="Lilac", age_group="3-4", capacity=10)
+		self.child = Child.objects.create(
+			first_name="Diyora",
+			last_name="Qodirova",
+			birth_date=date(2020, 1, 1),
+			classroom=self.classroom,
+		)
+		self.guardian = Guardian.objects.create(
+			first_name="Nodira",
+			last_name="Qodirova",
+			phone="+998901112233",
+			email="nodira@example.com",
+			child=self.child,
+		)
+
+	def test_finds_substrings_and_follows_saves_and_deletes(self) -> None:
+		backend = get_search_backend()
+		self.assertTrue(Child.objects.filter(backend.filter("child", "odiro")).exists())
+		self.assertTrue(Guardian.objects.filter(backend.filter("guardian", "1112233")).exists())
+		self.assertTrue(Guardian.objects.filter(backend.filter("guardian", "NODIRA@")).exists())
+		self.assertTrue(Child.objects.filter(backend.filter("child", "Di")).exists())
+
+		self.child.last_name = "Saidova"
+		self.child.save()
+		self.assertFalse(Child.objects.filter(backend.filter("child", "odiro")).exists())
+		self.assertTrue(Child.objects.filter(backend.filter("child", "aidov")).exists())
+
+		self.guardian.delete()
+		self.assertFalse(Guardian.objects.filter(backend.filter("guardian", "1112233")).exists())
+
+	def test_rebuild_indexes_rows_written_without_signals(self) -> None:
+		Child.objects.bulk_create(
+			[Child(first_name="Bulk", last_name="Imported", birth_date=date(2020, 1, 1), classroom=self.classroom)]
+		)
+		call_command("rebuild_search_index", stdout=StringIO())
+		self.assertTrue(Child.objects.filter(child_search_filter("mporte")).exists())
+
+	def test_attendance_and_guardian_lists_search_through_backend(self) -> None:
+		user = get_user_model().objects.create_user(username="searcher", password="testpass123")
+		Attendance.objects.create(child=self.child, attendance_date=date(2025, 12, 1))
+		self.client.force_login(user)
+
+		resp = self.client.get(reverse("core:attendance_list"), {"date": "2025-12-01", "q": "diyo"})
+		self.assertContains(resp, "Qodirova")
+		resp = self.client.get(reverse("core:attendance_list"), {"date": "2025-12-01", "q": "nobody"})
+		self.assertNotContains(resp, "Qodirova")
+		resp = self.client.get(reverse("core:guardian_list"), {"q": "nodira@"})
+		self.assertContains(resp, "nodira@example.com")
+
+
+class StatusSummaryTests(TestCase):
+	def setUp(self) -> None:
+		self.room_a = Classroom.objects.create(name="A", age_group="3-4", capacity=10)
+		self.room_b = Classroom.objects.create(name="B", age_group="4-5", capacity=10)
+		self.day = date(2025, 12, 1)
+		statuses = [
+			(self.room_a, AttendanceStatus.PRESENT),
+			(self.room_a, AttendanceStatus.HALF_DAY),
+			(self.room_b, AttendanceStatus.PRESENT),
+			(self.room_b, AttendanceStatus.EXPECTED),
+		]
+		for idx, (room, status) in enumerate(statuses):
+			child = Child.objects.create(
+				first_name=f"Child{idx}",
+				last_name="Test",
+				birth_date=date(2020, 1, 1),
+				classroom=room,
+			)
+			Attendance.objects.create(child=child, attendance_date=self.day, status=status)
+			MonthlyBilling.objects.create(
+				child=child,
+				billing_month="2025-12",
+				amount=Decimal("100"),
+				paid_amount=Decimal("100") if idx % 2 else Decimal("0"),
+			)
+
+	def test_attendance_summary_counts_every_status_in_one_query(self) -> None:
+		with self.assertNumQueries(1):
+			summary = attendance_summary(self.day)
+
+		self.assertEqual(summary.get(AttendanceStatus.PRESENT), 2)
+		self.assertEqual(summary.get(AttendanceStatus.HALF_DAY), 1)
+		self.assertEqual(summary.get(AttendanceStatus.EXPECTED), 1)
+		self.assertEqual(summary.get(AttendanceStatus.ABSENT), 0)
+		self.assertEqual(summary.total, 4)
+		self.assertEqual(summary.for_classroom(self.room_a.pk)[AttendanceStatus.HALF_DAY], 1)
+		self.assertEqual(summary.for_classroom(self.room_b.pk)[AttendanceStatus.EXPECTED], 1)
+
+	def test_billing_summary_counts_per_status_and_classroom(self) -> None:
+		with self.assertNumQueries(1):
+			summary = billing_summary("2025-12")
+
+		self.assertEqual(summary.get(MonthlyBillingStatus.PAID), 2)
+		self.assertEqual(summary.get(MonthlyBillingStatus.UNPAID), 2)
+		self.assertEqual(summary.for_classroom(self.room_a.pk)[MonthlyBillingStatus.UNPAID], 1)
+		self.assertEqual(billing_summary("2026-01").total, 0)
+
+class SeedDemoDataTests(TestCase):
+	def test_small_scale_is_idempotent_and_fills_every_table(self) -> None:
+		call_command("seed_demo_data", "--scale", "small", "--days", "3", "--months", "1", stdout=StringIO())
+		counts = (Child.objects.count(), Attendance.objects.count(), MonthlyBilling.objects.count())
+		call_command("seed_demo_data", "--scale", "small", "--days", "3", "--months", "1", stdout=StringIO())
+
+		self.assertEqual((Child.objects.count(), Attendance.objects.count(), MonthlyBilling.objects.count()), counts)
+		self.assertEqual(Classroom.objects.count(), 3)
+		self.assertGreater(counts[1], 0)
+		self.assertGreater(counts[2], 0)
+		self.assertTrue(Guardian.objects.exists())
+
+
+class RunBenchmarksTests(TestCase):
+	def setUp(self) -> None:
+		call_command("seed_demo_data", "--scale", "small", "--days", "2", "--months", "1", stdout=StringIO())
+		self.tmp = Path(tempfile.mkdtemp())
+		self.addCleanup(shutil.rmtree, self.tmp)
+
+	def run_benchmarks(self, *args: str) -> str:
+		out = StringIO()
+		call_command("run_benchmarks", "--only", "views", "--repeat", "1", *args, stdout=out)
+		return out.getvalue()
+
+	def slowed_down(self, report: dict[str, object], factor: float) -> dict[str, object]:
+		rows = [{**row, "median_ms": row["median_ms"] * factor} for row in report["results"]]
+		return {**report, "results": rows}
+
+	def test_compares_against_a_stored_baseline(self) -> None:
+		baseline_path = self.tmp / "baseline.json"
+		self.run_benchmarks("--output", str(baseline_path))
+		baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+		self.assertTrue(baseline["results"])
+		self.assertEqual(baseline["meta"]["repeat"], 1)
+
+		current = self.slowed_down(baseline, 1.5)
+		rows = compare(current, baseline)
+		self.assertEqual([row[0] for row in rows], [row["name"] for row in baseline["results"] if row["median_ms"]])
+		for _, old, new, change in rows:
+			self.assertAlmostEqual(change, 50.0)
+		# Benchmarks missing from the baseline are not compared.
+		self.assertEqual(compare(current, {"results": []}), [])
+
+		with mock.patch("core.management.commands.run_benchmarks.run_suite", return_value=current):
+			output = self.run_benchmarks("--baseline", str(baseline_path), "--max-regression", "60")
+		self.assertIn("(+50.0%)", output)
+
+	def test_fails_when_the_regression_threshold_is_exceeded(self) -> None:
+		baseline = {"results": [{"name": "home", "median_ms": 10.0, "p95_ms": 10.0, "queries": 2}]}
+		baseline_path = self.tmp / "baseline.json"
+		baseline_path.write_text(json.dumps(baseline), encoding="utf-8")
+		current = {"meta": {"dataset": {}}, **self.slowed_down(baseline, 1.3)}
+
+		with mock.patch("core.management.commands.run_benchmarks.run_suite", return_value=current):
+			with self.assertRaisesMessage(CommandError, "home"):
+				self.run_benchmarks("--baseline", str(baseline_path), "--max-regression", "20")
+			# Without a threshold the comparison is only reported.
+			self.assertIn("(+30.0%)", self.run_benchmarks("--baseline", str(baseline_path)))
+
+
+class ExportTests(TestCase):
+	def setUp(self) -> None:
+		self.user = get_user_model().objects.create_user(username="exporter", password="testpass123")
+		self.client.force_login(self.user)
+		self.room = Classroom.objects.create(name="Export", age_group="3-4", capacity=50)
+		other = Classroom.objects.create(name="Other", age_group="4-5", capacity=50)
+		tariff = Tariff.objects.create(name="Base", amount="450.00")
+		self.start = date(2025, 12, 1)
+		for idx in range(6):
+			Child.objects.create(
+				first_name=f"Kid{idx}",
+				last_name=f"Export{idx:02d}",
+				birth_date=date(2020, 1, 1),
+				classroom=self.room if idx < 4 else other,
+				tariff=tariff,
+			)
+		materialize_attendance(self.start, self.start + timedelta(days=2))
+		generate_billing("2025-11", "2025-12")
+		export_dir = tempfile.TemporaryDirectory()
+		self.addCleanup(export_dir.cleanup)
+		self.export_root = Path(export_dir.name)
+		settings_override = override_settings(EXPORT_ROOT=self.export_root)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+
+	def test_attendance_csv_streams_the_filtered_date_range(self) -> None:
+		resp = self.client.get(
+			reverse("core:attendance_export"),
+			{"date_from": "2025-12-01", "date_to": "2025-12-02", "classroom": self.room.pk},
+		)
+		self.assertEqual(resp.status_code, 200)
+		self.assertTrue(resp.streaming)
+		self.assertIn("davomat_20251201-20251202.csv", resp["Content-Disposition"])
+		lines = b"".join(resp.streaming_content).decode("utf-8-sig").splitlines()
+		self.assertEqual(lines[0].split(",")[:2], ["Sana", "Familiya"])
+		self.assertEqual(len(lines), 1 + 4 * 2)
+		self.assertTrue(all(line.startswith("2025-12-0") for line in lines[1:]))
+
+	def test_billing_xlsx_is_a_valid_workbook_with_numeric_amounts(self) -> None:
+		resp = self.client.get(
+			reverse("core:billing_monthly_export"),
+			{"month_from": "2025-11", "month_to": "2025-12", "format": "xlsx"},
+		)
+		self.assertEqual(resp.status_code, 200)
+		archive = zipfile.ZipFile(BytesIO(b"".join(resp.streaming_content)))
+		self.assertIsNone(archive.testzip())
+		sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+		self.assertEqual(sheet.count("<row>"), 1 + 6 * 2)
+		self.assertIn("<c><v>450.00</v></c>", sheet)
+
+	@override_settings(EXPORT_STREAM_MAX_ROWS=5)
+	def test_too_large_export_offers_a_background_job(self) -> None:
+		params = {"date_from": "2025-12-01", "date_to": "2025-12-03", "status": "expected"}
+		resp = self.client.get(reverse("core:attendance_export"), params)
+		self.assertContains(resp, reverse("core:export_job_create"))
+
+		resp = self.client.post(reverse("core:export_job_create"), {**params, "kind": "attendance", "format": "csv"})
+		self.assertRedirects(resp, reverse("core:export_job_list"))
+		job = ExportJob.objects.get()
+		self.assertEqual(job.params, params)
+		self.assertEqual(job.requested_by, self.user)
+
+	def test_job_resumes_from_its_checkpoint_and_matches_the_stream(self) -> None:
+		params = {"date_from": "2025-12-01", "date_to": "2025-12-03"}
+		job = ExportJob.objects.create(kind="attendance", params=params, requested_by=self.user)
+		run_export_job(job, chunk_size=4, max_chunks=2)
+		self.assertEqual((job.status, job.rows_written), (ExportJobStatus.PENDING, 8))
+
+		# Simulate a crash mid-chunk: bytes past the checkpoint are discarded.
+		with (self.export_root / f"job-{job.pk}.csv.part").open("ab") as fh:
+			fh.write(b"half a row")
+		call_command("run_export_jobs", "--chunk-size", "4", stdout=StringIO())
+
+		job.refresh_from_db()
+		self.assertEqual((job.status, job.rows_written), (ExportJobStatus.DONE, 18))
+		expected = b"".join(stream_export(build_export("attendance", params), "csv"))
+		resp = self.client.get(reverse("core:export_job_download", args=[job.pk]))
+		self.assertEqual(b"".join(resp.streaming_content), expected)
+
+
+class ChildImportTests(TestCase):
+	HEADER = "first_name,last_name,birth_date,classroom,classroom_age_group,classroom_capacity,tariff,guardian_first_name,guardian_last_name,guardian_phone,guardian_email,guardian_is_primary\n"
+
+	def setUp(self) -> None:
+		self.room = Classroom.objects.create(name="Lola", age_group="3-4", capacity=3)
+		Child.objects.create(first_name="Old", last_name="Kid", birth_date=date(2020, 1, 1), classroom=self.room)
+		Tariff.objects.create(name="Base", amount="450.00")
+
+	def _csv(self, *rows: str) -> StringIO:
+		return StringIO(self.HEADER + "".join(f"{row}\n" for row in rows))
+
+	def test_imports_rows_in_bulk_and_reports_invalid_ones(self) -> None:
+		result = import_children_csv(
+			self._csv(
+				"Ali,Karimov,2021-02-03,Lola,,,Base,Ota,Karimov,+998901234567,ota@example.com,1",
+				"Ali,Karimov,2021-02-03,Lola,,,,Ona,Karimova,+998901234568,ona@example.com,",
+				"Vali,Aliyev,03.04.2021,Lola,,,,,,,,",
+				"Full,Room,2021-01-01,Lola,,,,,,,,",
+				"New,Room,2021-01-01,Yulduz,4-5,10,,,,,,",
+				"Bad,Row,2099-01-01,Nowhere,,,Gold,Ota,,12,not-an-email,",
+				"Old,Kid,2020-01-01,Lola,,,,,,,,",
+			),
+			chunk_size=2,
+		)
+
+		self.assertEqual((result.rows, result.children, result.guardians, result.classrooms), (7, 3, 2, 1))
+		self.assertEqual(result.failed_rows, 3)
+		errors = {(error.line, error.field) for error in result.errors}
+		self.assertIn((5, "classroom"), errors)
+		self.assertTrue({(7, "birth_date"), (7, "tariff"), (7, "guardian_phone"), (7, "guardian_email")} <= errors)
+		self.assertIn((8, "first_name"), errors)
+
+		ali = Child.objects.get(first_name="Ali")
+		self.assertEqual(ali.tariff.name, "Base")
+		self.assertEqual(ali.guardians.count(), 2)
+		self.assertEqual(Child.objects.filter(classroom=self.room).count(), 3)
+		self.assertEqual(Classroom.objects.get(name="Yulduz").children.count(), 1)
+		self.assertTrue(Child.objects.filter(child_search_filter("Karimov")).exists())
+
+	def test_a_new_classroom_without_room_for_its_child_is_not_created(self) -> None:
+		result = import_children_csv(self._csv("Bir,Bola,2021-01-01,Bosh,3-4,0,,,,,,"))
+
+		self.assertEqual((result.children, result.classrooms), (0, 0))
+		self.assertEqual([(error.line, error.field) for error in result.errors], [(2, "classroom")])
+		self.assertFalse(Classroom.objects.filter(name="Bosh").exists())
+
+	def test_tariffs_are_read_from_the_database_not_the_reference_cache(self) -> None:
+		self.assertEqual([tariff.name for tariff in reference_cache.tariffs()], ["Base"])
+		# bulk_create() sends no signals, so the cached tariff list is now stale.
+		Tariff.objects.bulk_create([Tariff(name="Gold", amount="900.00")])
+		self.assertEqual(len(reference_cache.tariffs()), 1)
+
+		result = import_children_csv(self._csv("Oltin,Bola,2021-02-03,Lola,,,Gold,,,,,"))
+		self.assertEqual((result.children, result.errors), (1, []))
+		self.assertEqual(Child.objects.get(first_name="Oltin").tariff.name, "Gold")
+
+	def test_validation_queries_do_not_grow_with_rows(self) -> None:
+		self.room.capacity = 1000
+		self.room.save()
+
+		def queries_for(count: int) -> int:
+			rows = [f"Kid{count}x{idx},Test,2021-01-01,Lola,,,,,,,," for idx in range(count)]
+			cache.clear()
+			with CaptureQueriesContext(connection) as ctx:
+				import_children_csv(self._csv(*rows), dry_run=True)
+			return len(ctx.captured_queries)
+
+		self.assertEqual(queries_for(5), queries_for(50))
+
+	def test_admin_upload_and_command_error_report(self) -> None:
+		admin_user = get_user_model().objects.create_superuser("admin", "admin@example.com", "testpass123")
+		self.client.force_login(admin_user)
+		upload = SimpleUploadedFile("children.csv", self._csv("Aziz,Olimov,2021-05-05,Lola,,,,,,,,").getvalue().encode())
+		resp = self.client.post(
+			reverse("admin:core_child_import_csv"),
+			{"file": upload, "delimiter": ","},
+		)
+		self.assertEqual(resp.status_code, 200)
+		self.assertTrue(Child.objects.filter(first_name="Aziz").exists())
+
+		with tempfile.TemporaryDirectory() as tmp:
+			source, report = Path(tmp) / "in.csv", Path(tmp) / "errors.csv"
+			source.write_text(self._csv("Bad,Date,31/12/2020,Lola,,,,,,,,").getvalue(), encoding="utf-8")
+			call_command("import_children", str(source), "--errors", str(report), stdout=StringIO())
+			self.assertEqual(
+				report.read_text(encoding="utf-8").splitlines()[1],
+				"2,birth_date,Enter a date in YYYY-MM-DD or DD.MM.YYYY format.",
+			)
+
+
+class ClassroomOccupancyTests(TestCase):
+	def setUp(self) -> None:
+		self.room = Classroom.objects.create(name="Quyosh", age_group="3-4", capacity=2)
+		self.empty = Classroom.objects.create(name="Oy", age_group="4-5", capacity=5)
+		for idx, status in enumerate([ChildStatus.ACTIVE, ChildStatus.INACTIVE]):
+			Child.objects.create(
+				first_name=f"Kid{idx}",
+				last_name="Test",
+				birth_date=date(2020, 1, 1),
+				classroom=self.room,
+				status=status,
+			)
+
+	def test_with_occupancy_counts_every_classroom_in_one_query(self) -> None:
+		with self.assertNumQueries(1):
+			rooms = {room.name: room for room in Classroom.objects.with_occupancy()}
+		self.assertEqual((rooms["Quyosh"].occupied, rooms["Quyosh"].active_children), (2, 1))
+		self.assertEqual((rooms["Quyosh"].seats_left, rooms["Quyosh"].occupancy_percent), (0, 100))
+		self.assertEqual((rooms["Oy"].occupied, rooms["Oy"].seats_left), (0, 5))
+
+	def test_reserve_seat_rechecks_capacity_under_the_lock(self) -> None:
+		with transaction.atomic():
+			self.assertEqual(reserve_seat(self.empty), self.empty)
+			with self.assertRaises(ValidationError):
+				reserve_seat(self.room)
+			# Re-saving a child already in the classroom does not need a new seat.
+			reserve_seat(self.room, child=self.room.children.first())
+
+	def test_child_create_view_rejects_a_full_classroom(self) -> None:
+		user = get_user_model().objects.create_user(username="seat", password="testpass123")
+		self.client.force_login(user)
+		data = {"first_name": "New", "last_name": "Kid", "birth_date": "2021-01-01", "status": "active"}
+
+		resp = self.client.post(reverse("core:child_create"), {**data, "classroom": self.room.pk})
+		self.assertEqual(resp.status_code, 200)
+		self.assertContains(resp, "full capacity")
+
+		resp = self.client.post(reverse("core:child_create"), {**data, "classroom": self.empty.pk})
+		self.assertRedirects(resp, reverse("core:child_list"))
+		self.assertEqual(self.empty.children.count(), 1)
+
+
+
+class AttendanceMonthlySummaryTests(TestCase):
+	def setUp(self) -> None:
+		self.classroom = Classroom.objects.create(name="Yulduz", age_group="4-5", capacity=10)
+		self.children = [
+			Child.objects.create(
+				first_name=f"Bola{idx}",
+				last_name="Summary",
+				birth_date=date(2020, 1, 1),
+				classroom=self.classroom,
+			)
+			for idx in range(2)
+		]
+
+	def counts(self, child: Child, month: date) -> tuple[int, ...] | None:
+		row = AttendanceMonthlySummary.objects.filter(child=child, month=month).first()
+		return row and (row.expected, row.present, row.absent, row.late, row.half_day)
+
+	def test_rollup_follows_every_write_path(self) -> None:
+		first, second = self.children
+		materialize_attendance(date(2025, 11, 28), date(2025, 12, 2))
+		self.assertEqual(self.counts(first, date(2025, 11, 1)), (3, 0, 0, 0, 0))
+		self.assertEqual(self.counts(first, date(2025, 12, 1)), (2, 0, 0, 0, 0))
+
+		row = Attendance.objects.get(child=first, attendance_date=date(2025, 12, 1))
+		row.status = AttendanceStatus.PRESENT
+		row.save(update_fields=["status", "updated_at"])
+		Attendance.objects.filter(child=second, attendance_date__month=11).update(status=AttendanceStatus.ABSENT)
+		apply_attendance_batch(
+			[{"child_id": first.pk, "status": "late"}, {"child_id": second.pk, "status": "half_day"}],
+			date(2025, 12, 2),
+		)
+		self.assertEqual(self.counts(first, date(2025, 12, 1)), (0, 1, 0, 1, 0))
+		self.assertEqual(self.counts(second, date(2025, 11, 1)), (0, 0, 3, 0, 0))
+		self.assertEqual(self.counts(second, date(2025, 12, 1)), (1, 0, 0, 0, 1))
+
+		# Moving a row to another month updates both months.
+		row.attendance_date = date(2025, 11, 27)
+		row.save()
+		self.assertEqual(self.counts(first, date(2025, 11, 1)), (3, 1, 0, 0, 0))
+		self.assertEqual(self.counts(first, date(2025, 12, 1)), (0, 0, 0, 1, 0))
+
+		Attendance.objects.filter(child=second, attendance_date__month=12).delete()
+		Attendance.objects.get(child=first, attendance_date=date(2025, 12, 2)).delete()
+		self.assertIsNone(self.counts(second, date(2025, 12, 1)))
+		self.assertIsNone(self.counts(first, date(2025, 12, 1)))
+
+	def test_rebuild_backfills_paused_writes(self) -> None:
+		with summary_paused():
+			materialize_attendance(date(2025, 10, 30), date(2025, 11, 2))
+			Attendance.objects.filter(attendance_date=date(2025, 11, 1)).update(status=AttendanceStatus.PRESENT)
+		self.assertFalse(AttendanceMonthlySummary.objects.exists())
+
+		result = rebuild_attendance_summary()
+		self.assertEqual((result.months, result.rows), (2, 4))
+		self.assertEqual(self.counts(self.children[0], date(2025, 11, 1)), (1, 1, 0, 0, 0))
+
+		AttendanceMonthlySummary.objects.all().delete()
+		out = StringIO()
+		call_command("rebuild_attendance_summary", month="2025-11", stdout=out)
+		self.assertIn("1 oy, 2 ta", out.getvalue())
+		self.assertEqual(AttendanceMonthlySummary.objects.filter(month=date(2025, 11, 1)).count(), 2)
+		with self.assertRaises(CommandError):
+			call_command("rebuild_attendance_summary", month="2025-13", stdout=StringIO())
+
+	def test_report_view_reads_the_rollup(self) -> None:
+		user = get_user_model().objects.create_user(username="report", password="testpass123")
+		self.client.force_login(user)
+		materialize_attendance(date(2025, 12, 1), date(2025, 12, 4))
+		Attendance.objects.filter(child=self.children[0]).update(status=AttendanceStatus.PRESENT)
+		Attendance.objects.filter(child=self.children[1], attendance_date__lte=date(2025, 12, 2)).update(
+			status=AttendanceStatus.ABSENT
+		)
+
+		resp = self.client.get(reverse("core:attendance_report"), {"month": "2025-12"})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(len(resp.context["rows"]), 2)
+		self.assertEqual(resp.context["summary_rate"], 66.7)
+		self.assertEqual(resp.context["classroom_rows"][0]["counts"][AttendanceStatus.ABSENT], 2)
+		self.assertContains(resp, "100.0%")
+
+
+
+class BillingProrationTests(TestCase):
+	def setUp(self) -> None:
+		classroom = Classroom.objects.create(name="Kamalak", age_group="4-5", capacity=10)
+		tariff = Tariff.objects.create(name="Oylik", amount="230000.00")
+		self.children = {
+			name: Child.objects.create(
+				first_name=name,
+				last_name="Prorate",
+				birth_date=date(2020, 1, 1),
+				classroom=classroom,
+				tariff=tariff,
+				enrolled_on=enrolled_on,
+			)
+			for name, enrolled_on in [
+				("Full", date(2025, 9, 1)),
+				("Late", date(2025, 12, 15)),
+				("Paid", date(2025, 12, 15)),
+				("Future", date(2026, 1, 5)),
+			]
+		}
+		generate_billing("2025-12")
+		MonthlyBilling.objects.filter(child=self.children["Paid"]).update(status=MonthlyBillingStatus.PAID)
+		full = self.children["Full"]
+		Attendance.objects.bulk_create(
+			[Attendance(child=full, attendance_date=date(2025, 12, day), status=AttendanceStatus.ABSENT) for day in (1, 2, 3)]
+			+ [Attendance(child=full, attendance_date=date(2025, 12, day), status=AttendanceStatus.HALF_DAY) for day in (4, 5)]
+		)
+		self.rules = ProrationRules(
+			absence_credit_percent=Decimal("100"),
+			absence_free_days=1,
+			half_day_credit_percent=Decimal("50"),
+			round_to=Decimal("1000"),
+		)
+
+	def amount(self, name: str) -> Decimal:
+		return MonthlyBilling.objects.get(child=self.children[name], billing_month="2025-12").amount
+
+	def test_rules(self) -> None:
+		# December 2025 starts on a Monday: 23 weekdays, 13 of them from the 15th.
+		self.assertEqual(working_days(date(2025, 12, 1), date(2025, 12, 31), range(5)), 23)
+		self.assertEqual(working_days(date(2025, 12, 15), date(2025, 12, 31), range(5)), 13)
+		base = Decimal("230000")
+		self.assertEqual(prorate_amount(base, working=23, billable=23, rules=ProrationRules()), base)
+		self.assertEqual(prorate_amount(base, working=23, billable=0, rules=ProrationRules()), 0)
+		floor = ProrationRules(min_charge_percent=Decimal("50"))
+		self.assertEqual(prorate_amount(base, working=23, billable=2, rules=floor), Decimal("115000.00"))
+		self.assertEqual(prorate_amount(base, working=23, billable=1, rules=self.rules), Decimal("10000"))
+		# BILLING_ROUND_TO=0 (or unset) means no rounding beyond the column's cents.
+		for round_to in (Decimal("0"), None):
+			unrounded = ProrationRules(round_to=round_to)
+			self.assertEqual(prorate_amount(Decimal("100000"), working=3, billable=1, rules=unrounded), Decimal("33333.33"))
+		with override_settings(BILLING_ROUND_TO=Decimal("0")):
+			self.assertEqual(ProrationRules.from_settings().round(Decimal("2.675")), Decimal("2.68"))
+
+	def test_prorates_unpaid_rows_in_bulk_and_is_idempotent(self) -> None:
+		# Savepoint, chunk read (billing + child + rollup join), bulk_update, empty chunk, release.
+		with self.assertNumQueries(5):
+			result = prorate_billing("2025-12", rules=self.rules)
+		self.assertEqual((result.rows, result.updated), (3, 3))
+		# 23 days less 2 credited absences and 2 half days at 50%.
+		self.assertEqual(self.amount("Full"), Decimal("200000"))
+		self.assertEqual(self.amount("Late"), Decimal("130000"))
+		self.assertEqual(self.amount("Paid"), Decimal("230000"))
+		self.assertEqual(self.amount("Future"), Decimal("0"))
+
+		self.assertEqual(prorate_billing("2025-12", rules=self.rules).updated, 0)
+		out = StringIO()
+		call_command("prorate_billing", month="2025-12", stdout=out)
+		self.assertIn("3 ta yozuv", out.getvalue())
+		# Default rules (no absence credit) recompute from base_amount, not the prorated amount.
+		self.assertEqual(self.amount("Full"), Decimal("230000"))
+		self.assertEqual(self.amount("Late"), Decimal("130000"))
+
+
+
+class PaymentLedgerTests(TestCase):
+	def setUp(self) -> None:
+		self.classroom = Classroom.objects.create(name="Lola", age_group="4-5", capacity=10)
+		tariff = Tariff.objects.create(name="Asosiy", amount="300.00")
+		self.children = [
+			Child.objects.create(
+				first_name=f"Bola{idx}",
+				last_name="Ledger",
+				birth_date=date(2020, 1, 1),
+				classroom=self.classroom,
+				tariff=tariff,
+			)
+			for idx in range(3)
+		]
+		generate_billing("2025-11", "2025-12")
+		self.row = MonthlyBilling.objects.get(child=self.children[0], billing_month="2025-12")
+
+	def state(self, row: MonthlyBilling) -> tuple[str, str, str]:
+		return (str(row.paid_amount), str(row.balance), row.status)
+
+	def test_rows_saved_through_the_orm_keep_balance_and_status(self) -> None:
+		row = MonthlyBilling.objects.create(child=self.children[1], billing_month="2026-01", amount=Decimal("300"))
+		row.refresh_from_db()
+		self.assertEqual(self.state(row), ("0.00", "300.00", MonthlyBillingStatus.UNPAID))
+
+		row.mark_paid()
+		self.assertEqual(self.state(row), ("300.00", "0.00", MonthlyBillingStatus.PAID))
+
+		# An admin-style edit of the amount re-derives the balance from what is paid.
+		row.amount = Decimal("400")
+		row.save(update_fields=["amount"])
+		row.refresh_from_db()
+		self.assertEqual(self.state(row), ("300.00", "100.00", MonthlyBillingStatus.PARTIAL))
+
+	def test_payments_and_refunds_keep_balance_and_status_in_step(self) -> None:
+		self.assertEqual(self.state(self.row), ("0.00", "300.00", MonthlyBillingStatus.UNPAID))
+		record_payment(self.row, Decimal("100"))
+		self.assertEqual(self.state(self.row), ("100.00", "200.00", MonthlyBillingStatus.PARTIAL))
+		record_payment(self.row, Decimal("200"))
+		self.assertEqual(self.state(self.row), ("300.00", "0.00", MonthlyBillingStatus.PAID))
+		self.assertIsNotNone(self.row.paid_at)
+
+		record_payment(self.row, Decimal("50"), kind=PaymentKind.REFUND)
+		self.assertEqual(self.state(self.row), ("250.00", "50.00", MonthlyBillingStatus.PARTIAL))
+		self.assertIsNone(self.row.paid_at)
+		with self.assertRaises(ValidationError):
+			record_payment(self.row, Decimal("251"), kind=PaymentKind.REFUND)
+		with self.assertRaises(ValidationError):
+			record_payment(self.row, Decimal("0"))
+
+		self.row.mark_unpaid()
+		self.assertEqual(self.state(self.row), ("0.00", "300.00", MonthlyBillingStatus.UNPAID))
+		self.assertEqual(Payment.objects.filter(billing=self.row).count(), 4)
+
+		# The denormalized columns match a recomputation from the ledger.
+		MonthlyBilling.objects.update(paid_amount=0, balance=0, status=MonthlyBillingStatus.PAID)
+		recalculate_balances()
+		self.row.refresh_from_db()
+		self.assertEqual(self.state(self.row), ("0.00", "300.00", MonthlyBillingStatus.UNPAID))
+
+	def test_settle_billing_pays_off_rows_in_two_statements(self) -> None:
+		record_payment(self.row, Decimal("120"))
+		with self.assertNumQueries(4):
+			settled = settle_billing(MonthlyBilling.objects.filter(billing_month="2025-12"))
+		self.assertEqual(settled, 3)
+		self.row.refresh_from_db()
+		self.assertEqual(self.state(self.row), ("300.00", "0.00", MonthlyBillingStatus.PAID))
+		self.assertEqual(
+			sorted(str(p.amount) for p in Payment.objects.filter(billing=self.row)), ["120.00", "180.00"]
+		)
+
+	def test_payment_page_and_debtors_report(self) -> None:
+		user = get_user_model().objects.create_user(username="cashier", password="testpass123")
+		self.client.force_login(user)
+		url = reverse("core:billing_payments", kwargs={"pk": self.row.pk})
+		resp = self.client.post(url, {"kind": "payment", "amount": "300", "method": "card"})
+		self.assertRedirects(resp, url)
+		self.assertContains(self.client.get(url), "300.00")
+		resp = self.client.post(url, {"kind": "refund", "amount": "500", "method": "cash"})
+		self.assertContains(resp, "cannot exceed")
+
+		record_payment(MonthlyBilling.objects.get(child=self.children[1], billing_month="2025-11"), Decimal("300"))
+		rows = list(debtors(through="2025-12"))
+		self.assertEqual(
+			[(row["child_id"], row["debt"], row["months"], row["oldest"]) for row in rows],
+			[
+				(self.children[2].pk, Decimal("600"), 2, "2025-11"),
+				(self.children[0].pk, Decimal("300"), 1, "2025-11"),
+				(self.children[1].pk, Decimal("300"), 1, "2025-12"),
+			],
+		)
+		if connection.vendor == "sqlite":
+			self.assertIn("monthly_billing_debt_idx", debtors(through="2025-12").explain())
+
+		resp = self.client.get(reverse("core:billing_debtors"), {"through": "2025-12", "min_months": "2"})
+		self.assertEqual([row["child"] for row in resp.context["debtors"]], [self.children[2]])
+
+class AsyncAttendanceViewTests(TestCase):
+	"""The ASGI variants, called directly on the event loop (any sync ORM access raises)."""
+
+	@classmethod
+	def setUpTestData(cls) -> None:
+		cls.user = get_user_model().objects.create_user(username="dropoff", password="testpass123")
+		classroom = Classroom.objects.create(name="Async", age_group="3-4", capacity=30)
+		cls.day = date(2025, 12, 1)
+		cls.rows = [
+			Attendance.objects.create(
+				child=Child.objects.create(
+					first_name="Bola", last_name=f"Async{idx}", birth_date=date(2020, 1, 1), classroom=classroom
+				),
+				attendance_date=cls.day,
+			)
+			for idx in range(3)
+		]
+
+	def request(self, method: str, path: str, data: dict[str, str] | None = None, *, user: object = None):
+		request = getattr(AsyncRequestFactory(), method)(path, data or {})
+		request.session = SessionStore()
+		request._messages = FallbackStorage(request)
+		user = user or self.user
+
+		async def auser():
+			return user
+
+		request.auser = auser
+		return request
+
+	async def test_list_renders_page_with_count(self) -> None:
+		view = views.AsyncAttendanceListView.as_view(paginate_by=2)
+		resp = await view(self.request("get", "/attendance/", {"date": "2025-12-01"}))
+		self.assertEqual(resp.status_code, 200)
+		self.assertContains(resp, "Async0")
+		self.assertContains(resp, "Page 1 of 2")
+		self.assertNotContains(resp, "Async2")
+
+	async def test_quick_mark_and_set_time(self) -> None:
+		row = self.rows[0]
+		mark = views.AsyncAttendanceQuickMarkView.as_view()
+		resp = await mark(self.request("post", "/"), pk=row.pk, status="present")
+		self.assertEqual(resp.status_code, 302)
+		self.assertEqual(resp["Location"], "/attendance/?date=2025-12-01")
+		resp = await mark(self.request("post", "/"), pk=row.pk, status="bogus")
+		self.assertEqual(resp.status_code, 400)
+
+		set_time = views.AsyncAttendanceSetTimeView.as_view()
+		resp = await set_time(self.request("post", "/", {"time": "08:05"}), pk=row.pk, field="check_in_time")
+		self.assertEqual(resp.status_code, 302)
+		resp = await set_time(self.request("post", "/", {"time": "8h"}), pk=row.pk, field="check_in_time")
+		self.assertEqual(resp.status_code, 400)
+
+		row = await Attendance.objects.aget(pk=row.pk)
+		self.assertEqual((row.status, row.check_in_time.strftime("%H:%M")), (AttendanceStatus.PRESENT, "08:05"))
+		summary = await AttendanceMonthlySummary.objects.aget(child_id=row.child_id)
+		self.assertEqual(summary.present, 1)
+
+	async def test_anonymous_user_is_redirected_to_login(self) -> None:
+		resp = await views.AsyncAttendanceListView.as_view()(self.request("get", "/attendance/", user=AnonymousUser()))
+		self.assertEqual(resp.status_code, 302)
+		self.assertIn("/login/", resp["Location"])
+
+class LiveAttendanceBoardTests(TestCase):
+	@classmethod
+	def setUpTestData(cls) -> None:
+		cls.user = get_user_model().objects.create_user(username="board", password="testpass123")
+		cls.classroom = Classroom.objects.create(name="Live", age_group="3-4", capacity=30)
+		cls.day = date(2025, 12, 1)
+		cls.rows = [
+			Attendance.objects.create(
+				child=Child.objects.create(
+					first_name="Bola", last_name=f"Live{idx}", birth_date=date(2020, 1, 1), classroom=cls.classroom
+				),
+				attendance_date=cls.day,
+			)
+			for idx in range(3)
+		]
+
+	def write(self, fn) -> None:
+		with self.captureOnCommitCallbacks(execute=True):
+			fn()
+
+	def bulk_mark_present(self) -> None:
+		self.client.force_login(self.user)
+		self.client.post(
+			reverse("core:attendance_bulk_mark_present"), {"date": "2025-12-01", "classroom": self.classroom.pk}
+		)
+
+	def set_check_in(self) -> None:
+		row = Attendance.objects.get(pk=self.rows[2].pk)
+		row.check_in_time = time(8, 30)
+		row.save(update_fields=["check_in_time", "updated_at"])
+
+	async def test_writes_publish_committed_changes(self) -> None:
+		broker = get_broker()
+		subscription = broker.subscribe()
+		try:
+			await sync_to_async(self.write)(self.bulk_mark_present)
+			changes = await subscription.get(1)
+			self.assertTrue(changes and all(change.covers(self.day) for change in changes))
+
+			# Time-only saves skip the rollup but still reach the board.
+			await sync_to_async(self.write)(self.set_check_in)
+			(change,) = await subscription.get(1)
+			self.assertEqual(change.child_ids, {self.rows[2].child_id})
+
+			# Rolled back writes are never announced.
+			await sync_to_async(self.set_check_in)()
+			self.assertIsNone(await subscription.get(0.05))
+		finally:
+			broker.unsubscribe(subscription)
+		self.assertFalse(broker.has_listeners())
+
+	async def test_postgres_broker_publishes_only_while_a_stream_is_open_somewhere(self) -> None:
+		await cache.aclear()
+		broker = PostgresBroker()
+		self.assertFalse(await sync_to_async(broker.has_listeners)())
+		# A stream in another process marks its presence in the shared cache.
+		await PostgresBroker().atouch()
+		self.assertTrue(await sync_to_async(broker.has_listeners)())
+		await cache.adelete(PostgresBroker.presence_key)
+		self.assertFalse(await sync_to_async(broker.has_listeners)())
+
+		with mock.patch.object(cache, "aset", wraps=cache.aset) as aset:
+			await broker.atouch()
+			await broker.atouch()
+		self.assertEqual(aset.call_count, 1)
+
+	async def test_stream_sends_rows_and_counts(self) -> None:
+		view = views.AttendanceLiveView(heartbeat=0.05, debounce=0)
+		stream = view.events(self.day, [row.pk for row in self.rows[:2]])
+		self.assertTrue((await anext(stream)).startswith("retry:"))
+		self.assertEqual(await anext(stream), ": ping\n\n")
+
+		await sync_to_async(self.write)(self.bulk_mark_present)
+		message = await anext(stream)
+		while message.startswith(":"):
+			message = await anext(stream)
+		await stream.aclose()
+		self.assertFalse(get_broker().has_listeners())
+
+		event, data = message.strip().split("\n")
+		self.assertEqual(event, "event: attendance")
+		payload = json.loads(data.removeprefix("data: "))
+		self.assertEqual(payload["counts"][AttendanceStatus.PRESENT], 3)
+		self.assertEqual(
+			{(row["id"], row["badge"], row["label"]) for row in payload["rows"]},
+			{(row.pk, "success", "Keldi") for row in self.rows[:2]},
+		)
+
+class FragmentCacheTests(TransactionTestCase):
+	"""Committed writes only, as in production: TestCase's open transaction keeps the fragment cache off."""
+
+	day = date(2025, 12, 1)
+	month = "2025-12"
+
+	def setUp(self) -> None:
+		cache.clear()
+		self.user = get_user_model().objects.create_user(username="frag", password="testpass123")
+		self.client.force_login(self.user)
+		self.classroom = Classroom.objects.create(name="Frag", age_group="3-4", capacity=30)
+		tariff = Tariff.objects.create(name="Standard", amount="500.00")
+		self.children = [
+			Child.objects.create(
+				first_name="Bola", last_name=f"Frag{idx}", birth_date=date(2020, 1, 1), classroom=self.classroom, tariff=tariff
+			)
+			for idx in range(3)
+		]
+		self.rows = [Attendance.objects.create(child=child, attendance_date=self.day) for child in self.children]
+		generate_billing(self.month)
+
+	def attendance(self, client=None):
+		return (client or self.client).get(reverse("core:attendance_list"), {"date": "2025-12-01"})
+
+	def billing(self):
+		return self.client.get(reverse("core:billing_monthly_list"), {"month": self.month})
+
+	def test_unchanged_pages_skip_the_row_queries(self) -> None:
+		file_cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tempfile.mkdtemp()}
+		for backend in ({"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}, file_cache):
+			with self.subTest(backend=backend["BACKEND"]), override_settings(CACHES={"default": backend}):
+				for fetch in (self.attendance, self.billing):
+					with CaptureQueriesContext(connection) as miss:
+						fetch()
+					# Session, user and the status counts; no row or pager queries.
+					with self.assertNumQueries(3):
+						resp = fetch()
+					self.assertGreater(len(miss.captured_queries), 3)
+					self.assertContains(resp, "Frag2, Bola")
+
+	def test_writes_invalidate_the_cached_tables(self) -> None:
+		self.attendance()
+		row = self.rows[0]
+		row.status = AttendanceStatus.LATE
+		row.save()
+		self.assertContains(self.attendance(), "Kechikdi</span>")
+		Attendance.objects.filter(pk=row.pk).update(check_out_time=time(17, 45))
+		self.assertContains(self.attendance(), "5:45 p.m.")
+		child = self.children[0]
+		child.last_name = "Renamed"
+		child.save()
+		self.assertContains(self.attendance(), "Renamed, Bola")
+
+		self.billing()
+		MonthlyBilling.objects.filter(child=self.children[1]).update(amount=Decimal("123.45"))
+		self.assertContains(self.billing(), "123.45")
+		Child.objects.create(first_name="Yangi", last_name="Qoshilgan", birth_date=date(2020, 1, 1), classroom=self.classroom)
+		generate_billing(self.month)
+		self.assertContains(self.billing(), "Qoshilgan, Yangi")
+
+	def test_paused_bulk_delete_invalidates_the_cached_table(self) -> None:
+		self.assertContains(self.attendance(), "Frag1, Bola")
+		with summary_paused():
+			Attendance.objects.filter(child=self.children[1]).delete()
+		self.assertNotContains(self.attendance(), "Frag1, Bola")
+
+	def test_csrf_tokens_belong_to_each_request(self) -> None:
+		self.attendance()
+		other = Client(enforce_csrf_checks=True)
+		other.force_login(self.user)
+		html = self.attendance(other).context["table"]
+		self.assertNotIn(fragment_cache.CSRF_PLACEHOLDER, html)
+		url = reverse("core:attendance_mark", args=[self.rows[0].pk, "late"])
+		token = re.search(f'action="{url}"><input type="hidden" name="csrfmiddlewaretoken" value="([^"]+)"', html)[1]
+		self.assertEqual(other.post(url, {"csrfmiddlewaretoken": token}).status_code, 302)
+
+	def test_transaction_with_writes_bypasses_the_cache(self) -> None:
+		def key() -> str | None:
+			return fragment_cache.fragment_key("core/attendance_table.html", [fragment_cache.ATTENDANCE], {})
+
+		with transaction.atomic():
+			self.assertIsNotNone(key())
+			Attendance.objects.filter(pk=self.rows[0].pk).update(notes="x")
+			self.assertIsNone(key())
+
+
+class TemplateWarmupTests(TransactionTestCase):
+	def setUp(self) -> None:
+		cache.clear()
+		classroom = Classroom.objects.create(name="Warm", age_group="3-4", capacity=10)
+		Child.objects.create(first_name="Bola", last_name="Birinchi", birth_date=date(2020, 1, 1), classroom=classroom)
+		self.classroom = classroom
+
+	def test_warm_up_compiles_templates_and_renders_static_forms(self) -> None:
+		loader = engines["django"].engine.template_loaders[0]
+		self.assertIsInstance(loader, CachedLoader)
+		loader.reset()
+		result = warm_up()
+		self.assertIn("core/form.html", loader.get_template_cache)
+		self.assertIn("core/attendance_table.html", loader.get_template_cache)
+		self.assertIn("registration/login.html", loader.get_template_cache)
+		self.assertEqual(result.forms, 4)
+		with self.assertNumQueries(0):
+			self.assertIn("Birinchi", crispy_cached(GuardianForm()))
+			crispy_cached(ChildForm())
+
+	def test_cached_forms_follow_their_data(self) -> None:
+		self.assertNotIn("Ikkinchi", crispy_cached(GuardianForm()))
+		Child.objects.create(first_name="Bola", last_name="Ikkinchi", birth_date=date(2020, 1, 1), classroom=self.classroom)
+		self.assertIn("Ikkinchi", crispy_cached(GuardianForm()))
+
+		self.assertIn('value="Kichik"', crispy_cached(ClassroomForm(initial={"name": "Kichik"})))
+		self.assertNotIn('value="Kichik"', crispy_cached(ClassroomForm()))
+		self.assertIn("is-invalid", crispy_cached(ClassroomForm(data={})))
+		self.assertNotIn("is-invalid", crispy_cached(ClassroomForm()))
+
+
+class AdminChangelistTests(TestCase):
+	@classmethod
+	def setUpTestData(cls) -> None:
+		tariff = Tariff.objects.create(name="Standart", amount=Decimal("500000.00"))
+		cls.classroom = Classroom.objects.create(name="Quyoshcha", age_group="4-5", capacity=50)
+		for idx in range(40):
+			child = Child.objects.create(
+				first_name="Malika" if idx == 7 else f"Bola{idx}",
+				last_name="Karimova",
+				birth_date=date(2020, 1, 1),
+				classroom=cls.classroom,
+				tariff=tariff,
+			)
+			for day in (1, 2):
+				Attendance.objects.create(child=child, attendance_date=date(2025, 12, day))
+			MonthlyBilling.objects.create(child=child, billing_month="2025-12", amount=Decimal("500000.00"))
+		cls.admin_user = get_user_model().objects.create_superuser("admin", "admin@example.com", "testpass123")
+
+	def test_changelists_run_a_fixed_number_of_queries(self) -> None:
+		self.client.force_login(self.admin_user)
+		urls = [
+			reverse("admin:core_attendance_changelist"),
+			f"{reverse('admin:core_attendance_changelist')}?classroom={self.classroom.pk}&status=expected&p=2",
+			reverse("admin:core_monthlybilling_changelist"),
+			f"{reverse('admin:core_monthlybilling_changelist')}?billing_month=2025-12&tariff={Tariff.objects.get().pk}",
+		]
+		for url in urls:
+			self.client.get(url)  # warm the reference cache
+			with self.subTest(url=url), self.assertNumQueries(4):
+				# session, user, COUNT(*) of the filtered rows, one page with its children
+				self.assertEqual(self.client.get(url).status_code, 200)
+
+	def test_changelist_search_uses_search_backend(self) -> None:
+		self.client.force_login(self.admin_user)
+		resp = self.client.get(reverse("admin:core_monthlybilling_changelist"), {"q": "Malika"})
+		self.assertEqual([row.child.first_name for row in resp.context["cl"].result_list], ["Malika"])
+
+
+class ChildDetailViewTests(TestCase):
+	def setUp(self) -> None:
+		self.today = timezone.localdate()
+		self.classroom = Classroom.objects.create(name="Profil", age_group="4-5", capacity=10)
+		tariff = Tariff.objects.create(name="Asosiy", amount="300.00")
+		self.child = Child.objects.create(
+			first_name="Zarina", last_name="Profile", birth_date=date(2020, 1, 1), classroom=self.classroom, tariff=tariff
+		)
+		self.client.force_login(get_user_model().objects.create_user(username="profile", password="testpass123"))
+		self.url = reverse("core:child_detail", args=[self.child.pk])
+
+	def _grow(self, days: int, months: int, guardians: int) -> None:
+		for offset in range(days):
+			Attendance.objects.get_or_create(child=self.child, attendance_date=self.today - timedelta(days=offset))
+		billing_months = recent_months(months)
+		generate_billing(billing_months[0], billing_months[-1])
+		for idx in range(guardians):
+			Guardian.objects.create(
+				first_name=f"Vasiy{idx}", last_name="Profile", phone="+998", email="v@example.com", child=self.child
+			)
+
+	def test_shows_active_pickups_and_the_recent_windows_only(self) -> None:
+		self._grow(days=35, months=14, guardians=2)
+		day = timedelta(days=1)
+		for name, kwargs in [
+			("Doimiy", {}),
+			("Hozirgi", {"valid_from": self.today - day, "valid_until": self.today + day}),
+			("Muddati o‘tgan", {"valid_until": self.today - day}),
+			("Kelajakdagi", {"valid_from": self.today + day}),
+			("Nofaol", {"is_active": False}),
+		]:
+			AuthorizedPickup.objects.create(child=self.child, full_name=name, relationship="Amaki", phone="+998", **kwargs)
+
+		resp = self.client.get(self.url)
+		self.assertEqual(resp.status_code, 200)
+		child = resp.context["child"]
+		self.assertEqual([pickup.full_name for pickup in child.active_pickups], ["Doimiy", "Hozirgi"])
+		self.assertEqual(len(child.guardians.all()), 2)
+		dates = [row.attendance_date for row in child.recent_attendance]
+		self.assertEqual((len(dates), dates[0], dates[-1]), (30, self.today, self.today - timedelta(days=29)))
+		months = [row.billing_month for row in child.recent_billing]
+		self.assertEqual(months, month_range(months[-1], self.today.strftime("%Y-%m"))[::-1])
+		self.assertEqual(len(months), 12)
+		self.assertEqual(dict(resp.context["attendance_counts"])["Kutilmoqda"], 30)
+		self.assertContains(resp, "Hozirgi")
+		self.assertNotContains(resp, "Kelajakdagi")
+
+	def test_recent_months_crosses_year_boundaries(self) -> None:
+		self.assertEqual(recent_months(3, "2026-02"), ["2025-12", "2026-01", "2026-02"])
+		self.assertEqual(recent_months(12, "2025-12"), month_range("2025-01", "2025-12"))
+		self.assertEqual(recent_months(1)[0], self.today.strftime("%Y-%m"))
+
+	def test_query_count_does_not_grow_with_related_rows(self) -> None:
+		# Session, user, the child with classroom and tariff, then one query per prefetched list.
+		with self.assertNumQueries(7):
+			self.assertEqual(self.client.get(self.url).status_code, 200)
+		self._grow(days=30, months=12, guardians=3)
+		for idx in range(3):
+			AuthorizedPickup.objects.create(child=self.child, full_name=f"Olib ketuvchi{idx}", relationship="Xola", phone="+998")
+		with self.assertNumQueries(7):
+			self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class QueryBudgetTests(TestCase):
+	def test_every_view_stays_within_a_constant_query_budget(self) -> None:
+		results = run_budgets()
+		self.assertEqual({row.name for row in results}, {pattern.name for pattern in get_routes()})
+		self.assertIn("billing_monthly_list", {row.name for row in results})
+		self.assertEqual([row.name for row in results if not row.ok], [], "\n" + format_report(results))
+
+
+class ListQueryPlanTests(TestCase):
+	"""EXPLAIN the list views' queries on enough rows for the planner's choices to matter."""
+
+	large_tables = ("core_child", "core_guardian", "core_attendance", "core_monthlybilling", "core_attendancemonthlysummary")
+
+	@classmethod
+	def setUpTestData(cls) -> None:
+		call_command(
+			"seed_demo_data", "--classrooms", "10", "--children", "300", "--days", "75", "--months", "3", "--seed", "1",
+			stdout=StringIO(),
+		)
+		with connection.cursor() as cursor:
+			cursor.execute("ANALYZE")
+		cls.user = get_user_model().objects.create_user(username="planner", password="testpass123")
+
+	def setUp(self) -> None:
+		self.client.force_login(self.user)
+		self.day = Attendance.objects.latest("attendance_date").attendance_date
+		self.month = MonthlyBilling.objects.latest("billing_month").billing_month
+		self.classroom = Classroom.objects.first().pk
+
+	def _plan(self, sql: str, params: tuple[object, ...] = ()) -> list[str]:
+		with connection.cursor() as cursor:
+			if connection.vendor == "postgresql":
+				cursor.execute(f"EXPLAIN {sql}", params)
+				return [line for (line,) in cursor.fetchall()]
+			cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+			return [row[3] for row in cursor.fetchall()]
+
+	def _view_plans(self, url: str) -> dict[str, list[str]]:
+		with CaptureQueriesContext(connection) as ctx:
+			self.assertEqual(self.client.get(url).status_code, 200)
+		return {
+			query["sql"]: self._plan(query["sql"])
+			for query in ctx.captured_queries
+			if query["sql"].startswith("SELECT") and "core_" in query["sql"]
+		}
+
+	def _is_seq_scan(self, line: str) -> bool:
+		if connection.vendor == "postgresql":
+			return any(f"Seq Scan on {table} " in line for table in self.large_tables)
+		return line.strip() in {f"SCAN {table}" for table in self.large_tables}
+
+	def test_list_queries_never_scan_large_tables(self) -> None:
+		urls = [
+			reverse("core:child_list"),
+			reverse("core:guardian_list"),
+			f"{reverse('core:attendance_list')}?date={self.day}",
+			f"{reverse('core:attendance_list')}?date={self.day}&classroom={self.classroom}&status=present",
+			f"{reverse('core:billing_monthly_list')}?month={self.month}&classroom={self.classroom}&status=unpaid",
+			f"{reverse('core:attendance_report')}?month={self.month}&classroom={self.classroom}",
+			reverse("core:billing_debtors"),
+		]
+		for url in urls:
+			with self.subTest(url=url):
+				for sql, plan in self._view_plans(url).items():
+					self.assertEqual([line for line in plan if self._is_seq_scan(line)], [], sql)
+
+	def test_list_query_shapes_use_their_indexes(self) -> None:
+		if connection.vendor != "sqlite":
+			self.skipTest("Index choice on PostgreSQL depends on its statistics.")
+		expected = {
+			reverse("core:child_list"): "child_name_idx",
+			reverse("core:guardian_list"): "guardian_name_idx",
+			f"{reverse('core:attendance_list')}?date={self.day}": "attendance_date_child_idx",
+			f"{reverse('core:billing_monthly_list')}?month={self.month}": "monthly_billing_child_idx",
+		}
+		for url, index in expected.items():
+			with self.subTest(url=url):
+				plans = "\n".join(line for plan in self._view_plans(url).values() for line in plan)
+				self.assertIn(index, plans)
+
+		active = Child.objects.filter(status=ChildStatus.ACTIVE, classroom_id=self.classroom)
+		self.assertIn("child_active_classroom_idx", "\n".join(self._plan(*active.query.sql_with_params())))
+
+
+class DatabaseSettingsTests(TestCase):
+	def test_database_url_query_options(self) -> None:
+		config = database_from_url(
+			"postgresql://crm:secret@db:5432/crm?pool_max_size=20&connect_timeout=5&statement_timeout=30000&sslmode=require"
+		)
+		self.assertEqual(
+			config["OPTIONS"],
+			{"pool": {"max_size": 20}, "connect_timeout": 5, "options": "-c statement_timeout=30000", "sslmode": "require"},
+		)
+		self.assertNotIn("CONN_MAX_AGE", config)
+
+		config = database_from_url("postgresql://crm@db/crm?conn_max_age=600&conn_health_checks=1")
+		self.assertEqual((config["CONN_MAX_AGE"], config["CONN_HEALTH_CHECKS"]), (600, True))
+		self.assertIsNone(database_from_url("sqlite:///tmp/crm.db?conn_max_age=none")["CONN_MAX_AGE"])
+		with self.assertRaises(ValueError):
+			database_from_url("postgresql://crm@db/crm?pool=1&conn_max_age=60")
+
+	def test_sqlite_production_pragmas(self) -> None:
+		config = database_from_url("sqlite:////var/lib/crm/db.sqlite3?busy_timeout=10000&transaction_mode=deferred")
+		self.assertEqual(config["OPTIONS"]["transaction_mode"], "DEFERRED")
+		pragmas = config["OPTIONS"]["init_command"].split(";")
+		self.assertIn("PRAGMA busy_timeout = 10000", pragmas)
+		self.assertIn("PRAGMA journal_mode = wal", pragmas)
+		self.assertNotIn("PRAGMAS", config)
+		for url in ("sqlite:////tmp/crm.db?journal_size=1", "sqlite:////tmp/crm.db?cache_size=1;DROP"):
+			with self.assertRaises(ValueError):
+				database_from_url(url)
+
+		with connection.cursor() as cursor:
+			cursor.execute("PRAGMA busy_timeout")
+			self.assertEqual(cursor.fetchone()[0], 5000)
+			cursor.execute("PRAGMA synchronous")
+			self.assertEqual(cursor.fetchone()[0], 1)
+
+	def test_replica_routing_and_pinning_after_writes(self) -> None:
+		router = PrimaryReplicaRouter()
+		request = RequestFactory().get("/")
+		with mock.patch("core.routers.replica_configured", return_value=True):
+			self.assertIsNone(router.db_for_read(Child))
+			with replica_reads(request):
+				self.assertEqual(router.db_for_read(Child), "replica")
+				self.assertEqual(router.db_for_write(Child), "default")
+			request.COOKIES[PIN_COOKIE] = "1"
+			with replica_reads(request):
+				self.assertIsNone(router.db_for_read(Child))
+		with replica_reads():
+			self.assertIsNone(router.db_for_read(Child))
+		self.assertFalse(router.allow_migrate("replica", "core"))
+
+		self.client.force_login(get_user_model().objects.create_user(username="writer", password="testpass123"))
+		with mock.patch("core.middleware.replica_configured", return_value=True):
+			resp = self.client.post(reverse("core:attendance_materialize"), {"date": "2025-12-01"})
+			self.assertEqual(resp.cookies[PIN_COOKIE]["max-age"], 5)
+			self.assertNotIn(PIN_COOKIE, self.client.get(reverse("core:classroom_list")).cookies)
+
+
 # Create your tests here.
@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
 app_name = "core"
 
+# Drop-off-time endpoints; the async variants are served under ASGI (see kindergarten_crm/asgi.py).
+if settings.ASYNC_VIEWS:
+    attendance_list_view = views.AsyncAttendanceListView
+    attendance_mark_view = views.AsyncAttendanceQuickMarkView
+    attendance_set_time_view = views.AsyncAttendanceSetTimeView
+    live_patterns = [path("attendance/live/", views.AttendanceLiveView.as_view(), name="attendance_live")]
+else:
+    attendance_list_view = views.AttendanceListView
+    attendance_mark_view = views.AttendanceQuickMarkView
+    attendance_set_time_view = views.AttendanceSetTimeView
+    # Server-Sent Events need ASGI: under WSGI each stream would pin a worker thread.
+    live_patterns = []
+
 urlpatterns = [
     path("", views.HomeView.as_view(), name="home"),
+    path("instrumentation/", views.InstrumentationView.as_view(), name="instrumentation"),
     path("classrooms/", views.ClassroomListView.as_view(), name="classroom_list"),
     path(
         "classrooms/create/",
@@ -26,6 +41,7 @@ urlpatterns = [
     ),
     path("children/", views.ChildListView.as_view(), name="child_list"),
     path("children/create/", views.ChildCreateView.as_view(), name="child_create"),
+    path("children/<int:pk>/", views.ChildDetailView.as_view(), name="child_detail"),
     path("children/<int:pk>/edit/", views.ChildUpdateView.as_view(), name="child_update"),
     path(
         "children/<int:pk>/delete/",
@@ -52,7 +68,8 @@ urlpatterns = [
 	path("tariffs/create/", views.TariffCreateView.as_view(), name="tariff_create"),
 	path("tariffs/<int:pk>/edit/", views.TariffUpdateView.as_view(), name="tariff_update"),
 	path("tariffs/<int:pk>/delete/", views.TariffDeleteView.as_view(), name="tariff_delete"),
-    path("attendance/", views.AttendanceListView.as_view(), name="attendance_list"),
+    path("attendance/", attendance_list_view.as_view(), name="attendance_list"),
+    path("attendance/report/", views.AttendanceReportView.as_view(), name="attendance_report"),
     path(
         "attendance/<int:pk>/edit/",
         views.AttendanceUpdateView.as_view(),
@@ -60,12 +77,12 @@ urlpatterns = [
     ),
     path(
         "attendance/<int:pk>/mark/<str:status>/",
-        views.AttendanceQuickMarkView.as_view(),
+        attendance_mark_view.as_view(),
         name="attendance_mark",
     ),
     path(
         "attendance/<int:pk>/time/<str:field>/",
-        views.AttendanceSetTimeView.as_view(),
+        attendance_set_time_view.as_view(),
         name="attendance_set_time",
     ),
     path(
@@ -73,12 +90,54 @@ urlpatterns = [
         views.AttendanceBulkMarkPresentView.as_view(),
         name="attendance_bulk_mark_present",
     ),
+    path(
+        "attendance/batch/",
+        views.AttendanceBatchMarkView.as_view(),
+        name="attendance_batch_mark",
+    ),
+    path(
+        "attendance/export/",
+        views.AttendanceExportView.as_view(),
+        name="attendance_export",
+    ),
+    path(
+        "attendance/materialize/",
+        views.AttendanceMaterializeView.as_view(),
+        name="attendance_materialize",
+    ),
 
     # Billing
     path("billing/monthly/", views.MonthlyBillingListView.as_view(), name="billing_monthly_list"),
+    path(
+        "billing/monthly/generate/",
+        views.MonthlyBillingGenerateView.as_view(),
+        name="billing_monthly_generate",
+    ),
     path(
         "billing/monthly/mark/<str:status>/",
         views.MonthlyBillingMarkView.as_view(),
         name="billing_monthly_mark",
     ),
+    path(
+        "billing/monthly/export/",
+        views.MonthlyBillingExportView.as_view(),
+        name="billing_monthly_export",
+    ),
+    path(
+        "billing/monthly/<int:pk>/payments/",
+        views.BillingPaymentsView.as_view(),
+        name="billing_payments",
+    ),
+    path("billing/debtors/", views.DebtorsReportView.as_view(), name="billing_debtors"),
+
+    # Exports
+    path("exports/", views.ExportJobListView.as_view(), name="export_job_list"),
+    path("exports/create/", views.ExportJobCreateView.as_view(), name="export_job_create"),
+    path(
+        "exports/<int:pk>/download/",
+        views.ExportJobDownloadView.as_view(),
+        name="export_job_download",
+    ),
 ]
+
+urlpatterns += live_patterns
@@ -1,26 +1,47 @@
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+import json
+from dataclasses import replace
+from datetime import datetime, time
 from decimal import Decimal
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db import models
+from django.contrib.auth.mixins import AccessMixin, LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.views import redirect_to_login
+from django.db import connection, models, transaction
 from django.db.models import QuerySet
 from datetime import date
 
-from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page
+from django.http import (
+	FileResponse,
+	Http404,
+	HttpRequest,
+	HttpResponse,
+	HttpResponseBadRequest,
+	HttpResponseRedirect,
+	JsonResponse,
+	StreamingHttpResponse,
+)
 from datetime import timedelta
 
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.response import SimpleTemplateResponse
 from django.urls import reverse, reverse_lazy
-from django.utils import timezone
+from django.utils import formats, timezone
+from django.utils.safestring import SafeString
 from django.views import View
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, TemplateView, UpdateView
 
-from .forms import AttendanceForm, ChildForm, ClassroomForm, GuardianForm, TariffForm, SearchQuery, child_search_filter, classroom_search_filter
+from .forms import AttendanceForm, ChildForm, ClassroomForm, GuardianForm, PaymentForm, TariffForm, ListFilters, SearchQuery, child_search_filter, classroom_search_filter
 from .models import (
 	Attendance,
+	AttendanceMonthlySummary,
+	AuthorizedPickup,
 	AttendanceStatus,
 	Child,
 	ChildStatus,
@@ -29,6 +50,28 @@ from .models import (
 	Tariff,
 	MonthlyBilling,
 	MonthlyBillingStatus,
+	ExportFormat,
+	ExportJob,
+	ExportJobStatus,
+	ExportKind,
+)
+from . import fragment_cache, reference_cache
+from .instrumentation import histogram
+from .live import AttendanceChange, get_broker
+from .pagination import KeysetPage, KeysetPaginationMixin
+from .routers import replica_reads
+from .services.attendance import MAX_BATCH_ITEMS, apply_attendance_batch, materialize_attendance
+from .services.billing import generate_billing, recent_months
+from .services.export import CONTENT_TYPES, build_export, export_filename, job_file_path, stream_export
+from .services.occupancy import reserve_seat
+from .services.payments import debtors, record_payment
+from .services.summary import (
+	StatusSummary,
+	aattendance_summary,
+	attendance_month_summary,
+	attendance_rate,
+	attendance_summary,
+	billing_summary,
 )
 
 
@@ -49,18 +92,90 @@ class PageTitleMixin:
 		return ctx
 
 
+class ReplicaReadMixin:
+	"""Serve the view's reads, template rendering included, from the read replica (core.routers)."""
+
+	def dispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+		if self.view_is_async:
+			return self._adispatch(request, *args, **kwargs)
+		with replica_reads(request):
+			response = super().dispatch(request, *args, **kwargs)
+			if isinstance(response, SimpleTemplateResponse):
+				# Lazy relations and the paginator count are read while rendering.
+				response.render()
+		return response
+
+	async def _adispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+		with replica_reads(request):
+			return await super().dispatch(request, *args, **kwargs)
+
+
+class TableFragmentMixin:
+	"""Serve a list's rows table and pager from core.fragment_cache, querying the rows only on a miss.
+
+	ListView does not paginate up front; `get_table()` / `aget_table()` do,
+	when the fragment is not cached. Templates show it as `{{ table }}`.
+	"""
+
+	fragment_template_name = ""
+	fragment_versions: tuple[str, ...] = ()
+
+	def get_fragment_params(self) -> dict[str, object]:
+		"""Everything but the rows that the fragment shows; part of its cache key."""
+		raise NotImplementedError
+
+	def get_paginate_by(self, queryset: QuerySet | None) -> int | None:
+		return None
+
+	def _fragment_params(self) -> dict[str, object]:
+		return {**self.get_fragment_params(), "page": self.get_page_token(), "per_page": self.paginate_by}
+
+	def _table_context(self, page: KeysetPage | Page) -> dict[str, object]:
+		return {self.context_object_name: page.object_list, "page_obj": page, "is_paginated": page.has_other_pages()}
+
+	def get_table(self) -> SafeString:
+		def build() -> dict[str, object]:
+			_paginator, page, _rows, _is_paginated = self.paginate_queryset(self.get_queryset(), self.paginate_by)
+			return self._table_context(page)
+
+		return fragment_cache.get_or_render(
+			self.request, self.fragment_template_name, self.fragment_versions, self._fragment_params(), build
+		)
+
+	async def aget_table(self) -> SafeString:
+		async def build() -> dict[str, object]:
+			_paginator, page, _rows, _is_paginated = await self.apaginate_queryset(self.get_queryset(), self.paginate_by)
+			return self._table_context(page)
+
+		return await fragment_cache.aget_or_render(
+			self.request, self.fragment_template_name, self.fragment_versions, self._fragment_params(), build
+		)
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+	"""LoginRequiredMixin for async views: the user is loaded with `request.auser()`."""
+
+	async def dispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+		user = await request.auser()
+		if not user.is_authenticated:
+			return redirect_to_login(request.get_full_path(), self.get_login_url(), self.get_redirect_field_name())
+		# Resolved once here so templates and messages never load it synchronously.
+		request.user = user
+		return await super().dispatch(request, *args, **kwargs)
+
+
 class HomeView(TemplateView):
 	template_name = "core/home.html"
 
 
-class ClassroomListView(LoginRequiredMixin, ListView):
+class ClassroomListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
 	model = Classroom
 	template_name = "core/classroom_list.html"
 	context_object_name = "classrooms"
 	paginate_by = 10
 
 	def get_queryset(self) -> QuerySet[Classroom]:
-		qs: QuerySet[Classroom] = Classroom.objects.all().order_by("name")
+		qs: QuerySet[Classroom] = Classroom.objects.with_occupancy().order_by("name")
 		search = SearchQuery.from_request(self.request)
 		if search.q:
 			qs = qs.filter(classroom_search_filter(search.q))
@@ -108,7 +223,7 @@ class ClassroomDeleteView(LoginRequiredMixin, DeleteView):
 		return super().form_valid(form)
 
 
-class ChildListView(LoginRequiredMixin, ListView):
+class ChildListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
 	model = Child
 	template_name = "core/child_list.html"
 	context_object_name = "children"
@@ -127,30 +242,83 @@ class ChildListView(LoginRequiredMixin, ListView):
 		return ctx
 
 
-class ChildCreateView(LoginRequiredMixin, PageTitleMixin, CreateView):
+class ChildDetailView(LoginRequiredMixin, ReplicaReadMixin, DetailView):
+	"""Profile of one child; each related list is one prefetch query, whatever its length."""
+
+	model = Child
+	template_name = "core/child_detail.html"
+	context_object_name = "child"
+	attendance_days = 30
+	billing_months = 12
+
+	def get_queryset(self) -> QuerySet[Child]:
+		today = timezone.localdate()
+		months = recent_months(self.billing_months)
+		return Child.objects.select_related("classroom", "tariff").prefetch_related(
+			models.Prefetch("guardians", Guardian.objects.order_by("-is_primary", "last_name", "first_name")),
+			models.Prefetch("authorized_pickups", AuthorizedPickup.objects.active_on(today), to_attr="active_pickups"),
+			models.Prefetch(
+				"attendance",
+				Attendance.objects.filter(
+					attendance_date__range=(today - timedelta(days=self.attendance_days - 1), today)
+				).order_by("-attendance_date"),
+				to_attr="recent_attendance",
+			),
+			models.Prefetch(
+				"monthly_billing",
+				MonthlyBilling.objects.filter(billing_month__gte=months[0], billing_month__lte=months[-1])
+				.select_related("tariff")
+				.order_by("-billing_month"),
+				to_attr="recent_billing",
+			),
+		)
+
+	def get_context_data(self, **kwargs: object) -> dict[str, object]:
+		ctx = super().get_context_data(**kwargs)
+		# Counted from the prefetched rows rather than with another query.
+		counts = {status: 0 for status in AttendanceStatus.values}
+		for attendance in self.object.recent_attendance:
+			counts[attendance.status] += 1
+		ctx["attendance_counts"] = [(label, counts[value]) for value, label in AttendanceStatus.choices]
+		ctx["attendance_days"] = self.attendance_days
+		ctx["billing_months"] = self.billing_months
+		ctx["billing_balance"] = sum((billing.balance for billing in self.object.recent_billing), Decimal("0"))
+		return ctx
+
+
+class ChildSeatMixin:
+	"""Saves the child while holding its classroom's lock (closes the capacity race)."""
+
+	success_text = ""
+
+	def form_valid(self, form: ChildForm) -> HttpResponse:
+		try:
+			with transaction.atomic():
+				reserve_seat(form.cleaned_data["classroom"], child=form.instance)
+				response = super().form_valid(form)
+		except ValidationError as exc:
+			form.add_error(None, exc)
+			return self.form_invalid(form)
+		messages.success(self.request, self.success_text)
+		return response
+
+
+class ChildCreateView(LoginRequiredMixin, PageTitleMixin, ChildSeatMixin, CreateView):
 	model = Child
 	form_class = ChildForm
 	template_name = "core/form.html"
 	success_url = reverse_lazy("core:child_list")
 	page_title = "Bola qo‘shish"
-
-	def form_valid(self, form: ChildForm) -> HttpResponse:
-		response = super().form_valid(form)
-		messages.success(self.request, "Bola qo‘shildi.")
-		return response
+	success_text = "Bola qo‘shildi."
 
 
-class ChildUpdateView(LoginRequiredMixin, PageTitleMixin, UpdateView):
+class ChildUpdateView(LoginRequiredMixin, PageTitleMixin, ChildSeatMixin, UpdateView):
 	model = Child
 	form_class = ChildForm
 	template_name = "core/form.html"
 	success_url = reverse_lazy("core:child_list")
 	page_title = "Bolani tahrirlash"
-
-	def form_valid(self, form: ChildForm) -> HttpResponse:
-		response = super().form_valid(form)
-		messages.success(self.request, "Bola yangilandi.")
-		return response
+	success_text = "Bola yangilandi."
 
 
 class ChildDeleteView(LoginRequiredMixin, DeleteView):
@@ -163,16 +331,21 @@ class ChildDeleteView(LoginRequiredMixin, DeleteView):
 		return super().form_valid(form)
 
 
-class GuardianListView(LoginRequiredMixin, ListView):
+class GuardianListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
 	model = Guardian
 	template_name = "core/guardian_list.html"
 	context_object_name = "guardians"
 	paginate_by = 10
 
 	def get_queryset(self) -> QuerySet[Guardian]:
-		return Guardian.objects.select_related("child", "child__classroom").order_by(
-			"last_name", "first_name"
-		)
+		qs: QuerySet[Guardian] = Guardian.objects.select_related("child", "child__classroom")
+		qs = SearchQuery.from_request(self.request).filter(qs, "guardian")
+		return qs.order_by("last_name", "first_name")
+
+	def get_context_data(self, **kwargs: object) -> dict[str, object]:
+		ctx = super().get_context_data(**kwargs)
+		ctx["q"] = (self.request.GET.get("q") or "").strip()
+		return ctx
 
 
 class GuardianCreateView(LoginRequiredMixin, PageTitleMixin, CreateView):
@@ -211,7 +384,7 @@ class GuardianDeleteView(LoginRequiredMixin, DeleteView):
 		return super().form_valid(form)
 
 
-class TariffListView(LoginRequiredMixin, ListView):
+class TariffListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
 	model = Tariff
 	template_name = "core/tariff_list.html"
 	context_object_name = "tariffs"
@@ -219,10 +392,7 @@ class TariffListView(LoginRequiredMixin, ListView):
 
 	def get_queryset(self) -> QuerySet[Tariff]:
 		qs: QuerySet[Tariff] = Tariff.objects.all().order_by("-is_active", "name")
-		q = (self.request.GET.get("q") or "").strip()
-		if q:
-			qs = qs.filter(models.Q(name__icontains=q) | models.Q(description__icontains=q))
-		return qs
+		return SearchQuery.from_request(self.request).filter(qs, "tariff")
 
 	def get_context_data(self, **kwargs: object) -> dict[str, object]:
 		ctx = super().get_context_data(**kwargs)
@@ -266,6 +436,16 @@ class TariffDeleteView(LoginRequiredMixin, DeleteView):
 		return super().form_valid(form)
 
 
+class InstrumentationView(LoginRequiredMixin, UserPassesTestMixin, View):
+	"""Rolling per-view latency / query histogram of this process (staff only)."""
+
+	def test_func(self) -> bool:
+		return self.request.user.is_staff
+
+	def get(self, request: HttpRequest) -> HttpResponse:
+		return JsonResponse({"views": histogram.snapshot()})
+
+
 def _parse_date(value: str | None) -> date:
 	if not value:
 		return timezone.localdate()
@@ -275,64 +455,121 @@ def _parse_date(value: str | None) -> date:
 		return timezone.localdate()
 
 
-class AttendanceListView(LoginRequiredMixin, ListView):
+class AttendanceListMixin:
+	"""Queryset and context shared by the sync and async attendance lists."""
+
 	model = Attendance
 	template_name = "core/attendance_list.html"
+	fragment_template_name = "core/attendance_table.html"
+	fragment_versions = (fragment_cache.ATTENDANCE, fragment_cache.CHILDREN, reference_cache.CLASSROOMS)
 	context_object_name = "attendances"
 	paginate_by = 25
+	keyset_pagination = True
+	keyset_ordering = ("child__last_name", "child__first_name", "id")
 
+	def get_queryset(self) -> QuerySet[Attendance]:
+		qs: QuerySet[Attendance] = Attendance.objects.select_related(
+			"child", "child__classroom"
+		).filter(attendance_date=self.attendance_date)
+
+		qs = ListFilters.from_request(self.request).apply(qs)
+		return qs.order_by("child__last_name", "child__first_name")
+
+	def get_fragment_params(self) -> dict[str, object]:
+		return {
+			"date": self.attendance_date,
+			"q": (self.request.GET.get("q") or "").strip(),
+			"selected_classroom": (self.request.GET.get("classroom") or "").strip(),
+			"selected_status": (self.request.GET.get("status") or "").strip(),
+			# The SSE endpoint is only routed under ASGI.
+			"live_url": reverse("core:attendance_live") if settings.ASYNC_VIEWS else "",
+		}
+
+	def get_list_context(self, summary: StatusSummary, classrooms: list[Classroom]) -> dict[str, object]:
+		return {
+			"page_title": "Davomat",
+			**self.get_fragment_params(),
+			"classrooms": classrooms,
+			"statuses": AttendanceStatus.choices,
+			"summary": summary,
+			"count_present": summary.get(AttendanceStatus.PRESENT),
+			"count_late": summary.get(AttendanceStatus.LATE),
+			"count_absent": summary.get(AttendanceStatus.ABSENT),
+			"count_half_day": summary.get(AttendanceStatus.HALF_DAY),
+			"count_not_marked": summary.get(AttendanceStatus.EXPECTED),
+		}
+
+
+class AttendanceListView(
+	LoginRequiredMixin, ReplicaReadMixin, AttendanceListMixin, TableFragmentMixin, KeysetPaginationMixin, ListView
+):
 	def dispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
 		self.attendance_date = _parse_date(request.GET.get("date"))
 		return super().dispatch(request, *args, **kwargs)
 
-	def _auto_create_expected_if_empty(self) -> None:
-		if Attendance.objects.filter(attendance_date=self.attendance_date).exists():
-			return
-		active_children = Child.objects.filter(status=ChildStatus.ACTIVE)
-		Attendance.objects.bulk_create(
-			[
-				Attendance(child=child, attendance_date=self.attendance_date, status=AttendanceStatus.EXPECTED)
-				for child in active_children
-			],
-			ignore_conflicts=True,
-		)
+	def get_context_data(self, **kwargs: object) -> dict[str, object]:
+		ctx = super().get_context_data(**kwargs)
+		ctx.update(self.get_list_context(attendance_summary(self.attendance_date), reference_cache.classrooms()))
+		ctx["table"] = self.get_table()
+		return ctx
 
-	def get_queryset(self) -> QuerySet[Attendance]:
-		self._auto_create_expected_if_empty()
 
-		qs: QuerySet[Attendance] = Attendance.objects.select_related(
-			"child", "child__classroom"
-		).filter(attendance_date=self.attendance_date)
+class AsyncAttendanceListView(
+	AsyncLoginRequiredMixin, ReplicaReadMixin, AttendanceListMixin, TableFragmentMixin, KeysetPaginationMixin, View
+):
+	"""AttendanceListView on the async ORM (ASYNC_VIEWS); renders the same template."""
 
-		q = (self.request.GET.get("q") or "").strip()
-		if q:
-			qs = qs.filter(child_search_filter(q))
+	page_kwarg = "page"
+
+	async def get(self, request: HttpRequest) -> HttpResponse:
+		self.attendance_date = _parse_date(request.GET.get("date"))
+		table = await self.aget_table()
+		summary = await aattendance_summary(self.attendance_date)
+		classrooms = await sync_to_async(reference_cache.classrooms)()
+		ctx = {"view": self, "table": table, **self.get_list_context(summary, classrooms)}
+		return render(request, self.template_name, ctx)
 
-		classroom_id = (self.request.GET.get("classroom") or "").strip()
-		if classroom_id:
-			qs = qs.filter(child__classroom_id=classroom_id)
 
-		status = (self.request.GET.get("status") or "").strip()
-		if status:
-			qs = qs.filter(status=status)
+class AttendanceReportView(LoginRequiredMixin, ReplicaReadMixin, KeysetPaginationMixin, ListView):
+	"""Monthly attendance per child and per classroom, served from AttendanceMonthlySummary."""
+
+	model = AttendanceMonthlySummary
+	template_name = "core/attendance_report.html"
+	context_object_name = "rows"
+	paginate_by = 25
+	keyset_pagination = True
+	keyset_ordering = ("child__last_name", "child__first_name", "id")
 
+	def dispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+		self.month = _parse_billing_month(request.GET.get("month"))
+		self.month_start = date.fromisoformat(f"{self.month}-01")
+		return super().dispatch(request, *args, **kwargs)
+
+	def get_queryset(self) -> QuerySet[AttendanceMonthlySummary]:
+		qs: QuerySet[AttendanceMonthlySummary] = AttendanceMonthlySummary.objects.select_related(
+			"child", "child__classroom"
+		).filter(month=self.month_start)
+		filters = ListFilters.from_request(self.request)
+		qs = replace(filters, status="").apply(qs)
 		return qs.order_by("child__last_name", "child__first_name")
 
 	def get_context_data(self, **kwargs: object) -> dict[str, object]:
 		ctx = super().get_context_data(**kwargs)
-		ctx["page_title"] = "Davomat"
-		ctx["date"] = self.attendance_date
+		ctx["page_title"] = "Oylik davomat hisoboti"
+		ctx["month"] = self.month
 		ctx["q"] = (self.request.GET.get("q") or "").strip()
-		ctx["classrooms"] = Classroom.objects.all().order_by("name")
+		classrooms = reference_cache.classrooms()
+		ctx["classrooms"] = classrooms
 		ctx["selected_classroom"] = (self.request.GET.get("classroom") or "").strip()
-		ctx["selected_status"] = (self.request.GET.get("status") or "").strip()
-		ctx["statuses"] = AttendanceStatus.choices
-
-		base_qs = Attendance.objects.filter(attendance_date=self.attendance_date)
-		ctx["count_present"] = base_qs.filter(status=AttendanceStatus.PRESENT).count()
-		ctx["count_late"] = base_qs.filter(status=AttendanceStatus.LATE).count()
-		ctx["count_absent"] = base_qs.filter(status=AttendanceStatus.ABSENT).count()
-		ctx["count_not_marked"] = base_qs.filter(status=AttendanceStatus.EXPECTED).count()
+
+		summary = attendance_month_summary(self.month_start)
+		ctx["summary"] = summary
+		ctx["summary_rate"] = attendance_rate(summary.counts)
+		ctx["classroom_rows"] = [
+			{"classroom": c, "counts": summary.by_classroom[c.pk], "rate": attendance_rate(summary.by_classroom[c.pk])}
+			for c in classrooms
+			if c.pk in summary.by_classroom
+		]
 		return ctx
 
 
@@ -352,6 +589,93 @@ class AttendanceUpdateView(LoginRequiredMixin, PageTitleMixin, UpdateView):
 		return response
 
 
+def _release_connection() -> None:
+	if not connection.in_atomic_block:
+		connection.close()
+
+
+class AttendanceLiveView(AsyncLoginRequiredMixin, View):
+	"""Server-Sent Events for the live attendance board (ASGI only).
+
+	Streams the status / time of the listed rows (`ids`, the page the client
+	shows) and the day's counts after every committed change on `date`.
+	"""
+
+	max_ids = 200
+	heartbeat = 20.0
+	# Coalesce bursts (e.g. a whole classroom marked present) into one event.
+	debounce = 0.25
+
+	async def get(self, request: HttpRequest) -> HttpResponse:
+		day = _parse_date(request.GET.get("date"))
+		ids = [int(value) for value in (request.GET.get("ids") or "").split(",") if value.strip().isdigit()]
+		response = StreamingHttpResponse(self.events(day, ids[: self.max_ids]), content_type="text/event-stream")
+		response["Cache-Control"] = "no-cache"
+		response["X-Accel-Buffering"] = "no"
+		return response
+
+	async def events(self, day: date, ids: list[int]):
+		broker = get_broker()
+		subscription = broker.subscribe()
+		try:
+			yield "retry: 5000\n\n"
+			while True:
+				# Keeps other processes publishing to this one (PostgresBroker).
+				await broker.atouch()
+				changes = await subscription.get(self.heartbeat)
+				if changes is None:
+					yield ": ping\n\n"
+					continue
+				changes = [change for change in changes if change.covers(day)]
+				if not changes:
+					continue
+				await asyncio.sleep(self.debounce)
+				changes += [change for change in subscription.drain() if change.covers(day)]
+				payload = await self.snapshot(day, ids, changes)
+				yield f"event: attendance\ndata: {json.dumps(payload)}\n\n"
+		finally:
+			broker.unsubscribe(subscription)
+
+	async def snapshot(self, day: date, ids: list[int], changes: list[AttendanceChange]) -> dict[str, object]:
+		rows = []
+		if ids:
+			qs = Attendance.objects.filter(attendance_date=day, pk__in=ids)
+			if all(change.child_ids is not None for change in changes):
+				qs = qs.filter(child_id__in=set().union(*(change.child_ids for change in changes)))
+			rows = [
+				{
+					"id": row.pk,
+					"status": row.status,
+					"label": row.get_status_display(),
+					"badge": row.badge_class,
+					"check_in_time": formats.localize(row.check_in_time) if row.check_in_time else None,
+					"check_out_time": formats.localize(row.check_out_time) if row.check_out_time else None,
+				}
+				async for row in qs.only("status", "check_in_time", "check_out_time")
+			]
+		summary = await aattendance_summary(day)
+		# Streams live for hours: do not hold a database connection between events.
+		await sync_to_async(_release_connection)()
+		return {"rows": rows, "counts": summary.counts}
+
+
+def _attendance_return_url(request: HttpRequest, attendance: Attendance) -> str:
+	date_str = attendance.attendance_date.strftime("%Y-%m-%d")
+	return request.META.get("HTTP_REFERER") or f"{reverse_lazy('core:attendance_list')}?date={date_str}"
+
+
+def _posted_time(request: HttpRequest, field: str) -> time:
+	if field not in {"check_in_time", "check_out_time"}:
+		raise ValueError("Noto‘g‘ri maydon")
+	value = (request.POST.get("time") or "").strip()
+	if not value:
+		raise ValueError("Vaqt kiritilmadi")
+	try:
+		return datetime.strptime(value, "%H:%M").time()
+	except ValueError:
+		raise ValueError("Noto‘g‘ri vaqt")
+
+
 class AttendanceQuickMarkView(LoginRequiredMixin, View):
 	allowed = {
 		AttendanceStatus.PRESENT,
@@ -372,31 +696,53 @@ class AttendanceQuickMarkView(LoginRequiredMixin, View):
 		attendance.status = status
 		attendance.save(update_fields=["status", "updated_at"])
 		messages.success(request, f"{attendance.child} holati: {attendance.get_status_display()}.")
+		return HttpResponseRedirect(_attendance_return_url(request, attendance))
 
-		date_str = attendance.attendance_date.strftime("%Y-%m-%d")
-		return_url = request.META.get("HTTP_REFERER") or f"{reverse_lazy('core:attendance_list')}?date={date_str}"
-		return HttpResponseRedirect(return_url)
+
+class AsyncAttendanceQuickMarkView(AsyncLoginRequiredMixin, View):
+	async def post(self, request: HttpRequest, pk: int, status: str) -> HttpResponse:
+		if status not in AttendanceQuickMarkView.allowed:
+			return HttpResponseBadRequest("Noto‘g‘ri holat")
+		try:
+			attendance = await Attendance.objects.select_related("child").aget(pk=pk)
+		except Attendance.DoesNotExist:
+			return HttpResponseBadRequest("Davomat topilmadi")
+
+		attendance.status = status
+		await attendance.asave(update_fields=["status", "updated_at"])
+		messages.success(request, f"{attendance.child} holati: {attendance.get_status_display()}.")
+		return HttpResponseRedirect(_attendance_return_url(request, attendance))
 
 
 class AttendanceSetTimeView(LoginRequiredMixin, View):
 	def post(self, request: HttpRequest, pk: int, field: str) -> HttpResponse:
-		if field not in {"check_in_time", "check_out_time"}:
-			return HttpResponseBadRequest("Noto‘g‘ri maydon")
-		value = (request.POST.get("time") or "").strip()
-		if not value:
-			return HttpResponseBadRequest("Vaqt kiritilmadi")
 		try:
-			time_value = datetime.strptime(value, "%H:%M").time()
-		except ValueError:
-			return HttpResponseBadRequest("Noto‘g‘ri vaqt")
+			time_value = _posted_time(request, field)
+		except ValueError as exc:
+			return HttpResponseBadRequest(str(exc))
 
 		attendance = Attendance.objects.get(pk=pk)
 		setattr(attendance, field, time_value)
 		attendance.save(update_fields=[field, "updated_at"])
 		messages.success(request, "Vaqt yangilandi.")
-		date_str = attendance.attendance_date.strftime("%Y-%m-%d")
-		return_url = request.META.get("HTTP_REFERER") or f"{reverse_lazy('core:attendance_list')}?date={date_str}"
-		return HttpResponseRedirect(return_url)
+		return HttpResponseRedirect(_attendance_return_url(request, attendance))
+
+
+class AsyncAttendanceSetTimeView(AsyncLoginRequiredMixin, View):
+	async def post(self, request: HttpRequest, pk: int, field: str) -> HttpResponse:
+		try:
+			time_value = _posted_time(request, field)
+		except ValueError as exc:
+			return HttpResponseBadRequest(str(exc))
+		try:
+			attendance = await Attendance.objects.aget(pk=pk)
+		except Attendance.DoesNotExist:
+			return HttpResponseBadRequest("Davomat topilmadi")
+
+		setattr(attendance, field, time_value)
+		await attendance.asave(update_fields=[field, "updated_at"])
+		messages.success(request, "Vaqt yangilandi.")
+		return HttpResponseRedirect(_attendance_return_url(request, attendance))
 
 
 class AttendanceBulkMarkPresentView(LoginRequiredMixin, View):
@@ -414,13 +760,7 @@ class AttendanceBulkMarkPresentView(LoginRequiredMixin, View):
 			)
 
 		# Ensure records exist, then mark Present.
-		Attendance.objects.bulk_create(
-			[
-				Attendance(child=child, attendance_date=date_val, status=AttendanceStatus.EXPECTED)
-				for child in children
-			],
-			ignore_conflicts=True,
-		)
+		materialize_attendance(date_val, classroom_id=classroom_id)
 		Attendance.objects.filter(attendance_date=date_val, child__in=children).update(
 			status=AttendanceStatus.PRESENT
 		)
@@ -431,6 +771,41 @@ class AttendanceBulkMarkPresentView(LoginRequiredMixin, View):
 
 
 
+class AttendanceBatchMarkView(LoginRequiredMixin, View):
+	"""JSON batch endpoint: {"date": "YYYY-MM-DD", "items": [{attendance_id | child_id, status, ...}]}."""
+
+	def post(self, request: HttpRequest) -> HttpResponse:
+		try:
+			payload = json.loads(request.body or b"{}")
+		except (ValueError, UnicodeDecodeError):
+			return JsonResponse({"error": "Invalid JSON."}, status=400)
+		items = payload.get("items") if isinstance(payload, dict) else None
+		if not isinstance(items, list) or not items:
+			return JsonResponse({"error": "'items' must be a non-empty list."}, status=400)
+		if len(items) > MAX_BATCH_ITEMS:
+			return JsonResponse({"error": f"At most {MAX_BATCH_ITEMS} items per request."}, status=400)
+		# Unlike the list filters, no fallback to today: a typo must not write the batch to another day.
+		try:
+			day = datetime.strptime(str(payload.get("date") or ""), "%Y-%m-%d").date()
+		except ValueError:
+			return JsonResponse({"error": "'date' is required, in YYYY-MM-DD format."}, status=400)
+
+		results = apply_attendance_batch(items, day)
+		return JsonResponse(
+			{"updated": sum(1 for row in results if row["ok"]), "results": results},
+		)
+
+
+class AttendanceMaterializeView(LoginRequiredMixin, View):
+	def post(self, request: HttpRequest) -> HttpResponse:
+		date_val = _parse_date(request.POST.get("date"))
+		result = materialize_attendance(date_val)
+		if result.created:
+			messages.success(request, f"{result.created} ta 'Kutilmoqda' yozuvi yaratildi.")
+		else:
+			messages.info(request, "Barcha faol bolalar uchun yozuvlar mavjud.")
+		return HttpResponseRedirect(f"{reverse('core:attendance_list')}?date={date_val.strftime('%Y-%m-%d')}")
+
 
 def _parse_billing_month(value: str | None) -> str:
 	if not value:
@@ -449,71 +824,69 @@ def _parse_billing_month(value: str | None) -> str:
 	return val
 
 
-class MonthlyBillingListView(LoginRequiredMixin, ListView):
+class MonthlyBillingListView(LoginRequiredMixin, ReplicaReadMixin, TableFragmentMixin, KeysetPaginationMixin, ListView):
 	model = MonthlyBilling
 	template_name = "core/billing_monthly_list.html"
+	fragment_template_name = "core/billing_monthly_table.html"
+	fragment_versions = (
+		fragment_cache.BILLING,
+		fragment_cache.CHILDREN,
+		reference_cache.CLASSROOMS,
+		reference_cache.TARIFFS,
+	)
 	context_object_name = "rows"
 	paginate_by = 25
+	keyset_pagination = True
+	keyset_ordering = ("child__last_name", "child__first_name", "id")
 
 	def dispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
 		self.billing_month = _parse_billing_month(request.GET.get("month"))
 		return super().dispatch(request, *args, **kwargs)
 
-	def _auto_create_if_missing(self) -> None:
-		active_children = Child.objects.filter(status=ChildStatus.ACTIVE).select_related("tariff")
-		existing = set(
-			MonthlyBilling.objects.filter(billing_month=self.billing_month).values_list("child_id", flat=True)
-		)
-		to_create: list[MonthlyBilling] = []
-		for child in active_children:
-			if child.pk in existing:
-				continue
-			amount = child.tariff.amount if child.tariff else Decimal("0")
-			to_create.append(
-				MonthlyBilling(
-					child=child,
-					billing_month=self.billing_month,
-					amount=amount,
-					status=MonthlyBillingStatus.UNPAID,
-				)
-			)
-		if to_create:
-			MonthlyBilling.objects.bulk_create(to_create, ignore_conflicts=True)
-
 	def get_queryset(self) -> QuerySet[MonthlyBilling]:
-		self._auto_create_if_missing()
 		qs: QuerySet[MonthlyBilling] = MonthlyBilling.objects.select_related(
-			"child", "child__classroom", "child__tariff"
+			"child", "child__classroom", "tariff"
 		).filter(
 			billing_month=self.billing_month
 		)
-		q = (self.request.GET.get("q") or "").strip()
-		if q:
-			qs = qs.filter(child_search_filter(q))
-		classroom_id = (self.request.GET.get("classroom") or "").strip()
-		if classroom_id:
-			qs = qs.filter(child__classroom_id=classroom_id)
-		status = (self.request.GET.get("status") or "").strip()
-		if status:
-			qs = qs.filter(status=status)
+		qs = ListFilters.from_request(self.request).apply(qs)
 		return qs.order_by("child__last_name", "child__first_name")
 
+	def get_fragment_params(self) -> dict[str, object]:
+		return {
+			"month": self.billing_month,
+			"q": (self.request.GET.get("q") or "").strip(),
+			"selected_classroom": (self.request.GET.get("classroom") or "").strip(),
+			"selected_status": (self.request.GET.get("status") or "").strip(),
+		}
+
 	def get_context_data(self, **kwargs: object) -> dict[str, object]:
 		ctx = super().get_context_data(**kwargs)
 		ctx["page_title"] = "Oylik to‘lov"
-		ctx["month"] = self.billing_month
-		ctx["q"] = (self.request.GET.get("q") or "").strip()
-		ctx["classrooms"] = Classroom.objects.all().order_by("name")
-		ctx["selected_classroom"] = (self.request.GET.get("classroom") or "").strip()
-		ctx["selected_status"] = (self.request.GET.get("status") or "").strip()
+		ctx.update(self.get_fragment_params())
+		ctx["classrooms"] = reference_cache.classrooms()
 		ctx["statuses"] = MonthlyBillingStatus.choices
+		ctx["table"] = self.get_table()
 
-		base_qs = MonthlyBilling.objects.filter(billing_month=self.billing_month)
-		ctx["count_paid"] = base_qs.filter(status=MonthlyBillingStatus.PAID).count()
-		ctx["count_unpaid"] = base_qs.filter(status=MonthlyBillingStatus.UNPAID).count()
+		summary = billing_summary(self.billing_month)
+		ctx["summary"] = summary
+		ctx["count_paid"] = summary.get(MonthlyBillingStatus.PAID)
+		ctx["count_partial"] = summary.get(MonthlyBillingStatus.PARTIAL)
+		ctx["count_unpaid"] = summary.get(MonthlyBillingStatus.UNPAID)
 		return ctx
 
 
+class MonthlyBillingGenerateView(LoginRequiredMixin, View):
+	def post(self, request: HttpRequest) -> HttpResponse:
+		month = _parse_billing_month(request.POST.get("month"))
+		result = generate_billing(month)
+		if result.created:
+			messages.success(request, f"{result.created} ta oylik to‘lov yozuvi yaratildi.")
+		else:
+			messages.info(request, "Barcha faol bolalar uchun yozuvlar mavjud.")
+		return HttpResponseRedirect(f"{reverse('core:billing_monthly_list')}?month={month}")
+
+
 class MonthlyBillingMarkView(LoginRequiredMixin, View):
 	def post(self, request: HttpRequest, status: str) -> HttpResponse:
 		if status not in {MonthlyBillingStatus.PAID, MonthlyBillingStatus.UNPAID}:
@@ -527,16 +900,199 @@ class MonthlyBillingMarkView(LoginRequiredMixin, View):
 		row, _ = MonthlyBilling.objects.get_or_create(
 			child_id=child_id,
 			billing_month=month,
-			defaults={"amount": default_amount, "status": MonthlyBillingStatus.UNPAID},
+			defaults={
+				"base_amount": default_amount,
+				"amount": default_amount,
+				"balance": default_amount,
+				"tariff": child.tariff,
+				"status": MonthlyBillingStatus.UNPAID,
+			},
 		)
 		if status == MonthlyBillingStatus.PAID:
-			row.mark_paid()
+			row.mark_paid(received_by=request.user)
 			messages.success(request, "To‘langan deb belgilandi.")
 		else:
-			row.mark_unpaid()
+			row.mark_unpaid(received_by=request.user)
 			messages.success(request, "To‘lanmagan deb belgilandi.")
 
 		return_url = request.META.get("HTTP_REFERER") or f"{reverse('core:billing_monthly_list')}?month={month}"
 		return HttpResponseRedirect(return_url)
 
+
+class BillingPaymentsView(LoginRequiredMixin, PageTitleMixin, CreateView):
+	"""Ledger of one billing row with a form for a payment or refund."""
+
+	form_class = PaymentForm
+	template_name = "core/billing_payments.html"
+	page_title = "To‘lovlar"
+
+	def dispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+		self.billing = get_object_or_404(
+			MonthlyBilling.objects.select_related("child", "child__classroom", "tariff"), pk=kwargs["pk"]
+		)
+		return super().dispatch(request, *args, **kwargs)
+
+	def get_form_kwargs(self) -> dict[str, object]:
+		return {**super().get_form_kwargs(), "billing": self.billing}
+
+	def form_valid(self, form: PaymentForm) -> HttpResponse:
+		data = form.cleaned_data
+		try:
+			record_payment(
+				self.billing,
+				data["amount"],
+				kind=data["kind"],
+				method=data["method"],
+				guardian=data["guardian"],
+				received_by=self.request.user,
+				paid_at=data["paid_at"],
+				notes=data["notes"],
+			)
+		except ValidationError as exc:
+			form.add_error(None, exc)
+			return self.form_invalid(form)
+		messages.success(self.request, "To‘lov yozildi.")
+		return redirect("core:billing_payments", pk=self.billing.pk)
+
+	def get_context_data(self, **kwargs: object) -> dict[str, object]:
+		ctx = super().get_context_data(**kwargs)
+		ctx["billing"] = self.billing
+		# Oldest first with the paid total after each entry.
+		ledger = list(self.billing.payments.select_related("guardian", "received_by").order_by("paid_at", "id"))
+		running = Decimal("0")
+		for payment in ledger:
+			running += payment.signed_amount
+			payment.running_paid = running
+		ctx["payments"] = ledger
+		return ctx
+
+
+class DebtorsReportView(LoginRequiredMixin, ReplicaReadMixin, ListView):
+	"""Children with an open balance, read through the partial `monthly_billing_debt_idx` index."""
+
+	template_name = "core/billing_debtors.html"
+	context_object_name = "debtors"
+	paginate_by = 50
+
+	def dispatch(self, request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+		self.through = _parse_billing_month(request.GET.get("through"))
+		raw_months = (request.GET.get("min_months") or "").strip()
+		self.min_months = int(raw_months) if raw_months.isdigit() else 1
+		return super().dispatch(request, *args, **kwargs)
+
+	def get_queryset(self) -> QuerySet[MonthlyBilling]:
+		return debtors(
+			through=self.through,
+			classroom_id=ListFilters.from_request(self.request).classroom or None,
+			min_months=self.min_months,
+		)
+
+	def get_context_data(self, **kwargs: object) -> dict[str, object]:
+		ctx = super().get_context_data(**kwargs)
+		ctx["page_title"] = "Qarzdorlar"
+		ctx["through"] = self.through
+		ctx["min_months"] = self.min_months
+		ctx["classrooms"] = reference_cache.classrooms()
+		ctx["selected_classroom"] = (self.request.GET.get("classroom") or "").strip()
+		# Names for the current page only.
+		rows = ctx["debtors"] = list(ctx["debtors"])
+		children = Child.objects.select_related("classroom").in_bulk([row["child_id"] for row in rows])
+		for row in rows:
+			row["child"] = children.get(row["child_id"])
+		return ctx
+
+
+def _export_params(data: object) -> dict[str, str]:
+	return {key: value for key, value in data.items() if key not in {"csrfmiddlewaretoken", "format", "page"}}
+
+
+class ExportView(LoginRequiredMixin, View):
+	"""Streams the filtered list (date/month range) as CSV or XLSX."""
+
+	kind: str = ""
+
+	def get(self, request: HttpRequest) -> HttpResponse:
+		file_format = request.GET.get("format") or ExportFormat.CSV
+		if file_format not in ExportFormat.values:
+			return HttpResponseBadRequest("Noto‘g‘ri format")
+		params = _export_params(request.GET)
+		try:
+			spec = build_export(self.kind, params)
+		except ValidationError as exc:
+			return HttpResponseBadRequest("; ".join(exc.messages))
+
+		if spec.exceeds(settings.EXPORT_STREAM_MAX_ROWS):
+			return render(
+				request,
+				"core/export_confirm.html",
+				{
+					"page_title": "Eksport",
+					"kind": self.kind,
+					"file_format": file_format,
+					"params": params,
+					"max_rows": settings.EXPORT_STREAM_MAX_ROWS,
+				},
+			)
+
+		response = StreamingHttpResponse(stream_export(spec, file_format), content_type=CONTENT_TYPES[file_format])
+		response["Content-Disposition"] = f'attachment; filename="{export_filename(spec, file_format)}"'
+		return response
+
+
+class AttendanceExportView(ExportView):
+	kind = ExportKind.ATTENDANCE
+
+
+class MonthlyBillingExportView(ExportView):
+	kind = ExportKind.BILLING
+
+
+class ExportJobListView(LoginRequiredMixin, ListView):
+	model = ExportJob
+	template_name = "core/export_job_list.html"
+	context_object_name = "jobs"
+	paginate_by = 25
+
+	def get_queryset(self) -> QuerySet[ExportJob]:
+		return ExportJob.objects.filter(requested_by=self.request.user)
+
+	def get_context_data(self, **kwargs: object) -> dict[str, object]:
+		ctx = super().get_context_data(**kwargs)
+		ctx["page_title"] = "Eksportlar"
+		return ctx
+
+
+class ExportJobCreateView(LoginRequiredMixin, View):
+	"""Queues an export for `run_export_jobs` (for exports too large to stream)."""
+
+	def post(self, request: HttpRequest) -> HttpResponse:
+		kind = request.POST.get("kind") or ""
+		file_format = request.POST.get("format") or ExportFormat.CSV
+		if kind not in ExportKind.values or file_format not in ExportFormat.values:
+			return HttpResponseBadRequest("Noto‘g‘ri eksport")
+		params = _export_params(request.POST)
+		params.pop("kind", None)
+		try:
+			build_export(kind, params)
+		except ValidationError as exc:
+			return HttpResponseBadRequest("; ".join(exc.messages))
+
+		ExportJob.objects.create(kind=kind, file_format=file_format, params=params, requested_by=request.user)
+		messages.success(request, "Eksport navbatga qo‘yildi. Tayyor bo‘lgach shu yerdan yuklab olasiz.")
+		return redirect("core:export_job_list")
+
+
+class ExportJobDownloadView(LoginRequiredMixin, View):
+	def get(self, request: HttpRequest, pk: int) -> HttpResponse:
+		job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user, status=ExportJobStatus.DONE)
+		path = job_file_path(job)
+		if not path.exists():
+			raise Http404("Fayl topilmadi")
+		return FileResponse(
+			path.open("rb"),
+			as_attachment=True,
+			filename=job.file_name.split("-", 2)[-1],
+			content_type=CONTENT_TYPES[job.file_format],
+		)
+
 # Create your views here.
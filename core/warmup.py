@@ -0,0 +1,78 @@
+"""Start-up warm-up for the production template profile (TEMPLATE_WARMUP).
+
+kindergarten_crm/wsgi.py and asgi.py run `warm_up()` once the application is
+built, so a worker's first requests neither import the views, compile the
+core/ and registration/ templates nor render the static forms. Templates stay
+compiled in the cached loader; form HTML goes to core.fragment_cache.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.db import DatabaseError, connections
+from django.forms import BaseForm
+from django.template import engines
+from django.template.loader import get_template
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+from core.forms import ChildForm, ClassroomForm, GuardianForm, TariffForm
+from core.templatetags.crispy_cache import crispy_cached
+
+logger = logging.getLogger(__name__)
+
+WARM_TEMPLATE_DIRS = ("core", "registration")
+STATIC_FORMS: tuple[type[BaseForm], ...] = (ClassroomForm, ChildForm, GuardianForm, TariffForm)
+
+
+@dataclass(frozen=True)
+class WarmupResult:
+	templates: int
+	forms: int
+	elapsed: float
+
+
+def template_names(prefixes: Sequence[str] = WARM_TEMPLATE_DIRS) -> list[str]:
+	"""Every template under `prefixes` in DIRS and the installed apps' template directories."""
+	names: set[str] = set()
+	for directory in [*engines["django"].engine.dirs, *get_app_template_dirs("templates")]:
+		for prefix in prefixes:
+			root = Path(directory) / prefix
+			if root.is_dir():
+				names.update(path.relative_to(directory).as_posix() for path in root.rglob("*.html"))
+	return sorted(names)
+
+
+def warm_templates(names: Sequence[str]) -> int:
+	for name in names:
+		get_template(name)
+	return len(names)
+
+
+def warm_forms(forms: Sequence[type[BaseForm]] = STATIC_FORMS) -> int:
+	"""Render each unbound form once; also compiles the crispy pack's templates."""
+	for count, form_class in enumerate(forms):
+		try:
+			crispy_cached(form_class())
+		except DatabaseError:
+			# Choices are read from the database; the worker must still start without it.
+			logger.warning("Form warm-up skipped: database unavailable.", exc_info=True)
+			return count
+	return len(forms)
+
+
+def warm_up() -> WarmupResult:
+	started = time.perf_counter()
+	get_resolver().url_patterns  # imports the URLconf and every view module
+	templates = warm_templates(template_names())
+	forms = warm_forms()
+	# Servers that fork after loading the application must not share a connection.
+	connections.close_all()
+	result = WarmupResult(templates=templates, forms=forms, elapsed=time.perf_counter() - started)
+	logger.info("Warm-up: %d templates, %d forms in %.3f s.", result.templates, result.forms, result.elapsed)
+	return result
@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kindergarten_crm.settings')
+# Route the drop-off endpoints to their async views (core.urls); ASYNC_VIEWS=0 opts out.
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+if settings.TEMPLATE_WARMUP:
+    from core.warmup import warm_up
+
+    warm_up()